@@ -0,0 +1,7 @@
+CREATE TABLE ADalarm (
+	ch INT PRIMARY KEY NOT NULL,
+	high REAL,
+	low REAL,
+	rate REAL,
+	hysteresis REAL
+);
@@ -0,0 +1,4 @@
+INSERT INTO ADalarm VALUES(0, 90.0, 10.0, NULL, 1.0);
+INSERT INTO ADalarm VALUES(1, 90.0, NULL, NULL, 1.0);
+INSERT INTO ADalarm VALUES(2, NULL, NULL, 500.0, 0.0);
+INSERT INTO ADalarm VALUES(4, 45.0, 5.0, 200.0, 0.5);
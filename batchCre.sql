@@ -0,0 +1,19 @@
+CREATE TABLE ADjob (
+	id INT PRIMARY KEY NOT NULL,
+	count INTEGER,
+	rate INTEGER,
+	channels TEXT,
+	ranges TEXT,
+	output TEXT,
+	done INTEGER DEFAULT 0
+);
+CREATE TABLE ADjoblog (
+	id INT,
+	start REAL,
+	config REAL,
+	acquire REAL,
+	write REAL,
+	samples INTEGER,
+	status INTEGER,
+	error TEXT
+);
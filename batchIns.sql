@@ -0,0 +1,4 @@
+INSERT INTO ADjob VALUES(1, 5000, 1000, '0-7', NULL, 'job001.csv', 0);
+INSERT INTO ADjob VALUES(2, 5000, 1000, '0-7', NULL, 'job002.csv', 0);
+INSERT INTO ADjob VALUES(3, 20000, 100, '0,2,4', '0:51,2:51,4:51', 'job003.npy', 0);
+INSERT INTO ADjob VALUES(4, 20000, 100, '0,2,4', '0:51,2:51,4:51', 'job004.raw', 0);
@@ -0,0 +1,78 @@
+# coding:utf-8
+import sys
+import math
+import time
+
+import numpy as np
+
+import clsAD
+
+def bench(func, n:int) -> np.ndarray:
+    ''' 処理時間計測関数
+            Args:
+                func: 計測する関数(引数なし)
+                n(int): 実行回数
+            Returns:
+                1回毎の処理時間(μsec)のnp.ndarray
+            Note:
+    '''
+    t = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter_ns()
+        func()
+        t[i] = (time.perf_counter_ns() - t0) / 1000.0
+    return t
+
+def report(name:str, t:np.ndarray):
+    ''' 計測結果表示関数
+            Args:
+                name(str): 計測名
+                t(np.ndarray): 処理時間(μsec)
+            Returns:
+            Note:
+    '''
+    print(f"{name:<16} median={np.median(t):9.1f}us  p99={np.percentile(t, 99):9.1f}us  max={t.max():9.1f}us")
+
+def main():
+    ''' Snapshot/バッファ入力の比較
+            Args:
+                sys.argv[1]: チャンネル数(Default 8)
+                sys.argv[2]: 実行回数(Default 1000)
+            Returns:
+            Note:
+                > python benchSnapshot.py 8 1000
+    '''
+    ch = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    cAD = clsAD.clsAD()
+    if cAD.Open("AIO000"):
+        print(cAD.pErrorStr, file=sys.stderr)
+        return
+    cAD.SetRange()
+
+    report("Snapshot(raw)", bench(lambda: cAD.Snapshot(ch, cAD.SNAP_RAW), n))
+    report("Snapshot(value)", bench(lambda: cAD.Snapshot(ch, cAD.SNAP_VALUE), n))
+    report("Snapshot(volt)", bench(lambda: cAD.Snapshot(ch, cAD.SNAP_VOLT), n))
+
+    # 1サンプリングを設定可能な最速のレートで入力する
+    rate = math.ceil(cAD.FastestRate(ch))
+    def buffered():
+        ret = cAD.Start(1, rate, ch, cAD.SAMPLE_ASYNC)
+        if ret == 0:
+            while cAD.pIsBusy:
+                pass
+            ret = cAD.Read()
+            ret = ret[0] if isinstance(ret, tuple) else ret
+        if ret:
+            raise RuntimeError(cAD.pErrorStr)
+    try:
+        if rate <= 0:
+            raise RuntimeError("sampling clock is not available")
+        report("Start/Read", bench(buffered, max(1, n // 10)))
+    except RuntimeError as e:
+        print(f"Start/Read: {e}", file=sys.stderr)
+
+    cAD.Close()
+
+if __name__ == "__main__":
+    main()
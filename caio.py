@@ -6,7 +6,20 @@
 import ctypes
 import ctypes.wintypes
 
-caio_dll = ctypes.windll.LoadLibrary('caio.dll')
+class _Unloaded:
+    ''' caio.dllを読み込めない場合の代理(関数の呼出しでOSError) '''
+    def __getattr__(self, name):
+        def func(*args):
+            raise OSError(f"caio.dll is not loaded ({name})")
+        return func
+
+# Windows以外・ドライバ未インストールでもimportできるようにする(定数・再生デバイスは使用可)
+try:
+    caio_dll = ctypes.windll.LoadLibrary('caio.dll')
+except (OSError, AttributeError):
+    caio_dll = _Unloaded()
+AVAILABLE = not isinstance(caio_dll, _Unloaded)
+_FUNCTYPE = getattr(ctypes, "WINFUNCTYPE", ctypes.CFUNCTYPE)
 
 
 #----------------------------------------
@@ -207,28 +220,28 @@ AIOECU_SRC_STOP = 385           # Ai, Ao, Cnt, Tm software stop signal
 #----------------------------------------
 # Types for callback function.
 #----------------------------------------
-PAIO_AI_CALLBACK = ctypes.WINFUNCTYPE(None,
+PAIO_AI_CALLBACK = _FUNCTYPE(None,
                                        ctypes.c_short, ctypes.c_short, ctypes.wintypes.WPARAM,
                                        ctypes.wintypes.LPARAM, ctypes.c_void_p)
-PAIO_AO_CALLBACK = ctypes.WINFUNCTYPE(None,
+PAIO_AO_CALLBACK = _FUNCTYPE(None,
                                        ctypes.c_short, ctypes.c_short, ctypes.wintypes.WPARAM,
                                        ctypes.wintypes.LPARAM, ctypes.c_void_p)
-PAIO_CNT_CALLBACK = ctypes.WINFUNCTYPE(None,
+PAIO_CNT_CALLBACK = _FUNCTYPE(None,
                                        ctypes.c_short, ctypes.c_short, ctypes.wintypes.WPARAM,
                                        ctypes.wintypes.LPARAM, ctypes.c_void_p)
-PAIO_TM_CALLBACK = ctypes.WINFUNCTYPE(None,
+PAIO_TM_CALLBACK = _FUNCTYPE(None,
                                        ctypes.c_short, ctypes.c_short, ctypes.wintypes.WPARAM,
                                        ctypes.wintypes.LPARAM, ctypes.c_void_p)
-PAIO_MATCH_CALLBACK = ctypes.WINFUNCTYPE(None,
+PAIO_MATCH_CALLBACK = _FUNCTYPE(None,
                                        ctypes.c_short,  ctypes.wintypes.WPARAM,
                                        ctypes.wintypes.LPARAM, ctypes.c_void_p)
-PAIO_TIMEUP_CALLBACK = ctypes.WINFUNCTYPE(None,
+PAIO_TIMEUP_CALLBACK = _FUNCTYPE(None,
                                        ctypes.c_short,  ctypes.wintypes.WPARAM,
                                        ctypes.wintypes.LPARAM, ctypes.c_void_p)
-PAIO_COUNTER_ERR_CALLBACK = ctypes.WINFUNCTYPE(None,
+PAIO_COUNTER_ERR_CALLBACK = _FUNCTYPE(None,
                                             ctypes.c_short,  ctypes.wintypes.WPARAM,
                                             ctypes.wintypes.LPARAM, ctypes.c_void_p)
-PAIO_CARRY_BORROW_CALLBACK = ctypes.WINFUNCTYPE(None,
+PAIO_CARRY_BORROW_CALLBACK = _FUNCTYPE(None,
                                            ctypes.c_short,  ctypes.wintypes.WPARAM,
                                            ctypes.wintypes.LPARAM, ctypes.c_void_p)
 
@@ -1,5 +1,10 @@
 # coding : utf-8
+import os
 import sys
+import mmap
+import time
+import sqlite3
+import threading
 #from functools import reduce
 
 import ctypes
@@ -23,12 +28,45 @@ class clsAD:
     # メモリ形式:pMemoryType
     MEMORY_FIFO:int = 0             # FIFO
     MEMORY_RING:int = 1             # RING
-    # クロック種別
+    # クロック種別:pClockType
     CLOCK_INTERNAL = 0              # 内部クロック
     CLOCK_EXTERNAL = 1              # 外部クロック
+    CLOCK_ECU = 2                   # イベントコントローラ出力
+    # 外部クロックの有効エッジ:pClockEdge
+    EDGE_RISE:int = 0               # 立ち上がり
+    EDGE_FALL:int = 1               # 立ち下がり
+    # クラス独自のエラーコード(ドライバのエラーコードと重ならない負の値)
+    ERR_SETTING:int = -1            # 設定値エラー
+    ERR_DRIVER:int = -2             # caio.dllを読み込めない
+    ERR_TIMEOUT:int = -3            # 完了待ちのタイムアウト
+    # 開始条件:pStartTrigger(API-AIO AioSetAiStartTriggerの値、2/3は外部トリガ)
+    START_SOFTWARE:int = 0          # ソフトウェア
+    START_COMPARE:int = 1           # 変換データの比較(条件はAioSetAiStartLevel/InRange/OutRange)
+    START_ECU:int = 4               # イベントコントローラ出力
+    # 停止条件:pStopTrigger(API-AIO AioSetAiStopTriggerの値、2/3は外部トリガ)
+    STOP_TIMES:int = 0              # 設定回数
+    STOP_COMPARE:int = 1            # 変換データの比較(条件はAioSetAiStopLevel/InRange/OutRange)
+    STOP_ECU:int = 4                # イベントコントローラ出力
+    STOP_COMMAND:int = 5            # コマンド(AioStopAi)
+    # トリガー種別:SetTrigger
+    TRIG_LEVEL:int = 0              # レベル
+    TRIG_INRANGE:int = 1            # 範囲内
+    TRIG_OUTRANGE:int = 2           # 範囲外
+    # レベルトリガーの方向
+    LEVEL_RISE:int = 0              # 立ち上がり(下から上)
+    LEVEL_FALL:int = 1              # 立ち下がり(上から下)
     # サンプリング動作
     SAMPLE_SYNC:bool = True         # 同期入力
     SAMPLE_ASYNC:bool = False       # 非同期入力
+    # 即時入力の値種別:Snapshot
+    SNAP_RAW:int = 0                # デジタル値
+    SNAP_VALUE:int = 1              # 数値(pMin/pMax/pOffset)
+    SNAP_VOLT:int = 2               # 電圧(ドライバ変換)
+    # タイマー周期読込の種別:Pace
+    PACE_SNAPSHOT:int = 0           # 即時入力(Snapshot)
+    PACE_CHUNK:int = 1              # 連続入力(ReadChunk)
+    # タイマー(AioTmWait/AioLapTmCount)の単位(sec)
+    TM_UNIT:float = 10e-6           # 10μsec
 
     def __init__(self):
         ''' clsAD コンストラクタ
@@ -44,6 +82,13 @@ class clsAD:
         self.pInputMethod:int = self.INPUT_DIFFERRENTIAL   # 入力モード(差動)
         self.pTransfer:int = self.TRANSFER_DEVICEBUFFER  # 転送方式(デバイスバッファ)
         self.pMemoryType:int = self.MEMORY_FIFO          # メモリ形式(FIFO)
+        self.pStartTrigger:int = self.START_SOFTWARE     # 開始条件(ソフトウェア)
+        self.pClockType:int = self.CLOCK_INTERNAL   # クロック種別(内部)
+        self.pClockEdge:int = self.EDGE_RISE        # 外部クロックの有効エッジ
+        self.pScanClock:float = 0.0                 # スキャンクロック(μsec、0:ドライバ既定値)
+        self.pMinScanClock:float = 0.0              # スキャンクロックの下限(μsec、Open時のドライバ既定値)
+        self.pStopTrigger:int = None                # 停止条件(None:サンプリング数により自動)
+        self.pRepeatTimes:int = 1                   # リピート回数(Segmentsで設定)
         self.pCh:list = []                          # チャンネルクラスリスト
         self.pMaxChannel:int = 0                    # 最大チャンネル数
         self._pID = ctypes.c_short()                # デバイスアクセス用ID
@@ -52,9 +97,45 @@ class clsAD:
         # サンプリング設定値
         self._smplsetting:dict = {
                 "ChannelCount":0, "SamplingRate":0.0, 
-                "SamplingCount":0, "ActualSamplingCount":0, "SampleEventCount":0
+                "SamplingCount":0, "ActualSamplingCount":0, "SampleEventCount":0,
+                "SamplingClock":0.0, "StartTime":0.0, "RepeatCount":0
             }
         self._ADdata:list = []                      # 入力データ(Digital)
+        self.pTimeAxis = None                       # 直近のRead/ReadChunkの時間軸(clsTimeAxis)
+        self._smplindex:int = 0                     # 取得済サンプリング数(デバイスバッファ)
+        # ユーザーバッファ
+        self.pUserBufferCount:int = 0               # ユーザーバッファのサンプリング数(0:SamplingCount)
+        self._userbufauto:int = 0                   # Scheduleが決めたpUserBufferCount(0:未設定)
+        self._userbuf:np.ndarray = None             # ユーザーバッファ(サンプリング数, チャンネル数)
+        self._userbufraw:np.ndarray = None          # ユーザーバッファ実体(ページ境界確保用)
+        self._userpos:int = 0                       # ユーザーバッファ読込済位置(周回込み)
+        self._userlost:int = 0                      # 上書きにより失われたサンプリング数
+        # 読込スケジュール(Scheduleで設定)
+        self._schedule:dict = {
+                "Latency":0.5, "Interval":0.5, "MemorySize":0,
+                "EventCount":0, "BytePerSec":0.0, "Fill":0.0, "MaxFill":0.0
+            }
+        self.pStreamError:int = 0                   # Streamを終了させたエラーコード(0:停止・break)
+        # 計測値(Metricsで取得) 1回分/累計
+        self._metrics:dict = {"Capture":self._newMetrics(), "Total":self._newMetrics()}
+        self._laststatus:int = 0                    # 前回読込時のADステータス
+        self._deviceName:str = ""                   # デバイス名(exm."AIO000")
+        # 即時入力(Snapshot)用キャッシュ
+        self._snapraw = None                        # AioMultiAi出力(c_long配列)
+        self._snapex = None                         # AioMultiAiEx出力(c_float配列)
+        self._snapcoef:np.ndarray = None            # 数値変換係数(2, 最大チャンネル数)
+        # タイマー周期読込(Pace)
+        self.pPaceOverrun:int = 0                   # 読込が間に合わず飛ばしたタイマー周期数
+        self._tmtick:int = 0                        # タイマーイベント回数
+        self._tmevent = threading.Event()           # タイマーイベント通知
+        self._tmwait:bool = True                    # AioTmWait使用可(Wait)
+        self._tmwaiterr:int = 0                     # AioTmWaitのエラーコード
+        self._tmproc = caio.PAIO_TM_CALLBACK(self._tmCallBack)  # コールバック(参照保持)
+        # A/Dイベント(Segments)
+        self._aievent = threading.Event()           # A/Dイベント通知
+        self._aiproc = caio.PAIO_AI_CALLBACK(self._aiCallBack)  # コールバック(参照保持)
+        # トリガー入力(SetTrigger)
+        self._trigger:dict = None                   # {"Pre":プリトリガー数, "Post":ポストトリガー数}
 
     class clsChannel():
         ''' clsChannel A/Dチャンネルクラス
@@ -199,18 +280,96 @@ class clsAD:
             # 辞書から値を取得。見つからない場合はデフォルト値（例: +/-10V）を返す
             return self._RANGE_MAP.get(rng, (-10.0, 10.0))
         # end clsChannel
+
+    class clsTimeAxis():
+        ''' clsTimeAxis 時間軸クラス
+                Note:
+                    開始時刻+サンプリング周期×サンプリング番号で表す等差数列
+                    配列はtoArrayで必要になった時に生成する
+        '''
+        def __init__(self, start:float, period:float, index:int, count:int):
+            ''' clsTimeAxis コンストラクタ
+                    Args:
+                        start(float): 変換開始時刻(time.time()、サンプリング番号0の時刻)
+                        period(float): サンプリング周期(sec)
+                        index(int): 先頭のサンプリング番号(変換開始からの通し番号)
+                        count(int): サンプリング数
+                    Returns:
+                    Note:
+            '''
+            self.pStartTime:float = start
+            self.pPeriod:float = period
+            self.pIndex:int = index
+            self.pCount:int = count
+
+        def __len__(self) -> int:
+            return self.pCount
+
+        def __getitem__(self, key):
+            ''' 要素取得
+                    Args:
+                        key: int|slice(stepは1のみ)
+                    Returns:
+                        intの場合はその時刻、sliceの場合は部分のclsTimeAxis
+                    Note:
+            '''
+            if isinstance(key, slice):
+                start, stop, step = key.indices(self.pCount)
+                if step != 1:
+                    raise ValueError("step must be 1")
+                return type(self)(self.pStartTime, self.pPeriod, self.pIndex + start, max(0, stop - start))
+            if key < 0:
+                key += self.pCount
+            if not 0 <= key < self.pCount:
+                raise IndexError(key)
+            return self.pStartTime + (self.pIndex + key) * self.pPeriod
+
+        @property
+        def pBegin(self) -> float:
+            ''' 先頭サンプリングの時刻 '''
+            return self.pStartTime + self.pIndex * self.pPeriod
+
+        @property
+        def pEnd(self) -> float:
+            ''' 最終サンプリングの次の時刻(次チャンクの先頭) '''
+            return self.pStartTime + (self.pIndex + self.pCount) * self.pPeriod
+
+        def toArray(self, relative:bool=False) -> np.ndarray:
+            ''' 時刻配列生成メソッド
+                    Args:
+                        relative(bool): 真の場合は変換開始からの経過時間(sec)
+                    Returns:
+                        サンプリング毎の時刻のnp.ndarray(float64)
+                    Note:
+            '''
+            t = np.arange(self.pIndex, self.pIndex + self.pCount, dtype=np.float64) * self.pPeriod
+            if not relative:
+                t += self.pStartTime
+            return t
+        # end clsTimeAxis
         
     def Open(self, deviceName:str) -> int:
         ''' ボードオープンメソッド
                 Args: 
                     deviceName(str): ボードのデバイス名(exm.'AIO000')
+                                'replay:<記録ファイル>[?speed=N&loop=1]'の場合は記録ファイルを再生する
                 Returns: 
                     エラーコード
                     0以外の場合はエラー
                 Note:
+                    再生の詳細はclsReplayを参照
+                    caio.dllを読み込めない環境では再生のみ可(その他はERR_DRIVER)
         ''' 
         lret = ctypes.c_long(0)
-        lret.value = caio.AioInit(deviceName.encode(), ctypes.byref(self._pID))
+        if deviceName.startswith("replay:"):
+            import clsReplay
+            lret.value = clsReplay.Open(deviceName, self._pID, sys.modules[__name__])
+        elif not caio.AVAILABLE:
+            self.pErrorStr = f"[{self.ERR_DRIVER}] caio.dll is not loaded"
+            print(self.pErrorStr, file=sys.stderr)
+            return self.ERR_DRIVER
+        else:
+            lret.value = caio.AioInit(deviceName.encode(), ctypes.byref(self._pID))
         self._ErrorHandler(lret)
         if lret.value == 0:
             self.pOpened = True
@@ -260,6 +419,7 @@ class clsAD:
         ''' A/Dサンプリング開始メソッド
                 Args: 
                     smpcnt(int): サンプリング数
+                                0の場合はStopまで連続入力(停止条件:コマンド)
                     smprate(int): サンプリングレート(μsec/1000usec==1msec)
                     chcnt(int): 入力チャンネル数
                     sync(bool): 同期フラグ
@@ -277,6 +437,11 @@ class clsAD:
         ''' 
         lret = ctypes.c_long(0)
         
+        # クロック設定の検証(ドライバに設定する前)
+        lret.value = self._checkClock(smprate, chcnt)
+        if lret.value:
+            return lret.value
+
         # 入力チャンネル数設定
         lret.value = caio.AioSetAiChannels(self._pID, chcnt)
         self._ErrorHandler(lret)
@@ -284,20 +449,41 @@ class clsAD:
             return lret.value
         self._smplsetting["ChannelCount"] = chcnt   # チャンネル数
 
+        # スキャンクロック設定
+        if self.pScanClock > 0.0:
+            lret.value = caio.AioSetAiScanClock(self._pID, self.pScanClock)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+
         # サンプリングレート設定
         lret.value = caio.AioSetAiSamplingClock(self._pID, smprate)
         self._ErrorHandler(lret)
         if lret.value:
             return lret.value
         self._smplsetting["SamplingRate"] = smprate # サンプリングレート
+        # 実際に設定されたサンプリングクロック(時間軸用)
+        clk = ctypes.c_float()
+        lret.value = caio.AioGetAiSamplingClock(self._pID, ctypes.byref(clk))
+        self._smplsetting["SamplingClock"] = clk.value if lret.value == 0 else float(smprate)
+        lret.value = 0
+
+        # 停止条件(pStopTriggerが未設定の場合は設定回数|連続入力時はコマンド)
+        stop = self.pStopTrigger
+        if stop is None:
+            stop = self.STOP_TIMES if smpcnt > 0 else self.STOP_COMMAND
 
         # サンプリング数設定
-        lret.value = caio.AioSetAiStopTimes(self._pID, smpcnt)
+        if smpcnt > 0 and stop == self.STOP_TIMES:
+            lret.value = caio.AioSetAiStopTimes(self._pID, smpcnt)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+        self._smplsetting["SamplingCount"] = smpcnt     # サンプリング回数
+        lret.value = caio.AioSetAiRepeatTimes(self._pID, self.pRepeatTimes)   # リピート回数
         self._ErrorHandler(lret)
         if lret.value:
             return lret.value
-        self._smplsetting["SamplingCount"] = smpcnt     # サンプリング回数
-        lret.value = caio.AioSetAiRepeatTimes(self._pID, 1)     # リピート回数 * 1
         
         # 指定サンプルイベント回数
         lret.value = caio.AioSetAiEventSamplingTimes (self._pID, eventCnt)
@@ -306,14 +492,14 @@ class clsAD:
             return lret.value
         self._smplsetting["SampleEventCount"] = eventCnt     # サンプルイベント回数
 
-        # 開始条件設定(ソフトウェア)
-        lret.value = caio.AioSetAiStartTrigger(self._pID, 0)
+        # 開始条件設定(Default ソフトウェア)
+        lret.value = caio.AioSetAiStartTrigger(self._pID, self.pStartTrigger)
         self._ErrorHandler(lret)
         if lret.value:
             return lret.value
 
-        # 停止条件設定(設定回数)
-        lret.value = caio.AioSetAiStopTrigger(self._pID, 0)
+        # 停止条件設定
+        lret.value = caio.AioSetAiStopTrigger(self._pID, stop)
         self._ErrorHandler(lret)
         if lret.value:
             return lret.value
@@ -324,8 +510,23 @@ class clsAD:
         if lret.value:
             return lret.value
 
+        # ユーザーバッファ登録(ユーザーバッファモード時)
+        if self.pTransfer == self.TRANSFER_USERBUFFER:
+            lret.value = self._setUserBuffer(smpcnt, chcnt)
+            if lret.value:
+                return lret.value
+
+        # 計測値(1回分)初期化
+        self._metrics["Capture"] = self._newMetrics()
+        self._laststatus = 0
+        for m in self._metrics.values():
+            m["Captures"] += 1
+            m["Requested"] += smpcnt * self.pRepeatTimes
+
         # 変換開始
         lret.value = caio.AioStartAi(self._pID)
+        self._smplsetting["StartTime"] = time.time()    # サンプリング番号0の時刻
+        self._smplindex = 0
         self._ErrorHandler(lret)
         if lret.value:
             return lret.value
@@ -362,6 +563,7 @@ class clsAD:
                     2025/07/20 
                         データ変換を効率化(gemini)
         ''' 
+        t0 = time.perf_counter()
         lret = ctypes.c_long()
         smplcnt = ctypes.c_long()
         # サンプリング回数の取得
@@ -373,17 +575,35 @@ class clsAD:
         # データ取得
         cnt = self._smplsetting["ActualSamplingCount"]
         ch = self._smplsetting["ChannelCount"]
-        AiDataType = ctypes.c_long * (cnt * ch)
-        AiData_raw = AiDataType()
-        lret.value = caio.AioGetAiSamplingData (self._pID, ctypes.byref(smplcnt), AiData_raw)
-        self._ErrorHandler(lret)
-        if lret.value:
-            return lret.value
-        
-        #`ctypes`の配列をNumpy配列に変換し、`reshape`と転置(`.T`)を使って効率的にデータを再構成します。
-        # [ch0_d1, ch1_d1, ..., ch0_d2, ch1_d2, ...] のようになっているデータを
-        # [[ch0_d1, ch0_d2, ...], [ch1_d1, ch1_d2, ...]] の形に変換
-        np_data = np.array(AiData_raw, dtype=np.int32).reshape(cnt, ch).T
+        if self.pTransfer == self.TRANSFER_USERBUFFER:
+            # ユーザーバッファモード:転送済領域をコピーする
+            # (pDataはドライバの次の周回で上書きされないこと。コピーなしはReadUserBuffer/ReadChunk)
+            lret.value, views = self.ReadUserBuffer()
+            if lret.value:
+                return lret.value
+            if len(views) == 1:
+                np_data = np.array(views[0], order="C")
+            else:   # バッファ終端で折り返している場合は連結(コピー)
+                np_data = np.concatenate(views, axis=1)
+            cnt = np_data.shape[1]
+            self.pTimeAxis = self._timeAxis(self._userpos - cnt, cnt)
+            fill = cnt / self._userbuf.shape[0]
+        else:
+            # メモリ使用率(読込前の格納数/メモリサイズ)
+            memsize = ctypes.c_long()
+            lret.value = caio.AioGetAiMemorySize(self._pID, ctypes.byref(memsize))
+            fill = cnt * ch / memsize.value if lret.value == 0 and memsize.value > 0 else 0.0
+
+            AiDataType = ctypes.c_long * (cnt * ch)
+            AiData_raw = AiDataType()
+            lret.value = caio.AioGetAiSamplingData (self._pID, ctypes.byref(smplcnt), AiData_raw)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+
+            np_data = self._toChannels(AiData_raw, cnt, ch)
+            self.pTimeAxis = self._timeAxis(self._smplindex, cnt)
+            self._smplindex += cnt
         
         # 各チャンネルにデータをセット
         for i in range(ch):
@@ -401,8 +621,578 @@ class clsAD:
             self.pCh[i].SetData(self._ADdata[i], cnt)
         '''
             
+        self._updateMetrics(cnt, time.perf_counter() - t0, fill)
         return lret.value, cnt  # ErrorCode, SamplingCount
-        
+
+    def _toChannels(self, raw, cnt:int, ch:int) -> np.ndarray:
+        ''' 取得データ整形メソッド
+                Args:
+                    raw: AioGetAiSamplingDataで取得したctypes配列
+                    cnt(int): サンプリング数
+                    ch(int): チャンネル数
+                Returns:
+                    (チャンネル数, サンプリング数)のnp.ndarray(int32)
+                Note:
+                    Readの整形部分(clsTraceで個別に計測するためメソッドに分ける)
+        '''
+        #`ctypes`の配列をNumpy配列に変換し、`reshape`と転置(`.T`)を使って効率的にデータを再構成します。
+        # [ch0_d1, ch1_d1, ..., ch0_d2, ch1_d2, ...] のようになっているデータを
+        # [[ch0_d1, ch0_d2, ...], [ch1_d1, ch1_d2, ...]] の形に変換
+        return np.array(raw, dtype=np.int32).reshape(cnt, ch).T
+
+    def ReadUserBuffer(self) -> (int,list):
+        ''' ユーザーバッファ新規転送領域取得
+                Args:
+                Returns:
+                    エラーコードと新規転送領域のビューのlistを返す
+                    ビューは(チャンネル数, サンプリング数)の形状
+                Note:
+                    AioGetAiTransferLap/AioGetAiTransferCountから書込位置を求め、
+                    前回呼出し以降に転送された領域をコピーせずに返す
+                    バッファ終端で折り返した場合はビューが2つになる
+                    読込が間に合わず上書きされた分は_userlostに加算し、
+                    残っている最新のバッファ1周分のみを返す
+        '''
+        lret = ctypes.c_long(0)
+        if self._userbuf is None:
+            return lret.value, []
+        tcnt = ctypes.c_long()
+        lap = ctypes.c_long()
+        lret.value = caio.AioGetAiTransferLap(self._pID, ctypes.byref(lap))
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value, []
+        lret.value = caio.AioGetAiTransferCount(self._pID, ctypes.byref(tcnt))
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value, []
+        # 転送回数はサンプリング回数単位
+        size = self._userbuf.shape[0]
+        pos = lap.value * size + tcnt.value
+        if pos - self._userpos > size:      # 読み遅れによる上書き
+            self._userlost += pos - self._userpos - size
+            for m in self._metrics.values():
+                m["Lost"] += pos - self._userpos - size
+            self._userpos = pos - size
+        start = self._userpos % size
+        end = start + (pos - self._userpos)
+        self._userpos = pos
+        if end <= size:
+            return lret.value, [self._userbuf[start:end].T]
+        return lret.value, [self._userbuf[start:].T, self._userbuf[:end - size].T]
+
+    def Schedule(self, smprate:int, chcnt:int, latency:float=0.1, depth:int=4) -> int:
+        ''' 読込スケジュール設定メソッド
+                Args:
+                    smprate(int): サンプリングレート(μsec)
+                    chcnt(int): 入力チャンネル数
+                    latency(float): 目標遅延時間(sec)、読込周期の上限
+                    depth(int): メモリサイズ(latency何回分を保持するか)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    レート×チャンネル数×データサイズから
+                    メモリサイズ(AioSetAiMemorySize)、
+                    サンプルイベント回数(latency分のサンプリング数)、
+                    読込周期(pReadInterval)を決める
+                    メモリサイズの単位はデータ数(サンプリング数×チャンネル数)
+                    ユーザーバッファモードでpUserBufferCountを指定していない場合は
+                    latency×depth分のサンプリング数にする
+        '''
+        lret = ctypes.c_long(0)
+        size = ctypes.c_short()
+        lret.value = caio.AioGetAiSamplingDataSize(self._pID, ctypes.byref(size))
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        smplps = 1000000.0 / smprate                        # サンプリング数/sec
+        bps = smplps * chcnt * size.value                   # byte/sec
+        evcnt = max(1, int(smplps * latency))               # latency分のサンプリング数
+        memsize = evcnt * depth * chcnt                     # データ数
+        lret.value = caio.AioSetAiMemorySize(self._pID, memsize)
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        # ユーザーバッファは利用者が指定していなければ呼出し毎の設定に合わせる
+        if self.pTransfer == self.TRANSFER_USERBUFFER and \
+                self.pUserBufferCount in (0, self._userbufauto):
+            self.pUserBufferCount = self._userbufauto = evcnt * depth
+        self._schedule["Latency"] = latency
+        self._schedule["Interval"] = latency
+        self._schedule["MemorySize"] = memsize
+        self._schedule["EventCount"] = evcnt
+        self._schedule["BytePerSec"] = bps
+        self._schedule["Fill"] = 0.0
+        self._schedule["MaxFill"] = 0.0
+        return lret.value
+
+    def StartStream(self, smprate:int, chcnt:int, latency:float=0.1) -> int:
+        ''' 連続入力開始メソッド
+                Args:
+                    smprate(int): サンプリングレート(μsec)
+                    chcnt(int): 入力チャンネル数
+                    latency(float): 目標遅延時間(sec)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    Scheduleで読込周期を決めてからStopまで連続入力を開始する
+                    開始後はStream/ReadChunkでデータを取得する
+        '''
+        lret = ctypes.c_long(0)
+        lret.value = self.Schedule(smprate, chcnt, latency)
+        if lret.value:
+            return lret.value
+        lret.value = self.Start(0, smprate, chcnt, self.SAMPLE_ASYNC, self._schedule["EventCount"])
+        return lret.value
+
+    def ReadChunk(self) -> (int,np.ndarray):
+        ''' 連続入力データ取得
+                Args:
+                Returns:
+                    エラーコードと(チャンネル数, サンプリング数)のnp.ndarrayを返す
+                Note:
+                    前回以降に格納された全データを取得する
+                    取得前の格納数からメモリ使用率を求め読込周期を調整する
+                    ユーザーバッファモードで折り返しがない場合はコピーしない
+        '''
+        t0 = time.perf_counter()
+        lret = ctypes.c_long(0)
+        ch = self._smplsetting["ChannelCount"]
+        if self.pTransfer == self.TRANSFER_USERBUFFER:
+            lret.value, views = self.ReadUserBuffer()
+            if lret.value or not views:
+                return lret.value, np.empty((ch, 0), dtype=np.int32)
+            data = views[0] if len(views) == 1 else np.concatenate(views, axis=1)
+            # 周回数込みの位置から求めるので、上書きで欠けても時刻はずれない
+            self.pTimeAxis = self._timeAxis(self._userpos - data.shape[1], data.shape[1])
+            self._adjustSchedule(data.shape[1] / self._userbuf.shape[0])
+            self._updateMetrics(data.shape[1], time.perf_counter() - t0)
+            return lret.value, data
+        smplcnt = ctypes.c_long()
+        lret.value = caio.AioGetAiSamplingCount(self._pID, ctypes.byref(smplcnt))
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value, np.empty((ch, 0), dtype=np.int32)
+        cnt = smplcnt.value
+        if self._schedule["MemorySize"]:
+            self._adjustSchedule(cnt * ch / self._schedule["MemorySize"])
+        # ドライバから直接np.ndarrayへ取得
+        data = np.empty((cnt, ch), dtype=np.int32)
+        if cnt:
+            lret.value = caio.AioGetAiSamplingData(self._pID, ctypes.byref(smplcnt),
+                            data.ctypes.data_as(ctypes.POINTER(ctypes.c_long)))
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value, np.empty((ch, 0), dtype=np.int32)
+            data = data[:smplcnt.value]
+        self.pTimeAxis = self._timeAxis(self._smplindex, data.shape[0])
+        self._smplindex += data.shape[0]
+        self._updateMetrics(data.shape[0], time.perf_counter() - t0)
+        return lret.value, data.T
+
+    def Stream(self, withtime:bool=False):
+        ''' 連続入力ジェネレータ
+                Args:
+                    withtime(bool): 真の場合は(データ, clsTimeAxis)を返す
+                Returns:
+                    (チャンネル数, サンプリング数)のnp.ndarrayを順次返す
+                Note:
+                    pReadInterval毎にReadChunkを実行する
+                    変換停止(Stop/エラー)後、残りデータを返して終了する
+                    ReadChunkのエラーで終了した場合はエラーコードをpStreamErrorに残す
+                    呼出し側でbreakした場合はStopする
+        '''
+        self.pStreamError = 0
+        try:
+            while True:
+                busy = self.pIsBusy
+                ret, data = self.ReadChunk()
+                if ret:
+                    self.pStreamError = ret
+                    break
+                if data.shape[1]:
+                    yield (data, self.pTimeAxis) if withtime else data
+                if not busy:
+                    break
+                time.sleep(self.pReadInterval)
+        finally:
+            if self.pIsBusy:
+                self.Stop()
+
+    def Segments(self, segments:int, smpcnt:int, smprate:int, chcnt:int,
+            timeout:float=10.0) -> (int,np.ndarray):
+        ''' セグメント入力メソッド
+                Args:
+                    segments(int): セグメント数(リピート回数)
+                    smpcnt(int): 1セグメントのサンプリング数
+                    smprate(int): サンプリングレート(μsec)
+                    chcnt(int): 入力チャンネル数
+                    timeout(float): セグメント間の待ち時間の上限(sec)
+                Returns:
+                    エラーコードと(セグメント数, チャンネル数, サンプリング数)のnp.ndarrayを返す
+                    タイムアウト・停止時は取得済のセグメントまでを返す
+                Note:
+                    AioSetAiRepeatTimesで設定し、1回のStartで全セグメントを入力する
+                    (セグメント毎の設定・リセットを行わない)
+                    開始条件(pStartTrigger)はセグメント毎に判定される
+                    リピート終了(AIE_RPTEND)毎にセグメント単位で取り出し、
+                    確保済の配列に格納する
+                    デバイスバッファモードのみ(ユーザーバッファモードはERR_SETTING)
+                    終了時にコールバックの登録を解除する
+        '''
+        lret = ctypes.c_long(0)
+        if self.pTransfer != self.TRANSFER_DEVICEBUFFER:
+            self.pErrorStr = f"[{self.ERR_SETTING}] Segments requires TRANSFER_DEVICEBUFFER"
+            return self.ERR_SETTING, np.empty((0, chcnt, smpcnt), dtype=np.int32)
+        out = np.empty((segments, chcnt, smpcnt), dtype=np.int32)
+        buf = np.empty((smpcnt, chcnt), dtype=np.int32)     # AioGetAiSamplingData用
+        ptr = buf.ctypes.data_as(ctypes.POINTER(ctypes.c_long))
+        smplcnt = ctypes.c_long()
+        rptcnt = ctypes.c_long()
+        self._aievent.clear()
+        lret.value = caio.AioSetAiCallBackProc(self._pID, self._aiproc,
+                        caio.AIE_RPTEND | caio.AIE_END, None)
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value, out[:0]
+        k = 0
+        try:
+            self.pRepeatTimes = segments
+            lret.value = self.Start(smpcnt, smprate, chcnt, self.SAMPLE_ASYNC)
+            self.pRepeatTimes = 1
+            if lret.value:
+                return lret.value, out[:0]
+            t0 = time.perf_counter()
+            while k < segments:
+                waited = self._aievent.wait(timeout)
+                self._aievent.clear()
+                busy = self.pIsBusy
+                lret.value = caio.AioGetAiSamplingCount(self._pID, ctypes.byref(smplcnt))
+                self._ErrorHandler(lret)
+                if lret.value:
+                    break
+                # 格納済のセグメントを順に取り出す
+                for _ in range(min(smplcnt.value // smpcnt, segments - k)):
+                    smplcnt.value = smpcnt
+                    lret.value = caio.AioGetAiSamplingData(self._pID, ctypes.byref(smplcnt), ptr)
+                    self._ErrorHandler(lret)
+                    if lret.value:
+                        break
+                    out[k] = buf.T
+                    k += 1
+                if lret.value or not busy or not waited:
+                    break
+            if caio.AioGetAiRepeatCount(self._pID, ctypes.byref(rptcnt)) == 0:
+                self._smplsetting["RepeatCount"] = rptcnt.value     # 実行済リピート回数
+            if self.pIsBusy:
+                self.Stop()
+        finally:
+            self.pRepeatTimes = 1
+            caio.AioSetAiCallBackProc(self._pID, self._aiproc, 0, None)    # 登録解除
+        self._smplsetting["ActualSamplingCount"] = k * smpcnt
+        self.pTimeAxis = self._timeAxis(0, smpcnt)      # 各セグメント先頭からの時間軸
+        self._updateMetrics(k * smpcnt, time.perf_counter() - t0)
+        return lret.value, out[:k]
+
+    def Average(self, segments:np.ndarray, value:bool=True) -> np.ndarray:
+        ''' セグメント平均メソッド
+                Args:
+                    segments(np.ndarray): Segmentsで取得した(セグメント数, チャンネル数, サンプリング数)
+                    value(bool): 真の場合は数値(pMin/pMax/pOffset)に変換する
+                Returns:
+                    (チャンネル数, サンプリング数)の平均値
+                Note:
+                    セグメント方向に一括で平均する(加算平均によるノイズ低減)
+        '''
+        ave = segments.mean(axis=0)
+        if value:
+            if self._snapcoef is None:
+                self._snapcoef = self._valueCoef()
+            ch = ave.shape[0]
+            ave = ave * self._snapcoef[0, :ch, None] + self._snapcoef[1, :ch, None]
+        return ave
+
+    def SetTrigger(self, kind:int, channel:int, level1:float, level2:float=None,
+            direction:int=LEVEL_RISE, pre:int=0, post:int=1000, states:int=1) -> int:
+        ''' トリガー設定メソッド
+                Args:
+                    kind(int): TRIG_LEVEL|TRIG_INRANGE|TRIG_OUTRANGE
+                    channel(int): 監視チャンネル番号
+                    level1(float): レベル(範囲の場合は下限)、チャンネルの数値(pUnit)で指定
+                    level2(float): 範囲の上限(TRIG_INRANGE/TRIG_OUTRANGEのみ)
+                    direction(int): LEVEL_RISE|LEVEL_FALL(TRIG_LEVELのみ)
+                    pre(int): トリガー前のサンプリング数
+                    post(int): トリガー後のサンプリング数
+                    states(int): 範囲判定の連続回数(TRIG_INRANGE/TRIG_OUTRANGEのみ)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    数値はチャンネルのpMin/pMax/pOffset/pResolutionでデジタル値に変換して設定する
+                    pre=0の場合は開始条件として設定し、トリガーからpost数を入力する
+                    pre>0の場合は停止条件として設定し、RINGメモリに入力しながら
+                    トリガー後post数(AioSetAiStopDelayTimes)で停止する
+                    TriggerCaptureで入力し、ClearTriggerで解除する
+        '''
+        lret = ctypes.c_long(0)
+        c = self.pCh[channel]
+        a = (c.pMax - c.pMin) / (2 ** c.pResolution)
+        b = c.pMin + c.pOffset
+        d1 = int(round((level1 - b) / a))
+        d2 = int(round((level2 - b) / a)) if level2 is not None else d1
+        if pre > 0:
+            func = (caio.AioSetAiStopLevel, caio.AioSetAiStopInRange, caio.AioSetAiStopOutRange)[kind]
+        else:
+            func = (caio.AioSetAiStartLevel, caio.AioSetAiStartInRange, caio.AioSetAiStartOutRange)[kind]
+        if kind == self.TRIG_LEVEL:
+            lret.value = func(self._pID, channel, d1, direction)
+        else:
+            lret.value = func(self._pID, channel, min(d1, d2), max(d1, d2), states)
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        if pre > 0:
+            lret.value = caio.AioSetAiStopDelayTimes(self._pID, post)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+            self.pStartTrigger = self.START_SOFTWARE
+            self.pStopTrigger = self.STOP_COMPARE
+        else:
+            self.pStartTrigger = self.START_COMPARE
+            self.pStopTrigger = self.STOP_TIMES
+        self._trigger = {"Pre":pre, "Post":post}
+        return lret.value
+
+    def ClearTrigger(self) -> int:
+        ''' トリガー解除メソッド
+                Args:
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    開始条件をソフトウェア、停止条件を自動に戻し、
+                    メモリ形式をpMemoryType、メモリサイズをTriggerCapture前の値に戻す
+        '''
+        lret = ctypes.c_long(0)
+        self.pStartTrigger = self.START_SOFTWARE
+        self.pStopTrigger = None
+        if self._trigger and self._trigger["Pre"] > 0:
+            lret.value = caio.AioSetAiMemoryType(self._pID, self.pMemoryType)
+            self._ErrorHandler(lret)
+            if lret.value == 0 and "MemorySize" in self._trigger:
+                lret.value = caio.AioSetAiMemorySize(self._pID, self._trigger["MemorySize"])
+                self._ErrorHandler(lret)
+        self._trigger = None
+        return lret.value
+
+    def TriggerCapture(self, smprate:int, chcnt:int, timeout:float=10.0) -> (int,int):
+        ''' トリガー入力メソッド
+                Args:
+                    smprate(int): サンプリングレート(μsec)
+                    chcnt(int): 入力チャンネル数
+                    timeout(float): トリガー・入力完了待ちの上限(sec)
+                Returns:
+                    エラーコードとサンプリング数を返す
+                Note:
+                    SetTriggerの設定で入力し、トリガー前後のデータのみをReadで取得する
+                    (結果は各clsChannel/pTimeAxis、時間軸はトリガー位置が0になる)
+                    pre>0の場合はRINGメモリをpre+post分に設定するため、
+                    トリガー前のデータはメモリに残っている分(最大pre)となる
+                    (変更前のメモリサイズは保存し、ClearTriggerで戻す)
+                    タイムアウト時は停止し、その時点のデータを取得する
+        '''
+        lret = ctypes.c_long(0)
+        if self._trigger is None:
+            self.pErrorStr = f"[{self.ERR_SETTING}] SetTrigger is not called"
+            return self.ERR_SETTING, 0
+        pre, post = self._trigger["Pre"], self._trigger["Post"]
+        if pre > 0:
+            if "MemorySize" not in self._trigger:
+                size = ctypes.c_long()
+                lret.value = caio.AioGetAiMemorySize(self._pID, ctypes.byref(size))
+                self._ErrorHandler(lret)
+                if lret.value:
+                    return lret.value, 0
+                self._trigger["MemorySize"] = size.value
+            lret.value = caio.AioSetAiMemoryType(self._pID, self.MEMORY_RING)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value, 0
+            lret.value = caio.AioSetAiMemorySize(self._pID, (pre + post) * chcnt)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value, 0
+            lret.value = self.Start(0, smprate, chcnt, self.SAMPLE_ASYNC)
+        else:
+            lret.value = self.Start(post, smprate, chcnt, self.SAMPLE_ASYNC)
+        if lret.value:
+            return lret.value, 0
+        limit = time.perf_counter() + timeout
+        while self.pIsBusy:
+            if time.perf_counter() > limit:
+                self.Stop()
+                break
+            time.sleep(0.001)
+        ret = self.Read()
+        if not isinstance(ret, tuple):      # Readはエラー時にエラーコードのみを返す
+            return ret, 0
+        cnt = ret[1]
+        # トリガー位置を0とした時間軸(pre>0は末尾post数がトリガー後)
+        self.pTimeAxis = self.clsTimeAxis(0.0, self._smplsetting["SamplingClock"] * 1e-6,
+                            -max(0, cnt - post) if pre > 0 else 0, cnt)
+        return ret
+
+    def Pace(self, interval:float, mode:int=PACE_CHUNK, channels=None,
+            timerid:int=0, countid:int=None):
+        ''' タイマー周期読込ジェネレータ
+                Args:
+                    interval(float): 読込周期(sec)
+                    mode(int): PACE_SNAPSHOT|PACE_CHUNK
+                    channels: Snapshotのチャンネル指定(PACE_SNAPSHOTのみ)
+                    timerid(int): 周期に使うタイマー番号
+                    countid(int): 時刻の取得に使うタイマー番号(Noneの場合は周期×回数)
+                Returns:
+                    (タイマーイベント回数, 経過時間(sec), データ)を順次返す
+                    データはPACE_SNAPSHOTではチャンネル毎の値、
+                    PACE_CHUNKでは(チャンネル数, サンプリング数)
+                Note:
+                    ボードのタイマー(AioStartTmTimer)のイベント毎に読込むため、
+                    time.sleepより周期のばらつきが小さい
+                    PACE_CHUNKはStartStreamで連続入力を開始してから使用する
+                    読込が間に合わずイベントを飛ばした場合はpPaceOverrunに加算する
+                    呼出し側でbreakした場合はタイマーを停止する
+        '''
+        lret = ctypes.c_long(0)
+        lap = ctypes.c_long()
+        self._tmtick = 0
+        self._tmevent.clear()
+        self.pPaceOverrun = 0
+        lret.value = caio.AioSetTmCallBackProc(self._pID, timerid, self._tmproc,
+                        caio.TME_INT, None)
+        self._ErrorHandler(lret)
+        if lret.value:
+            return
+        if countid is not None:
+            lret.value = caio.AioStartTmCount(self._pID, countid)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return
+        lret.value = caio.AioStartTmTimer(self._pID, timerid, interval * 1000.0)   # msec
+        self._ErrorHandler(lret)
+        if lret.value:
+            return
+        last = 0
+        try:
+            while True:
+                if not self._tmevent.wait(interval * 4):
+                    break       # タイマーイベントが来ない
+                self._tmevent.clear()
+                tick = self._tmtick
+                if tick - last > 1:
+                    self.pPaceOverrun += tick - last - 1
+                last = tick
+                if countid is not None and \
+                        caio.AioLapTmCount(self._pID, countid, ctypes.byref(lap)) == 0:
+                    elapsed = lap.value * self.TM_UNIT
+                else:
+                    elapsed = tick * interval
+                if mode == self.PACE_SNAPSHOT:
+                    ret, data = self.Snapshot(channels)
+                else:
+                    busy = self.pIsBusy
+                    ret, data = self.ReadChunk()
+                if ret:
+                    break
+                yield tick, elapsed, data
+                if mode == self.PACE_CHUNK and not busy:
+                    break
+        finally:
+            caio.AioStopTmTimer(self._pID, timerid)
+            if countid is not None:
+                caio.AioStopTmCount(self._pID, countid)
+
+    def Wait(self, sec:float, timerid:int=0) -> int:
+        ''' タイマー待機メソッド
+                Args:
+                    sec(float): 待機時間(sec)
+                    timerid(int): タイマー番号
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー(タイマー非対応ボード、time.sleepで待機済)
+                Note:
+                    AioTmWaitでボードのタイマーにより待機する(TM_UNIT単位)
+                    一度エラーになったボードは以降time.sleepで待機する(エラー表示なし)
+        '''
+        lret = ctypes.c_long(0)
+        if self._tmwait:
+            lret.value = caio.AioTmWait(self._pID, timerid, max(1, round(sec / self.TM_UNIT)))
+            if lret.value == 0:
+                return lret.value
+            self._ErrorHandler(lret)
+            self._tmwait = False
+        else:
+            lret.value = self._tmwaiterr
+        time.sleep(sec)
+        self._tmwaiterr = lret.value
+        return lret.value
+
+    def Metrics(self) -> dict:
+        ''' 計測値取得メソッド
+                Args:
+                Returns:
+                    {"Capture":1回分, "Total":累計}の計測値のコピー
+                Note:
+                    Requested:要求サンプリング数/Actual:取得サンプリング数
+                    Missing:Requested-Actual(連続入力では0扱い)
+                    OverflowErr/ClockErr/AiErr/DriverErr:ステータスエラー発生回数
+                    CallErr:ドライバ関数のエラー回数/Lost:上書きで失われた数
+                    MaxFill:最大メモリ使用率/ReadLatency*:読込時間(sec)
+        '''
+        snap = {}
+        for key, m in self._metrics.items():
+            snap[key] = dict(m)
+            snap[key]["Missing"] = max(0, m["Requested"] - m["Actual"]) if m["Requested"] else 0
+            snap[key]["ReadLatencyAve"] = m["ReadLatencySum"] / m["Reads"] if m["Reads"] else 0.0
+        return snap
+
+    def DumpMetrics(self, path:str, prefix:str="clsad") -> str:
+        ''' 計測値ファイル出力メソッド
+                Args:
+                    path(str): 出力ファイル名(Prometheusテキスト形式)
+                    prefix(str): メトリクス名の接頭辞
+                Returns:
+                    出力した文字列
+                Note:
+                    node_exporterのtextfileコレクタ用に一時ファイル経由で置き換える
+                    scopeラベル:capture(1回分)|total(累計)
+        '''
+        labels = f'device="{self._deviceName}",board="{self.pName}"'
+        lines = []
+        for name, mtype in self._METRICS_TYPE.items():
+            key = name.lower()
+            lines.append(f"# TYPE {prefix}_{key} {mtype}")
+            for scope, m in self.Metrics().items():
+                lines.append(f'{prefix}_{key}{{{labels},scope="{scope.lower()}"}} {m[name]}')
+        buf = "\n".join(lines) + "\n"
+        tmp = path + ".tmp"
+        with open(tmp, "w") as file:
+            file.write(buf)
+        os.replace(tmp, path)
+        return buf
+
+    @property
+    def pReadInterval(self) -> float:
+        ''' 読込周期(sec)
+                Args:
+                Returns: float
+                Note:
+                    Scheduleで設定し、ReadChunk毎にメモリ使用率で調整される
+        '''
+        return self._schedule["Interval"]
+
     def SetRange(self) -> int:
         ''' レンジ設定メソッド
                 Args: 
@@ -420,6 +1210,285 @@ class clsAD:
             if lret.value:
                 return lret.value
         self._initialized = True
+        self._snapcoef = None       # 数値変換係数を再計算させる
+        return lret.value
+
+    def Snapshot(self, channels=None, mode:int=SNAP_VALUE) -> (int,np.ndarray):
+        ''' 即時入力メソッド
+                Args:
+                    channels: 入力チャンネル数(int)またはチャンネル番号のlist
+                                Noneの場合は全チャンネル
+                    mode(int): SNAP_RAW|SNAP_VALUE|SNAP_VOLT
+                Returns:
+                    エラーコードとチャンネル毎の値のnp.ndarrayを返す
+                Note:
+                    AioMultiAi/AioMultiAiExを1回だけ呼び、全チャンネルの現在値を取得する
+                    (チャンネル番号指定時は最大番号までを取得して抽出)
+                    出力配列はキャッシュし、呼出し毎に確保しない
+                    pMin/pMax/pOffsetを変更した場合はSetRangeを呼び直すこと
+                    変換動作中(Start～)は使用できない
+                    チャンネルがpMaxChannelの範囲外の場合はERR_SETTING
+        '''
+        lret = ctypes.c_long(0)
+        if channels is None:
+            chcnt, index = self.pMaxChannel, None
+        elif isinstance(channels, int):
+            chcnt, index = channels, None
+        else:
+            index = np.asarray(channels, dtype=np.intp)
+            chcnt = int(index.max()) + 1 if index.size and index.min() >= 0 else 0
+        if not 0 < chcnt <= self.pMaxChannel:
+            self.pErrorStr = f"[{self.ERR_SETTING}] Snapshot channels out of range: {channels}"
+            return self.ERR_SETTING, np.empty(0)
+        if self._snapraw is None:
+            self._snapraw = (ctypes.c_long * self.pMaxChannel)()
+            self._snapex = (ctypes.c_float * self.pMaxChannel)()
+        if mode == self.SNAP_VOLT:
+            lret.value = caio.AioMultiAiEx(self._pID, chcnt, self._snapex)
+            out = np.ctypeslib.as_array(self._snapex)[:chcnt]
+        else:
+            lret.value = caio.AioMultiAi(self._pID, chcnt, self._snapraw)
+            out = np.ctypeslib.as_array(self._snapraw)[:chcnt]
+        if lret.value:      # 正常時はエラー文字列を取得しない(高速化)
+            self._ErrorHandler(lret)
+            return lret.value, np.empty(0)
+        if mode == self.SNAP_VALUE:
+            if self._snapcoef is None:
+                self._snapcoef = self._valueCoef()
+            out = out * self._snapcoef[0, :chcnt] + self._snapcoef[1, :chcnt]
+        if index is not None:
+            return lret.value, out[index]
+        return lret.value, out.copy() if mode != self.SNAP_VALUE else out
+
+    def ToValue(self, data:np.ndarray, channels:list=None) -> np.ndarray:
+        ''' 数値変換メソッド
+                Args:
+                    data(np.ndarray): (チャンネル数, ...)のデジタル値
+                    channels(list): dataの各行のチャンネル番号(Noneの場合はch0から順)
+                Returns:
+                    数値(pMin/pMax/pOffset)のnp.ndarray(float64)
+                Note:
+                    ReadChunk/Stream等で得たブロックを全チャンネル一括で変換する
+        '''
+        if self._snapcoef is None:
+            self._snapcoef = self._valueCoef()
+        index = np.arange(data.shape[0]) if channels is None else np.asarray(channels)
+        shape = (index.size,) + (1,) * (data.ndim - 1)
+        return data * self._snapcoef[0, index].reshape(shape) + self._snapcoef[1, index].reshape(shape)
+
+    def _valueCoef(self) -> np.ndarray:
+        ''' 数値変換係数取得メソッド
+                Args:
+                Returns:
+                    [[傾き...], [切片...]]のnp.ndarray(2, 最大チャンネル数)
+                Note:
+                    clsChannel._toValueと同じ変換をチャンネル一括で行うための係数
+        '''
+        coef = np.empty((2, self.pMaxChannel))
+        for i, c in enumerate(self.pCh):
+            coef[0, i] = (c.pMax - c.pMin) / (2 ** c.pResolution)
+            coef[1, i] = c.pMin + c.pOffset
+        return coef
+
+    def LoadADset(self, dbf:str) -> int:
+        ''' チャンネル設定読込メソッド
+                Args:
+                    dbf(str): SQLiteファイル名(ADsetテーブル)
+                Returns:
+                    読み込んだチャンネル数
+                Note:
+                    ADsetの name/range/valueMin/valueMax/offset/format/unit を
+                    各clsChannelに設定する(ボードへのレンジ設定はSetRange)
+        '''
+        c = 0
+        con = sqlite3.connect(dbf)
+        with con:
+            sql = "SELECT * FROM ADset ORDER BY ch"
+            for rec in con.execute(sql):
+                if rec[0] >= self.pMaxChannel:      # ボード(再生ファイル)に無いチャンネル
+                    continue
+                ch = self.pCh[rec[0]]
+                ch.pName, ch.pRange, ch.pMin, ch.pMax, ch.pOffset, ch.pFormat, ch.pUnit = rec[1:8]
+                c += 1
+        con.close()
+        return c
+
+    def ChannelConfig(self, chcnt:int, channels:list=None) -> list:
+        ''' チャンネル設定取得メソッド
+                Args:
+                    chcnt(int): チャンネル数(ch0から順)
+                    channels(list): チャンネル番号のlist(指定した場合はchcntより優先)
+                Returns:
+                    [{channel, name, range, min, max, offset, format, unit, resolution,
+                      scale, intercept}, ...]
+                Note:
+                    共有メモリ/ソケット配信のヘッダ、エクスポート・記録のメタデータ用
+                    数値 = デジタル値 × scale + intercept
+                    呼出し時点の設定の複製なので、後でレンジ等を変えても変わらない
+        '''
+        index = list(range(chcnt)) if channels is None else list(channels)
+        coef = self.ValueCoef(index)
+        return [{
+                "channel":i, "name":c.pName, "range":c.pRange, "min":c.pMin, "max":c.pMax,
+                "offset":c.pOffset, "format":c.pFormat, "unit":c.pUnit,
+                "resolution":c.pResolution,
+                "scale":float(coef[0, k]), "intercept":float(coef[1, k])
+            } for k, (i, c) in enumerate((i, self.pCh[i]) for i in index)]
+
+    @staticmethod
+    def ParseChannels(s:str, chcnt:int) -> list:
+        ''' チャンネル指定解析メソッド
+                Args:
+                    s(str): チャンネル指定(exm."0,2,4-7")
+                    chcnt(int): チャンネル数
+                Returns:
+                    チャンネル番号のlist(範囲外は除く)
+                Note:
+        '''
+        chs = []
+        for part in s.replace(" ", "").split(","):
+            if "-" in part:
+                a, b = part.split("-", 1)
+                if a.isdecimal() and b.isdecimal():
+                    chs.extend(range(int(a), int(b) + 1))
+            elif part.isdecimal():
+                chs.append(int(part))
+        return [c for c in chs if c < chcnt]
+
+    def ValueCoef(self, channels:list=None) -> np.ndarray:
+        ''' 数値変換係数取得メソッド
+                Args:
+                    channels(list): チャンネル番号のlist(Noneの場合は全チャンネル)
+                Returns:
+                    [[傾き...], [切片...]]のnp.ndarray(2, チャンネル数)の複製
+                Note:
+                    数値 = デジタル値 × 傾き + 切片(ToValueと同じ変換)
+        '''
+        if self._snapcoef is None:
+            self._snapcoef = self._valueCoef()
+        if channels is None:
+            return self._snapcoef.copy()
+        return self._snapcoef[:, list(channels)]
+
+    def SetDigitalFilter(self, ftype:int, value:int, channels:list=None) -> int:
+        ''' ハードウェアデジタルフィルタ設定メソッド
+                Args:
+                    ftype(int): フィルタ種別(デバイス毎に異なる/0:なし)
+                    value(int): フィルタ設定値
+                    channels(list): 設定するチャンネル番号のlist
+                                Noneの場合は全チャンネル
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー(未対応のデバイスを含む)
+                Note:
+                    エラーの場合はclsFilterでソフトウェア処理する
+        '''
+        lret = ctypes.c_long(0)
+        for i in (channels if channels is not None else range(self.pMaxChannel)):
+            lret.value = caio.AioSetAiDigitalFilter(self._pID, i, ftype, value)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+        return lret.value
+
+    def GetDigitalFilter(self, channel:int) -> (int,int,int):
+        ''' ハードウェアデジタルフィルタ取得メソッド
+                Args:
+                    channel(int): チャンネル番号
+                Returns:
+                    エラーコード、フィルタ種別、フィルタ設定値を返す
+                Note:
+        '''
+        lret = ctypes.c_long(0)
+        ftype = ctypes.c_short()
+        value = ctypes.c_short()
+        lret.value = caio.AioGetAiDigitalFilter(self._pID, channel, ctypes.byref(ftype), ctypes.byref(value))
+        self._ErrorHandler(lret)
+        return lret.value, ftype.value, value.value
+
+    def SetClock(self, clktype:int=None, edge:int=None, scan:float=None) -> int:
+        ''' クロック設定メソッド
+                Args:
+                    clktype(int): CLOCK_INTERNAL|CLOCK_EXTERNAL|CLOCK_ECU(Noneは変更なし)
+                    edge(int): EDGE_RISE|EDGE_FALL、外部クロックの有効エッジ(Noneは変更なし)
+                    scan(float): スキャンクロック(μsec、チャンネル間の変換間隔)
+                                0.0の場合はドライバ既定値(Noneは変更なし)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    スキャンクロックはpMinScanClock未満を設定できない
+                    サンプリングレートとの整合はStart時に検証する
+        '''
+        lret = ctypes.c_long(0)
+        if scan is not None:
+            if 0.0 < scan < self.pMinScanClock:
+                self.pErrorStr = f"[{self.ERR_SETTING}] scan clock {scan} < {self.pMinScanClock} usec"
+                return self.ERR_SETTING
+            if scan > 0.0:
+                lret.value = caio.AioSetAiScanClock(self._pID, scan)
+                self._ErrorHandler(lret)
+                if lret.value:
+                    return lret.value
+            self.pScanClock = scan
+        if edge is not None:
+            lret.value = caio.AioSetAiClockEdge(self._pID, edge)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+            self.pClockEdge = edge
+        if clktype is not None:
+            lret.value = caio.AioSetAiClockType(self._pID, clktype)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+            self.pClockType = clktype
+        return lret.value
+
+    def FastestRate(self, chcnt:int, scan:float=0.0) -> float:
+        ''' 最速サンプリングレート取得メソッド
+                Args:
+                    chcnt(int): 入力チャンネル数
+                    scan(float): スキャンクロック(μsec、0.0の場合はpMinScanClock)
+                Returns:
+                    設定可能な最短のサンプリングレート(μsec)
+                    取得できない場合は0.0
+                Note:
+                    1サンプリングで全チャンネルを変換するため、チャンネル数×スキャンクロック以上
+                    ドライバに仮設定して読み戻し、クロック分解能で丸めた値を返す
+                    (変換中は使用できない、Start時に改めて設定される)
+        '''
+        scan = scan if scan > 0.0 else max(self.pScanClock, self.pMinScanClock)
+        rate = chcnt * scan
+        if rate <= 0.0:
+            return 0.0
+        clk = ctypes.c_float()
+        if caio.AioSetAiSamplingClock(self._pID, rate) or \
+                caio.AioGetAiSamplingClock(self._pID, ctypes.byref(clk)):
+            return 0.0
+        return max(clk.value, rate)     # 丸めで短くなった場合は計算値
+
+    def SetTransfer(self, mode:int, bufcnt:int=0) -> int:
+        ''' 転送方式設定メソッド
+                Args:
+                    mode(int): TRANSFER_DEVICEBUFFER|TRANSFER_USERBUFFER
+                    bufcnt(int): ユーザーバッファのサンプリング数
+                                0の場合はStart時のサンプリング数
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    ユーザーバッファモードではStart時にページ境界に揃えた
+                    np.ndarrayをドライバに登録し、ドライバから直接転送させる
+                    連続入力の場合はpMemoryTypeをMEMORY_RINGにしておく
+        '''
+        lret = ctypes.c_long(0)
+        lret.value = caio.AioSetAiTransferMode(self._pID, mode)
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        self.pTransfer = mode
+        self.pUserBufferCount = bufcnt
         return lret.value
 
     @property
@@ -539,7 +1608,7 @@ class clsAD:
                 lret.value = caio.AioQueryDeviceName (i,deviceName ,device )
                 i += 1
                 if lret.value:
-                    self._ErrorHandler(lret)
+                    self._ErrorHandler(lret, False)     # 列挙の終わり(エラー回数に含めない)
                 elif deviceName.value.decode('sjis') == devnm:
                     self.pName = device.value.decode('sjis')
                     break
@@ -571,14 +1640,182 @@ class clsAD:
                 self.pCh[i] = self.clsChannel(i)
                 self.pCh[i].pResolution = self._reso.value
 
-        # クロック種別(内部クロック固定)
-        lret.value = caio.AioSetAiClockType(self._pID, self.CLOCK_INTERNAL)
+        # スキャンクロックの既定値(下限として使用)
+        scan = ctypes.c_float()
+        if caio.AioGetAiScanClock(self._pID, ctypes.byref(scan)) == 0 and self.pMinScanClock == 0.0:
+            self.pMinScanClock = scan.value
+        # クロック種別(Default 内部クロック)
+        lret.value = caio.AioSetAiClockType(self._pID, self.pClockType)
         self._ErrorHandler(lret)
         if lret.value:
             return lret.value
 
         return lret.value
 
+    def _checkClock(self, smprate:float, chcnt:int) -> int:
+        ''' クロック設定検証メソッド
+                Args:
+                    smprate(float): サンプリングレート(μsec)
+                    chcnt(int): 入力チャンネル数
+                Returns:
+                    エラーコード(0|ERR_SETTING)
+                Note:
+                    内部クロックではサンプリングレートがチャンネル数×スキャンクロック以上であること
+                    外部クロック/イベントコントローラではサンプリングレートは参照されない
+                    ドライバには設定しない(下限は計算値、FastestRateは使わない)
+        '''
+        scan = self.pScanClock if self.pScanClock > 0.0 else self.pMinScanClock
+        if self.pScanClock > 0.0 and self.pScanClock < self.pMinScanClock:
+            self.pErrorStr = f"[{self.ERR_SETTING}] scan clock {self.pScanClock} < {self.pMinScanClock} usec"
+            return self.ERR_SETTING
+        if self.pClockType == self.CLOCK_INTERNAL and scan > 0.0 and smprate < chcnt * scan:
+            self.pErrorStr = (f"[{self.ERR_SETTING}] sampling rate {smprate} < "
+                    f"{chcnt} ch x {scan} usec (minimum {chcnt * scan} usec)")
+            return self.ERR_SETTING
+        return 0
+
+    def _setUserBuffer(self, smpcnt:int, chcnt:int) -> int:
+        ''' ユーザーバッファ登録メソッド
+                Args:
+                    smpcnt(int): サンプリング数
+                    chcnt(int): 入力チャンネル数
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    ページ境界に揃えたint32(c_long)配列を確保し、
+                    AioSetAiTransferData/AioSetAiAttachedDataで登録する
+                    同じ大きさのバッファは再利用する
+        '''
+        lret = ctypes.c_long(0)
+        bufcnt = self.pUserBufferCount if self.pUserBufferCount > 0 else smpcnt
+        if self._userbuf is None or self._userbuf.shape != (bufcnt, chcnt):
+            itemsize = ctypes.sizeof(ctypes.c_long)
+            nbytes = bufcnt * chcnt * itemsize
+            self._userbufraw = np.empty(nbytes + mmap.PAGESIZE, dtype=np.uint8)
+            offset = -self._userbufraw.ctypes.data % mmap.PAGESIZE
+            self._userbuf = self._userbufraw[offset:offset + nbytes].view(np.int32).reshape(bufcnt, chcnt)
+        self._userpos = 0
+        self._userlost = 0
+        # 付属データなし(チャンネルデータのみ)
+        lret.value = caio.AioSetAiAttachedData(self._pID, 0)
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        lret.value = caio.AioSetAiTransferData(self._pID, bufcnt * chcnt,
+                        self._userbuf.ctypes.data_as(ctypes.POINTER(ctypes.c_long)))
+        self._ErrorHandler(lret)
+        return lret.value
+
+    # 計測値の種類(Prometheusのメトリクス型)
+    _METRICS_TYPE:dict = {
+        "Captures":"counter", "Requested":"counter", "Actual":"counter", "Missing":"gauge",
+        "Reads":"counter", "Lost":"counter", "OverflowErr":"counter", "ClockErr":"counter",
+        "AiErr":"counter", "DriverErr":"counter", "CallErr":"counter", "MaxFill":"gauge",
+        "ReadLatencyMax":"gauge", "ReadLatencyAve":"gauge", "ReadLatencySum":"counter"
+    }
+    # ステータスビットと計測値の対応
+    _STATUS_METRICS:dict = {
+        caio.AIS_OFERR:"OverflowErr", caio.AIS_SCERR:"ClockErr",
+        caio.AIS_AIERR:"AiErr", caio.AIS_DRVERR:"DriverErr"
+    }
+
+    @staticmethod
+    def _newMetrics() -> dict:
+        ''' 計測値初期化メソッド
+                Args:
+                Returns:
+                    0で初期化した計測値dict
+                Note:
+        '''
+        return {
+                "Captures":0, "Requested":0, "Actual":0, "Reads":0, "Lost":0,
+                "OverflowErr":0, "ClockErr":0, "AiErr":0, "DriverErr":0, "CallErr":0,
+                "MaxFill":0.0, "ReadLatencyMax":0.0, "ReadLatencySum":0.0
+            }
+
+    def _updateMetrics(self, cnt:int, latency:float, fill:float=None):
+        ''' 計測値更新メソッド
+                Args:
+                    cnt(int): 今回取得したサンプリング数
+                    latency(float): 今回の読込時間(sec)
+                    fill(float): 読込前のメモリ使用率(Noneの場合は連続入力の読込周期調整の値)
+                Returns:
+                Note:
+                    ADステータスを1回だけ取得し、新たに立ったエラービットを数える
+        '''
+        lret = ctypes.c_long(0)
+        lret.value = caio.AioGetAiStatus(self._pID, ctypes.byref(self._status))
+        self._ErrorHandler(lret)
+        status = self._status.value if lret.value == 0 else self._laststatus
+        rising = status & ~self._laststatus
+        self._laststatus = status
+        fill = self._schedule["Fill"] if fill is None else fill
+        for m in self._metrics.values():
+            m["Reads"] += 1
+            m["Actual"] += cnt
+            m["ReadLatencySum"] += latency
+            m["ReadLatencyMax"] = max(m["ReadLatencyMax"], latency)
+            m["MaxFill"] = max(m["MaxFill"], fill)
+            for bit, key in self._STATUS_METRICS.items():
+                if rising & bit:
+                    m[key] += 1
+
+    def _timeAxis(self, index:int, count:int):
+        ''' 時間軸生成メソッド
+                Args:
+                    index(int): 先頭のサンプリング番号
+                    count(int): サンプリング数
+                Returns:
+                    clsTimeAxis
+                Note:
+                    周期はAioGetAiSamplingClockで取得した値(μsec)
+        '''
+        return self.clsTimeAxis(self._smplsetting["StartTime"],
+                    self._smplsetting["SamplingClock"] * 1e-6, index, count)
+
+    def _adjustSchedule(self, fill:float):
+        ''' 読込周期調整メソッド
+                Args:
+                    fill(float): 読込前のメモリ使用率(0.0~1.0)
+                Returns:
+                Note:
+                    使用率が1/2を超えたら周期を半分にし(下限1msec)、
+                    1/4未満なら目標遅延時間まで周期を延ばす
+                    オーバーフロー(AIS_OFERR)前に読込を間に合わせるため
+        '''
+        sch = self._schedule
+        sch["Fill"] = fill
+        if fill > sch["MaxFill"]:
+            sch["MaxFill"] = fill
+        if fill > 0.5:
+            sch["Interval"] = max(0.001, sch["Interval"] * 0.5)
+        elif fill < 0.25:
+            sch["Interval"] = min(sch["Latency"], sch["Interval"] * 1.25)
+
+    def _aiCallBack(self, id, msg, wparam, lparam, param):
+        ''' A/Dイベントコールバック
+                Args:
+                    id, msg, wparam, lparam, param: caio.PAIO_AI_CALLBACK
+                Returns:
+                Note:
+                    ドライバのスレッドから呼ばれるため、通知のみ行う
+        '''
+        if msg in (caio.AIOM_AIE_RPTEND, caio.AIOM_AIE_END):
+            self._aievent.set()
+
+    def _tmCallBack(self, id, msg, wparam, lparam, param):
+        ''' タイマーイベントコールバック
+                Args:
+                    id, msg, wparam, lparam, param: caio.PAIO_TM_CALLBACK
+                Returns:
+                Note:
+                    ドライバのスレッドから呼ばれるため、回数の加算と通知のみ行う
+        '''
+        if msg == caio.AIOM_TME_INT:
+            self._tmtick += 1
+            self._tmevent.set()
+
     def _GetStatus(self, stat:int) -> bool:
         ''' A/Dステータス取得メソッド
                 Args: 
@@ -600,10 +1837,11 @@ class clsAD:
         self._ErrorHandler(lret)
         return (self._status.value & stat) != 0
         
-    def _ErrorHandler(self, ecode:ctypes.c_long) -> str:
+    def _ErrorHandler(self, ecode:ctypes.c_long, count:bool=True) -> str:
         ''' エラー文字列取得メソッド
                 Args: 
                     ecode(ctypes.c_long): エラーコード
+                    count(bool): 偽の場合はCallErrに数えない(失敗が想定される問合せ)
                 Returns: 
                     エラー文字列
                 Note: 
@@ -614,5 +1852,8 @@ class clsAD:
         self.pErrorStr = f"[{ecode.value}] {error_buf.value.decode('sjis')}"
         if ecode.value != 0:
             print(self.pErrorStr, file=sys.stderr)
+            if count:
+                for m in self._metrics.values():
+                    m["CallErr"] += 1
         return self.pErrorStr
 
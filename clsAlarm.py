@@ -0,0 +1,179 @@
+# coding : utf-8
+import sqlite3
+
+import numpy as np
+
+# 警報イベント(Processの戻り値)
+EVENT = np.dtype([
+    ("ch", "<u2"),                      # チャンネル番号
+    ("kind", "u1"),                     # ALARM_HIGH|ALARM_LOW|ALARM_RATE
+    ("active", "?"),                    # 真:発生/偽:解除
+    ("index", "<i8"),                   # サンプリング番号(変換開始からの通し番号)
+    ("time", "<f8"),                    # 時刻(time.time()、時間軸なしはNaN)
+    ("value", "<f8"),                   # その時の値(ALARM_RATEは変化率/sec)
+])
+
+class clsAlarm:
+    ''' clsAlarm 警報判定クラス
+            Note:
+                (チャンネル数, サンプリング数)の数値ブロックを全チャンネル一括で判定する
+                上限・下限はヒステリシス付き(発生:限界値超過、解除:限界値からヒステリシス分戻る)
+                変化率は前サンプリングとの差分/周期の絶対値で判定する
+                チャンネル毎の警報状態と最終値をブロック間で引き継ぐため、
+                分割して処理しても一括処理と同じイベントになる
+                判定しない項目はNaN(ADalarmではNULL)
+    '''
+
+    # 警報種別
+    ALARM_HIGH:int = 0              # 上限
+    ALARM_LOW:int = 1               # 下限
+    ALARM_RATE:int = 2              # 変化率
+
+    def __init__(self, chcnt:int):
+        ''' clsAlarm コンストラクタ
+                Args:
+                    chcnt(int): チャンネル数
+                Returns:
+                Note:
+        '''
+        # public property
+        self.pChannelCount:int = chcnt
+        self.pHigh:np.ndarray = np.full(chcnt, np.nan)      # 上限値
+        self.pLow:np.ndarray = np.full(chcnt, np.nan)       # 下限値
+        self.pRate:np.ndarray = np.full(chcnt, np.nan)      # 変化率の上限(/sec、絶対値)
+        self.pHysteresis:np.ndarray = np.zeros(chcnt)       # ヒステリシス(数値)
+        self.pActive:np.ndarray = None                      # 警報状態(3, チャンネル数) 種別順
+        # private property
+        self._last:np.ndarray = None                # 前ブロックの最終値
+        self._index:int = 0                         # 時間軸なしの場合のサンプリング番号
+        self.Reset()
+
+    def Reset(self):
+        ''' 状態リセットメソッド
+                Args:
+                Returns:
+                Note:
+                    ストリームの切れ目(再Start等)で呼ぶ
+        '''
+        self.pActive = np.zeros((3, self.pChannelCount), dtype=bool)
+        self._last = None
+        self._index = 0
+
+    def SetLimit(self, ch:int, high:float=None, low:float=None, rate:float=None,
+            hysteresis:float=0.0):
+        ''' 限界値設定メソッド
+                Args:
+                    ch(int): チャンネル番号
+                    high(float): 上限値(Noneは判定しない)
+                    low(float): 下限値(Noneは判定しない)
+                    rate(float): 変化率の上限(/sec、Noneは判定しない)
+                    hysteresis(float): ヒステリシス(数値)
+                Returns:
+                Note:
+        '''
+        self.pHigh[ch] = np.nan if high is None else high
+        self.pLow[ch] = np.nan if low is None else low
+        self.pRate[ch] = np.nan if rate is None else rate
+        self.pHysteresis[ch] = hysteresis
+
+    def LoadLimits(self, dbf:str) -> int:
+        ''' 限界値読込メソッド
+                Args:
+                    dbf(str): SQLiteファイル名(ADalarmテーブル、ADsetと同じファイル)
+                Returns:
+                    読み込んだチャンネル数(テーブルが無い場合は0)
+                Note:
+                    ADalarmの high/low/rate/hysteresis (NULLは判定しない)
+                    テーブル定義はalarmCre.sql
+        '''
+        c = 0
+        con = sqlite3.connect(dbf)
+        with con:
+            try:
+                recs = con.execute("SELECT ch, high, low, rate, hysteresis FROM ADalarm ORDER BY ch").fetchall()
+            except sqlite3.OperationalError:
+                recs = []
+            for ch, high, low, rate, hyst in recs:
+                if ch < self.pChannelCount:
+                    self.SetLimit(ch, high, low, rate, hyst or 0.0)
+                    c += 1
+        con.close()
+        return c
+
+    def Process(self, values:np.ndarray, axis=None) -> np.ndarray:
+        ''' 警報判定メソッド
+                Args:
+                    values(np.ndarray): (チャンネル数, サンプリング数)の数値
+                    axis(clsAD.clsTimeAxis): ブロックの時間軸(clsAD.pTimeAxis)
+                                Noneの場合は変化率を判定せず、時刻はNaN
+                Returns:
+                    発生・解除イベントのnp.ndarray(EVENT)、サンプリング番号順
+                Note:
+                    比較はnp.ndarrayのマスクで全チャンネル・全サンプリングを一括で行う
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        ch, n = values.shape
+        if n == 0:
+            return np.empty(0, dtype=EVENT)
+        index0 = axis.pIndex if axis is not None else self._index
+        hyst = self.pHysteresis[:ch, None]
+        high, low = self.pHigh[:ch, None], self.pLow[:ch, None]
+        kinds = [
+            (self.ALARM_HIGH, values, values > high, values < high - hyst),
+            (self.ALARM_LOW, values, values < low, values > low + hyst),
+        ]
+        if axis is not None and axis.pPeriod > 0:
+            prev = values[:, :1] if self._last is None else self._last[:ch, None]
+            rate = np.diff(values, axis=1, prepend=prev) / axis.pPeriod
+            over = np.abs(rate) > self.pRate[:ch, None]
+            if self._last is None:
+                over[:, 0] = False          # 先頭は前値が無い
+            kinds.append((self.ALARM_RATE, rate, over, ~over))
+        events = []
+        for kind, src, on, off in kinds:
+            state = self._state(self.pActive[kind, :ch], on, off)
+            # 状態変化の位置(前ブロックの最終状態との比較を含む)
+            change = np.diff(state, axis=1)
+            c, i = np.nonzero(change)
+            self.pActive[kind, :ch] = state[:, -1]
+            if c.size:
+                ev = np.empty(c.size, dtype=EVENT)
+                ev["ch"] = c
+                ev["kind"] = kind
+                ev["active"] = state[c, i + 1]
+                ev["index"] = index0 + i
+                ev["value"] = src[c, i]
+                events.append(ev)
+        self._last = values[:, -1].copy()
+        self._index = index0 + n
+        if not events:
+            return np.empty(0, dtype=EVENT)
+        ev = np.concatenate(events)
+        ev = ev[np.argsort(ev["index"], kind="stable")]
+        if axis is not None:
+            ev["time"] = axis.pStartTime + ev["index"] * axis.pPeriod
+        else:
+            ev["time"] = np.nan
+        return ev
+
+    @staticmethod
+    def _state(init:np.ndarray, on:np.ndarray, off:np.ndarray) -> np.ndarray:
+        ''' ヒステリシス状態計算メソッド
+                Args:
+                    init(np.ndarray): ブロック前の状態(チャンネル数,)
+                    on(np.ndarray): 発生条件(チャンネル数, サンプリング数)
+                    off(np.ndarray): 解除条件(チャンネル数, サンプリング数)
+                Returns:
+                    先頭に前状態を加えた状態(チャンネル数, サンプリング数+1)
+                Note:
+                    発生・解除条件の成立したサンプリングで状態を決め、
+                    どちらも成立しない間は直前の状態を保持する
+                    (直前の確定位置をmaximum.accumulateで求める前方補完)
+        '''
+        ch, n = on.shape
+        mark = np.empty((ch, n + 1), dtype=np.int8)
+        mark[:, 0] = init
+        mark[:, 1:] = np.where(on, 1, np.where(off, 0, -1))
+        pos = np.where(mark >= 0, np.arange(n + 1), 0)
+        np.maximum.accumulate(pos, axis=1, out=pos)
+        return np.take_along_axis(mark, pos, axis=1).astype(bool)
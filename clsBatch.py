@@ -0,0 +1,237 @@
+# coding : utf-8
+import os
+import sys
+import csv
+import time
+import queue
+import sqlite3
+import threading
+
+import numpy as np
+
+import clsReplay
+import clsExport
+import clsRecord
+import clsCodec
+
+class clsBatch:
+    ''' clsBatch 一括入力クラス
+            Note:
+                ジョブ表(ADjobテーブルまたはCSV)のジョブを1回のOpenで順に実行する
+                前のジョブとレンジが同じ場合はレンジ設定(SetRange)を省略する
+                ファイル出力は別スレッドで行い、ジョブNの出力中にジョブN+1を入力する
+                ジョブ毎の時間と結果はADjoblogテーブルに記録する(テーブル定義はbatchCre.sql)
+    '''
+
+    def __init__(self, cAD, dbf:str, jobs:str=None):
+        ''' clsBatch コンストラクタ
+                Args:
+                    cAD(clsAD): オープン済・ADset設定済のclsAD
+                    dbf(str): SQLiteファイル名(ADjob/ADjoblog)
+                    jobs(str): ジョブ表のCSVファイル名(Noneの場合はADjobテーブル)
+                                列はADjobと同じ(id,count,rate,channels,ranges,output)
+                Returns:
+                Note:
+        '''
+        # public property
+        self.pErrorStr:str = ""
+        self.pResults:list = []                     # ジョブ毎の結果dict(ADjoblogと同じ項目)
+        # private property
+        self._ad = cAD
+        self._dbf:str = dbf
+        self._jobs:str = jobs
+        self._queue = queue.Queue(maxsize=2)        # 出力待ち(入力側が先行しすぎないよう制限)
+        self._ranges:dict = {}                      # 直前に設定したレンジ
+
+    def Load(self) -> list:
+        ''' ジョブ表読込メソッド
+                Args:
+                Returns:
+                    未実行のジョブdictのlist(id順)
+                Note:
+                    ADjobはdone=0のもののみ
+        '''
+        if self._jobs is not None:
+            with open(self._jobs, newline="") as file:
+                jobs = [dict(r) for r in csv.DictReader(file)]
+            for j in jobs:
+                j["id"], j["count"], j["rate"] = int(j["id"]), int(j["count"]), int(j["rate"])
+                j["ranges"] = j.get("ranges") or None
+            return sorted(jobs, key=lambda j: j["id"])
+        con = sqlite3.connect(self._dbf)
+        with con:
+            sql = "SELECT id, count, rate, channels, ranges, output FROM ADjob WHERE done=0 ORDER BY id"
+            jobs = [dict(zip(("id", "count", "rate", "channels", "ranges", "output"), r))
+                    for r in con.execute(sql)]
+        con.close()
+        return jobs
+
+    def Run(self) -> int:
+        ''' 一括実行メソッド
+                Args:
+                Returns:
+                    エラーで終わったジョブ数
+                Note:
+                    入力エラー・ジョブ表の誤りのジョブは記録して次のジョブへ進む
+        '''
+        writer = threading.Thread(target=self._writer, daemon=True)
+        writer.start()
+        ad = self._ad
+        for job in self.Load():
+            res = {"id":job["id"], "start":time.time(), "config":0.0, "acquire":0.0,
+                    "write":0.0, "samples":0, "status":0, "error":""}
+            chs = ad.ParseChannels(job["channels"] or "", ad.pMaxChannel) or [0]
+            self.pErrorStr = ""
+            t0 = time.perf_counter()
+            ret = self._configure(job["ranges"])
+            t1 = time.perf_counter()
+            res["config"] = t1 - t0
+            if ret == 0:
+                ret = ad.Start(job["count"], job["rate"], max(chs) + 1, ad.SAMPLE_ASYNC)
+            if ret == 0:
+                while ad.pIsBusy:
+                    ad.Wait(0.01)
+                ret = ad.Read()
+                ret = ret[0] if isinstance(ret, tuple) else ret
+            res["acquire"] = time.perf_counter() - t1
+            if ret:
+                res["status"], res["error"] = ret, self.pErrorStr or ad.pErrorStr
+                self._queue.put((job, res, None, None))
+                continue
+            data = np.vstack([ad.pCh[i].pData for i in chs])    # 次のReadで上書きされないようコピー
+            res["samples"] = data.shape[1]
+            # 出力中に次のジョブがレンジを変えるため、このジョブの設定を複製して渡す
+            conf = ad.ChannelConfig(0, chs)
+            self._queue.put((job, res, chs, (data, ad.pTimeAxis, conf)))
+        self._queue.put(None)
+        writer.join()
+        return sum(1 for r in self.pResults if r["status"])
+
+    def _configure(self, ranges:str) -> int:
+        ''' レンジ設定メソッド
+                Args:
+                    ranges(str): "ch:range,..."(NoneはADsetのまま)
+                Returns:
+                    エラーコード
+                    書式・チャンネル番号の誤りはclsAD.ERR_SETTING(pErrorStrに内容)
+                Note:
+                    前のジョブと同じ場合はボードに設定しない
+        '''
+        ad = self._ad
+        want = {}
+        for part in (ranges or "").replace(" ", "").split(","):
+            if ":" in part:
+                ch, rng = part.split(":", 1)
+                try:
+                    ch, rng = int(ch), int(rng)
+                except ValueError:
+                    ch = -1
+                if not 0 <= ch < ad.pMaxChannel:
+                    self.pErrorStr = f"[{ad.ERR_SETTING}] invalid ranges: {part}"
+                    return ad.ERR_SETTING
+                want[ch] = rng
+        if want == self._ranges:
+            return 0
+        if self._ranges:                # 前のジョブで変更したレンジをADsetに戻す
+            ad.LoadADset(self._dbf)
+        for ch, rng in want.items():
+            ad.pCh[ch].pRange = rng
+        self._ranges = want
+        return ad.SetRange()
+
+    def _writer(self):
+        ''' 出力スレッド
+                Args:
+                Returns:
+                Note:
+                    .csv:経過時間と数値(チャンネルのpFormat)
+                    .arrow/.arrows/.parquet:数値(clsExport、pyarrowが必要)
+                    .adb:デジタル値の圧縮記録(clsRecord、範囲を指定して読出し可)
+                    .npy/その他:デジタル値(clsReplay形式、replay:で再生可)
+                    ADjoblogに記録し、成功したジョブはADjob.done=1にする
+                    出力の例外はそのジョブのエラー(status=-1)として次のジョブへ進む
+                    (このスレッドが止まると入力側がキュー待ちで止まるため)
+        '''
+        con = sqlite3.connect(self._dbf) if self._jobs is None or os.path.exists(self._dbf) else None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            job, res, chs, payload = item
+            t0 = time.perf_counter()
+            if payload is not None:
+                try:
+                    self._write(job["output"], chs, *payload)
+                except Exception as e:
+                    res["status"], res["error"] = -1, f"{type(e).__name__}: {e}"
+            res["write"] = time.perf_counter() - t0
+            self.pResults.append(res)
+            print(f"job {res['id']}: status={res['status']} samples={res['samples']} "
+                  f"config={res['config']:.3f}s acquire={res['acquire']:.3f}s "
+                  f"write={res['write']:.3f}s {res['error']}", file=sys.stderr)
+            if con is not None:
+                try:
+                    with con:
+                        con.execute("INSERT INTO ADjoblog VALUES(?,?,?,?,?,?,?,?)",
+                            tuple(res[k] for k in ("id", "start", "config", "acquire", "write",
+                                    "samples", "status", "error")))
+                        if res["status"] == 0 and self._jobs is None:
+                            con.execute("UPDATE ADjob SET done=1 WHERE id=?", (res["id"],))
+                except sqlite3.Error as e:
+                    print(f"ADjoblog: {e}", file=sys.stderr)
+        if con is not None:
+            con.close()
+
+    def _write(self, path:str, chs:list, data:np.ndarray, axis, conf:list):
+        ''' ジョブ出力メソッド
+                Args:
+                    path(str): 出力ファイル名
+                    chs(list): チャンネル番号のlist
+                    data(np.ndarray): (チャンネル数, サンプリング数)のデジタル値
+                    axis(clsAD.clsTimeAxis): 時間軸
+                    conf(list): 入力時のチャンネル設定(clsAD.ChannelConfig)
+                Returns:
+                Note:
+                    名称・書式・数値変換はconfによる(cADの現在の設定は使わない)
+        '''
+        ad = self._ad
+        if path.endswith(".csv"):
+            values = data * np.array([c["scale"] for c in conf])[:, None] + \
+                        np.array([c["intercept"] for c in conf])[:, None]
+            t = axis.toArray(relative=True)
+            with open(path, "w") as file:
+                file.write("time," + ",".join(c["name"] for c in conf) + "\n")
+                fmt = ",".join(["{:.6f}"] + [c["format"].replace("{0", "{") for c in conf])
+                file.writelines(fmt.format(*row) + "\n" for row in zip(t, *values))
+        elif path.endswith(".adb"):
+            with clsRecord.clsRecord(ad, path, chs, codec=clsCodec.Best(), config=conf) as rec:
+                rec.Write(data, axis)
+        elif path.endswith((".arrow", ".arrows", ".parquet")):
+            clsExport.Export(ad, path, chs, clsExport.clsExport.DATA_VALUE, data, axis, conf)
+        else:
+            clsReplay.Save(path, data, axis.pPeriod * 1e6, conf[0]["resolution"], axis.pBegin)
+
+def main():
+    ''' 一括実行
+            Args:
+                sys.argv[1]: SQLiteファイル名(Default adtest.db)
+                sys.argv[2]: ジョブ表CSV(省略時はADjobテーブル)
+            Returns:
+            Note:
+                > python clsBatch.py adtest.db
+    '''
+    import clsAD
+    dbf = sys.argv[1] if len(sys.argv) > 1 else "adtest.db"
+    cAD = clsAD.clsAD()
+    if cAD.Open("AIO000"):
+        return
+    cAD.LoadADset(dbf)
+    cAD.SetRange()
+    batch = clsBatch(cAD, dbf, sys.argv[2] if len(sys.argv) > 2 else None)
+    t = time.perf_counter()
+    err = batch.Run()
+    print(f"{len(batch.pResults)} jobs, {err} errors, {time.perf_counter() - t:.3f} sec", file=sys.stderr)
+    cAD.Close()
+
+if __name__ == "__main__":
+    main()
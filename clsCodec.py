@@ -0,0 +1,92 @@
+# coding : utf-8
+import lzma
+import zlib
+
+import numpy as np
+try:
+    import zstandard as _zstd                # あればzstdを使用(任意)
+except ImportError:
+    _zstd = None
+
+# 圧縮方式
+CODEC_NONE:int = 0                      # 無圧縮
+CODEC_ZLIB:int = 1                      # 差分+zlib
+CODEC_LZMA:int = 2                      # 差分+lzma(高圧縮・低速)
+CODEC_ZSTD:int = 3                      # 差分+zstd(zstandardが必要)
+CODEC_NAMES:dict = {CODEC_NONE:"none", CODEC_ZLIB:"zlib", CODEC_LZMA:"lzma", CODEC_ZSTD:"zstd"}
+# 既定の圧縮レベル(入力に追いつく速さを優先)
+_LEVELS:dict = {CODEC_ZLIB:3, CODEC_LZMA:1, CODEC_ZSTD:3}
+
+def Available(codec:int) -> bool:
+    ''' 圧縮方式使用可否関数
+            Args:
+                codec(int): CODEC_*
+            Returns:
+                真の場合は使用可
+            Note:
+    '''
+    return codec in (CODEC_NONE, CODEC_ZLIB, CODEC_LZMA) or (codec == CODEC_ZSTD and _zstd is not None)
+
+def Best() -> int:
+    ''' 使用可能な最速の圧縮方式(zstd、無ければzlib) '''
+    return CODEC_ZSTD if _zstd is not None else CODEC_ZLIB
+
+def Encode(block:np.ndarray, codec:int, level:int=None) -> bytes:
+    ''' ブロック圧縮関数
+            Args:
+                block(np.ndarray): (チャンネル数, サンプリング数)のデジタル値(整数)
+                codec(int): CODEC_*
+                level(int): 圧縮レベル(Noneの場合は既定値)
+            Returns:
+                圧縮したbytes
+            Note:
+                チャンネル毎にサンプリング間の差分を取り(先頭はそのまま)、
+                byte毎に並べ替え(上位byteがほぼ0/0xFFに揃う)てから圧縮する
+                差分は同じbyte数の符号なし整数で桁あふれさせるため可逆
+                ブロック毎に完結するので、ブロック単位で読み出せる
+    '''
+    block = np.ascontiguousarray(block)
+    if codec == CODEC_NONE:
+        return block.tobytes()
+    u = block.view(np.dtype(f"<u{block.dtype.itemsize}"))
+    delta = np.empty_like(u)
+    delta[:, :1] = u[:, :1]
+    np.subtract(u[:, 1:], u[:, :-1], out=delta[:, 1:])
+    planes = delta.view(np.uint8).reshape(-1, block.dtype.itemsize).T.tobytes()
+    level = _LEVELS.get(codec) if level is None else level
+    if codec == CODEC_ZLIB:
+        return zlib.compress(planes, level)
+    if codec == CODEC_LZMA:
+        return lzma.compress(planes, preset=level)
+    if codec == CODEC_ZSTD and _zstd is not None:
+        return _zstd.ZstdCompressor(level=level).compress(planes)
+    raise ValueError(f"codec {codec} is not available")
+
+def Decode(buf:bytes, codec:int, out:np.ndarray) -> np.ndarray:
+    ''' ブロック展開関数
+            Args:
+                buf(bytes): Encodeで圧縮したbytes
+                codec(int): CODEC_*
+                out(np.ndarray): 展開先の(チャンネル数, サンプリング数)のnp.ndarray(C連続)
+            Returns:
+                out
+            Note:
+                差分の累積和をoutへ直接求める(中間の配列はbyte並べ替え分のみ)
+                zlib/lzma/zstdはGILを解放するため、複数ブロックをスレッドで並列に展開できる
+    '''
+    if codec == CODEC_NONE:
+        out.reshape(-1)[:] = np.frombuffer(buf, dtype=out.dtype)
+        return out
+    if codec == CODEC_ZLIB:
+        planes = zlib.decompress(buf)
+    elif codec == CODEC_LZMA:
+        planes = lzma.decompress(buf)
+    elif codec == CODEC_ZSTD and _zstd is not None:
+        planes = _zstd.ZstdDecompressor().decompress(buf, max_output_size=out.nbytes)
+    else:
+        raise ValueError(f"codec {codec} is not available")
+    size = out.dtype.itemsize
+    utype = np.dtype(f"<u{size}")
+    delta = np.frombuffer(planes, dtype=np.uint8).reshape(size, -1).T.copy().view(utype)
+    np.cumsum(delta.reshape(out.shape), axis=1, dtype=utype, out=out.view(utype))
+    return out
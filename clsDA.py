@@ -0,0 +1,588 @@
+# coding : utf-8
+import sys
+import mmap
+import threading
+
+import ctypes
+import ctypes.wintypes
+import caio
+import numpy as np
+
+class clsDA:
+    ''' clsDA D/A出力クラス
+            Note:
+                Contec API-AIO(WDM) Ver.8.50対応
+                波形をnp.ndarrayで生成・一括コード変換し、1回で転送して
+                ハードウェアクロックで出力する
+    '''
+
+    # CONSTs
+    # 転送方式:pTransfer
+    TRANSFER_DEVICEBUFFER:int = 0   # デバイスバッファーモード
+    TRANSFER_USERBUFFER:int = 1     # ユーザーバッファーモード
+    # メモリ形式:pMemoryType
+    MEMORY_FIFO:int = 0             # FIFO
+    MEMORY_RING:int = 1             # RING
+    # クロック種別
+    CLOCK_INTERNAL = 0              # 内部クロック
+    CLOCK_EXTERNAL = 1              # 外部クロック
+    # 繰り返し回数
+    REPEAT_INFINITE:int = 0         # 無限(Stopまで)
+
+    def __init__(self):
+        ''' clsDA コンストラクタ
+                Args:
+                Returns:
+                Note:
+                    Property初期化
+        '''
+        # public property
+        self.pOpened:bool = False                   # オープン済フラグ
+        self.pName:str = ""                         # ボード名称
+        self.pErrorStr:str = ""                     # エラー文字列
+        self.pTransfer:int = self.TRANSFER_DEVICEBUFFER  # 転送方式(デバイスバッファ)
+        self.pMemoryType:int = self.MEMORY_FIFO          # メモリ形式(FIFO)
+        self.pCh:list = []                          # チャンネルクラスリスト
+        self.pMaxChannel:int = 0                    # 最大チャンネル数
+        self._pID = ctypes.c_short()                # デバイスアクセス用ID
+        self._owner:bool = False                    # AioInitした(Close時にAioExitする)
+        self._initialized:bool = False              # CH初期化済フラグ
+        self._status = ctypes.c_long()              # DAステータス
+        self._deviceName:str = ""                   # デバイス名(exm."AIO000")
+        # 出力設定値
+        self._smplsetting:dict = {
+                "ChannelCount":0, "SamplingRate":0.0, "SamplingCount":0, "RepeatCount":1
+            }
+        self._DAdata:np.ndarray = None              # 転送済コード(サンプリング数, チャンネル数)
+        # ユーザーバッファ(ストリーム出力)
+        self._userbuf:np.ndarray = None
+        self._userbufraw:np.ndarray = None
+        self._aoevent = threading.Event()           # D/Aイベント通知
+        self._aoproc = caio.PAIO_AO_CALLBACK(self._aoCallBack)  # コールバック(参照保持)
+
+    class clsChannel():
+        ''' clsChannel D/Aチャンネルクラス
+                Note:
+                    clsAD.clsChannelと同じく.pMin/.pMax/.pOffsetで数値とコードを変換する
+        '''
+        def __init__(self, index:int):
+            ''' clsChannel コンストラクタ
+                    Args:
+                        index(int): チャンネル番号(0~)
+                    Returns:
+                    Note:
+                        Property初期化
+            '''
+            # public property
+            self.pName:str = f"ao{index}"
+            self.pRange:int = 0                 # output range
+            self.pMax:float = 10.0              # max value
+            self.pMin:float = -10.0             # min value
+            self.pOffset:float = 0.0            # value offset
+            self.pUnit:str = "V"                # unit of value
+            self.pResolution:int = 12           # bitwise(12|16)
+            # private property
+            self._index:int = index             # channel number
+
+        def toCode(self, v) -> np.ndarray:
+            ''' コード変換メソッド
+                    Args:
+                        v: 数値(スカラー/np.ndarray)
+                    Returns:
+                        コード(int32)、0~2**pResolution-1に制限
+                    Note:
+                        clsAD.clsChannel._toValueの逆変換
+            '''
+            reso = 2 ** self.pResolution
+            d = (np.asarray(v, dtype=np.float64) - self.pMin - self.pOffset) * (reso / (self.pMax - self.pMin))
+            return np.clip(np.rint(d), 0, reso - 1).astype(np.int32)
+        # end clsChannel
+
+    def Open(self, deviceName:str) -> int:
+        ''' ボードオープンメソッド
+                Args:
+                    deviceName(str): ボードのデバイス名(exm.'AIO000')
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+        '''
+        lret = ctypes.c_long(0)
+        lret.value = caio.AioInit(deviceName.encode(), ctypes.byref(self._pID))
+        self._ErrorHandler(lret)
+        if lret.value == 0:
+            self.pOpened = True
+            self._owner = True
+            self._deviceName = deviceName
+            lret.value = self._initializeDA(deviceName)
+        return lret.value
+
+    def Attach(self, cAD) -> int:
+        ''' オープン済clsADとのID共有メソッド
+                Args:
+                    cAD(clsAD): オープン済のclsAD(同一ボード)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    A/D・D/A一体型ボードで同じIDを使う(Closeはしない)
+        '''
+        self._pID = cAD._pID
+        self.pOpened = cAD.pOpened
+        self.pName = cAD.pName
+        self._deviceName = cAD._deviceName
+        self._initialized = True        # デバイスリセットはclsAD側で済んでいる
+        return self._initializeDA(self._deviceName)
+
+    def Close(self) -> int:
+        ''' ボードクローズメソッド
+                Args:
+                Returns:
+                    エラーコード
+                Note:
+                    Attachした場合はAioExitしない
+        '''
+        lret = ctypes.c_long(0)
+        if self.pOpened and self._owner:
+            lret.value = caio.AioExit(self._pID)
+            self._ErrorHandler(lret)
+        if lret.value == 0:
+            self.pOpened = False
+        return lret.value
+
+    def SetRange(self) -> int:
+        ''' レンジ設定メソッド
+                Args:
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    clsChannel.pRangeをボードに設定
+        '''
+        lret = ctypes.c_long(0)
+        for i in range(self.pMaxChannel):
+            lret.value = caio.AioSetAoRange(self._pID, i, self.pCh[i].pRange)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+        return lret.value
+
+    def SetWaveform(self, values:np.ndarray) -> int:
+        ''' 波形転送メソッド
+                Args:
+                    values(np.ndarray): (チャンネル数, サンプリング数)の数値
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    チャンネル毎に一括でコード変換し、
+                    [ch0_d1, ch1_d1, ..., ch0_d2, ...]の順に並べて1回で転送する
+                    転送前にD/Aメモリをリセットし、
+                    データの並びが変換チャンネル数で解釈されるため先に設定する
+        '''
+        lret = ctypes.c_long(0)
+        values = np.atleast_2d(values)
+        lret.value = caio.AioResetAoMemory(self._pID)
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        lret.value = caio.AioSetAoChannels(self._pID, values.shape[0])
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        codes = self.toCodes(values)
+        lret.value = caio.AioSetAoSamplingData(self._pID, codes.shape[0],
+                        codes.ctypes.data_as(ctypes.POINTER(ctypes.c_long)))
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        self._DAdata = codes
+        self._smplsetting["ChannelCount"] = codes.shape[1]
+        self._smplsetting["SamplingCount"] = codes.shape[0]
+        return lret.value
+
+    def toCodes(self, values:np.ndarray) -> np.ndarray:
+        ''' 一括コード変換メソッド
+                Args:
+                    values(np.ndarray): (チャンネル数, サンプリング数)の数値
+                Returns:
+                    (サンプリング数, チャンネル数)のC連続int32配列(転送順)
+                Note:
+        '''
+        values = np.atleast_2d(values)
+        codes = np.empty((values.shape[1], values.shape[0]), dtype=np.int32)
+        for i in range(values.shape[0]):
+            codes[:, i] = self.pCh[i].toCode(values[i])
+        return codes
+
+    def Start(self, smprate:int, chcnt:int, repeat:int=1) -> int:
+        ''' D/A出力開始メソッド
+                Args:
+                    smprate(int): サンプリングレート(μsec)
+                    chcnt(int): 出力チャンネル数
+                    repeat(int): 繰り返し回数(REPEAT_INFINITE:Stopまで)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    SetWaveformで転送済の波形をハードウェアクロックで出力する
+        '''
+        lret = ctypes.c_long(0)
+        lret.value = self._setup(smprate, chcnt, repeat)
+        if lret.value:
+            return lret.value
+        # 出力開始
+        lret.value = caio.AioStartAo(self._pID)
+        self._ErrorHandler(lret)
+        return lret.value
+
+    def StartStream(self, smprate:int, chcnt:int, source, bufcnt:int=65536,
+            timeout:float=None) -> int:
+        ''' 長時間波形出力メソッド
+                Args:
+                    smprate(int): サンプリングレート(μsec)
+                    chcnt(int): 出力チャンネル数
+                    source: (チャンネル数, サンプリング数)の数値ブロックを返すiterable
+                    bufcnt(int): ユーザーバッファのサンプリング数
+                    timeout(float): 転送イベント待ちの上限(sec、Noneの場合はバッファ1周分)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    ユーザーバッファ(RING)をドライバに登録し、1/4周毎の転送完了イベント
+                    (AOE_DATA_TSF、AioSetAoEventTransferTimes)で転送済の領域に次のブロックを書き込む
+                    sourceが1周に満たない場合は、その数だけを1回出力して停止する
+                    sourceが尽きた後は最終値を書き続け(ボードメモリ分を含む)、
+                    最後のブロックが出力され終わってから停止する(不定値は出力しない)
+                    終了時に転送方式・メモリ形式をpTransfer/pMemoryTypeに戻す
+        '''
+        lret = ctypes.c_long(0)
+        try:
+            for func, val in ((caio.AioSetAoTransferMode, self.TRANSFER_USERBUFFER),
+                              (caio.AioSetAoMemoryType, self.MEMORY_RING)):
+                lret.value = func(self._pID, val)
+                self._ErrorHandler(lret)
+                if lret.value:
+                    return lret.value
+            # ページ境界に揃えたユーザーバッファ(未書込の領域は0)
+            nbytes = bufcnt * chcnt * ctypes.sizeof(ctypes.c_int32)
+            self._userbufraw = np.zeros(nbytes + mmap.PAGESIZE, dtype=np.uint8)
+            offset = -self._userbufraw.ctypes.data % mmap.PAGESIZE
+            self._userbuf = self._userbufraw[offset:offset + nbytes].view(np.int32).reshape(bufcnt, chcnt)
+            blocks = iter(source)
+            # 先頭1周分を書いてから開始
+            written, pending = self._fill(blocks, np.empty((0, chcnt), dtype=np.int32), 0, bufcnt)
+            if written == 0:
+                return lret.value
+            single = written < bufcnt   # 1周に満たない:書いた数だけ1回出力
+            lret.value = caio.AioSetAoTransferData(self._pID, written * chcnt if single else bufcnt * chcnt,
+                            self._userbuf.ctypes.data_as(ctypes.POINTER(ctypes.c_long)))
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+            lret.value = self._setup(smprate, chcnt, 1 if single else self.REPEAT_INFINITE)
+            if lret.value:
+                return lret.value
+            # 転送完了イベント
+            self._aoevent.clear()
+            lret.value = caio.AioSetAoEventTransferTimes(self._pID, max(1, bufcnt // 4))
+            if lret.value == 0:
+                lret.value = caio.AioSetAoCallBackProc(self._pID, self._aoproc,
+                                caio.AOE_DATA_TSF | caio.AOE_END, None)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+            drain = bufcnt                  # 最終ブロックの後に出力し切るまでの数(ボードメモリ分)
+            memsize = ctypes.c_long()
+            if caio.AioGetAoMemorySize(self._pID, ctypes.byref(memsize)) == 0 and memsize.value > 0:
+                drain = memsize.value
+            lret.value = caio.AioStartAo(self._pID)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+            wait = timeout if timeout is not None else max(1.0, smprate * 1e-6 * bufcnt)
+            last = None                     # sourceが尽きた位置(通し番号)
+            hold = self._userbuf[(written - 1) % bufcnt].copy()
+            cnt = ctypes.c_long()
+            lap = ctypes.c_long()
+            while True:
+                if not self._aoevent.wait(wait):
+                    if not self.pIsBusy:    # イベントなしで停止(エラー等)
+                        break
+                self._aoevent.clear()
+                if single:
+                    if not self.pIsBusy:
+                        break
+                    continue
+                lret.value = caio.AioGetAoTransferLap(self._pID, ctypes.byref(lap))
+                if lret.value == 0:
+                    lret.value = caio.AioGetAoTransferCount(self._pID, ctypes.byref(cnt))
+                if lret.value:
+                    self._ErrorHandler(lret)
+                    break
+                pos = lap.value * bufcnt + cnt.value
+                if last is not None and pos >= last + drain:
+                    break
+                if last is None:
+                    written, pending = self._fill(blocks, pending, written, pos + bufcnt)
+                    if written < pos + bufcnt:
+                        last = written      # sourceが尽きた
+                    if written > 0:
+                        hold = self._userbuf[(written - 1) % bufcnt].copy()
+                if last is not None:
+                    written = self._hold(hold, written, pos + bufcnt)
+            self.Stop()
+        finally:
+            caio.AioSetAoCallBackProc(self._pID, self._aoproc, 0, None)
+            caio.AioSetAoTransferMode(self._pID, self.pTransfer)
+            caio.AioSetAoMemoryType(self._pID, self.pMemoryType)
+        return lret.value
+
+    def Stop(self) -> int:
+        ''' D/A出力停止メソッド
+                Args:
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+        '''
+        lret = ctypes.c_long(0)
+        lret.value = caio.AioStopAo(self._pID)
+        self._ErrorHandler(lret)
+        return lret.value
+
+    @staticmethod
+    def Sine(fs:float, cnt:int, freq:float, amp:float, offset:float=0.0, phase:float=0.0) -> np.ndarray:
+        ''' 正弦波生成
+                Args:
+                    fs(float): サンプリング周波数(Hz)
+                    cnt(int): サンプリング数
+                    freq(float): 周波数(Hz)
+                    amp(float): 振幅
+                    offset(float): 中心値
+                    phase(float): 位相(rad)
+                Returns:
+                    (サンプリング数,)のnp.ndarray
+                Note:
+                    周期を繰り返す場合はcntを1周期の整数倍にする
+        '''
+        return offset + amp * np.sin(2 * np.pi * freq * np.arange(cnt) / fs + phase)
+
+    @staticmethod
+    def Square(fs:float, cnt:int, freq:float, amp:float, offset:float=0.0, duty:float=0.5) -> np.ndarray:
+        ''' 矩形波生成(引数はSineと同じ、duty:Hiの比率) '''
+        frac = (freq * np.arange(cnt) / fs) % 1.0
+        return offset + np.where(frac < duty, amp, -amp)
+
+    @staticmethod
+    def Triangle(fs:float, cnt:int, freq:float, amp:float, offset:float=0.0) -> np.ndarray:
+        ''' 三角波生成(引数はSineと同じ) '''
+        frac = (freq * np.arange(cnt) / fs) % 1.0
+        return offset + amp * (4.0 * np.abs(frac - 0.5) - 1.0)
+
+    @staticmethod
+    def Sawtooth(fs:float, cnt:int, freq:float, amp:float, offset:float=0.0) -> np.ndarray:
+        ''' のこぎり波生成(引数はSineと同じ) '''
+        frac = (freq * np.arange(cnt) / fs) % 1.0
+        return offset + amp * (2.0 * frac - 1.0)
+
+    @property
+    def pIsBusy(self) -> bool:
+        ''' デバイス動作中 '''
+        return self._GetStatus(caio.AOS_BUSY)
+
+    @property
+    def pIsSttTrgr(self) -> bool:
+        ''' 開始トリガ待ち '''
+        return self._GetStatus(caio.AOS_START_TRG)
+
+    @property
+    def pIsDataNum(self) -> bool:
+        ''' 指定サンプリング回数出力 '''
+        return self._GetStatus(caio.AOS_DATA_NUM)
+
+    @property
+    def pIsScErr(self) -> bool:
+        ''' サンプリングクロック周期エラー '''
+        return self._GetStatus(caio.AOS_SCERR)
+
+    @property
+    def pIsAoErr(self) -> bool:
+        ''' D/A変換エラー '''
+        return self._GetStatus(caio.AOS_AOERR)
+
+    @property
+    def pIsDrvErr(self) -> bool:
+        ''' ドライバスペックエラー '''
+        return self._GetStatus(caio.AOS_DRVERR)
+
+    @property
+    def pRepeatCount(self) -> int:
+        ''' 現在の繰り返し回数 '''
+        lret = ctypes.c_long(0)
+        cnt = ctypes.c_long()
+        lret.value = caio.AioGetAoRepeatCount(self._pID, ctypes.byref(cnt))
+        self._ErrorHandler(lret)
+        return cnt.value
+
+    def _setup(self, smprate:int, chcnt:int, repeat:int) -> int:
+        ''' 出力条件設定メソッド
+                Args:
+                    smprate(int): サンプリングレート(μsec)
+                    chcnt(int): 出力チャンネル数
+                    repeat(int): 繰り返し回数
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    開始条件:ソフトウェア/停止条件:設定回数
+        '''
+        lret = ctypes.c_long(0)
+        for func, val in ((caio.AioSetAoChannels, chcnt),
+                          (caio.AioSetAoSamplingClock, smprate),
+                          (caio.AioSetAoRepeatTimes, repeat),
+                          (caio.AioSetAoStartTrigger, 0),
+                          (caio.AioSetAoStopTrigger, 0)):
+            lret.value = func(self._pID, val)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+        self._smplsetting["ChannelCount"] = chcnt
+        self._smplsetting["SamplingRate"] = smprate
+        self._smplsetting["RepeatCount"] = repeat
+        return lret.value
+
+    def _fill(self, blocks, pending:np.ndarray, written:int, limit:int) -> (int,np.ndarray):
+        ''' ユーザーバッファ補充メソッド
+                Args:
+                    blocks: 数値ブロックのiterator
+                    pending(np.ndarray): 前回書ききれなかったコード(サンプリング数, チャンネル数)
+                    written(int): 書込済サンプリング数(通し番号)
+                    limit(int): 書込可能な上限(通し番号)
+                Returns:
+                    書込済サンプリング数と残りのコード
+                Note:
+        '''
+        size = self._userbuf.shape[0]
+        while written < limit:
+            if pending.shape[0] == 0:
+                blk = next(blocks, None)
+                if blk is None:
+                    break
+                pending = self.toCodes(blk)
+            n = min(pending.shape[0], limit - written)
+            start = written % size
+            first = min(n, size - start)
+            self._userbuf[start:start + first] = pending[:first]
+            self._userbuf[:n - first] = pending[first:n]
+            pending = pending[n:]
+            written += n
+        return written, pending
+
+    def _hold(self, code:np.ndarray, written:int, limit:int) -> int:
+        ''' ユーザーバッファ最終値補充メソッド
+                Args:
+                    code(np.ndarray): 最終サンプリングのコード(チャンネル数,)
+                    written(int): 書込済サンプリング数(通し番号)
+                    limit(int): 書込可能な上限(通し番号)
+                Returns:
+                    書込済サンプリング数
+                Note:
+                    sourceが尽きた後、停止までの間に前の周のデータを再出力しないよう最終値で埋める
+        '''
+        size = self._userbuf.shape[0]
+        n = max(0, limit - written)
+        start = written % size
+        first = min(n, size - start)
+        self._userbuf[start:start + first] = code
+        self._userbuf[:n - first] = code
+        return written + n
+
+    def _initializeDA(self, devnm:str) -> int:
+        ''' ボード初期化メソッド
+                Args:
+                    devnm(str): ボードのデバイス名(exm.'AIO000')
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    内部クロック/デバイスバッファ/FIFOメモリ
+        '''
+        lret = ctypes.c_long(0)
+        deviceName = ctypes.create_string_buffer(256)   # exm."AIO000"
+        device = ctypes.create_string_buffer(256)       # exm."DA16-4(LPCI)L"
+        if not self._initialized:       # 初回のみ
+            lret.value = caio.AioResetDevice(self._pID)
+            i = 0
+            while i < 255:
+                lret.value = caio.AioQueryDeviceName(i, deviceName, device)
+                i += 1
+                if lret.value:
+                    break
+                elif deviceName.value.decode('sjis') == devnm:
+                    self.pName = device.value.decode('sjis')
+                    break
+        for func, val in ((caio.AioSetAoTransferMode, self.pTransfer),
+                          (caio.AioSetAoMemoryType, self.pMemoryType),
+                          (caio.AioSetAoClockType, self.CLOCK_INTERNAL)):
+            lret.value = func(self._pID, val)
+            self._ErrorHandler(lret)
+            if lret.value:
+                return lret.value
+        reso = ctypes.c_short()
+        lret.value = caio.AioGetAoResolution(self._pID, ctypes.byref(reso))
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        maxch = ctypes.c_short()
+        lret.value = caio.AioGetAoMaxChannels(self._pID, ctypes.byref(maxch))
+        self._ErrorHandler(lret)
+        if lret.value:
+            return lret.value
+        self.pMaxChannel = maxch.value
+        if not self.pCh:
+            self.pCh = [self.clsChannel(i) for i in range(self.pMaxChannel)]
+            for c in self.pCh:
+                c.pResolution = reso.value
+        self._initialized = True
+        return lret.value
+
+    def _aoCallBack(self, id, msg, wparam, lparam, param):
+        ''' D/Aイベントコールバック
+                Args:
+                    id, msg, wparam, lparam, param: caio.PAIO_AO_CALLBACK
+                Returns:
+                Note:
+                    ドライバのスレッドから呼ばれるため、通知のみ行う
+        '''
+        if msg in (caio.AIOM_AOE_DATA_TSF, caio.AIOM_AOE_END):
+            self._aoevent.set()
+
+    def _GetStatus(self, stat:int) -> bool:
+        ''' D/Aステータス取得メソッド
+                Args:
+                    stat(int): caio.AOS_*
+                Returns:
+                    self._status & stat が0以外であれば真
+                Note:
+        '''
+        lret = ctypes.c_long(0)
+        lret.value = caio.AioGetAoStatus(self._pID, ctypes.byref(self._status))
+        self._ErrorHandler(lret)
+        return (self._status.value & stat) != 0
+
+    def _ErrorHandler(self, ecode:ctypes.c_long) -> str:
+        ''' エラー文字列取得メソッド
+                Args:
+                    ecode(ctypes.c_long): エラーコード
+                Returns:
+                    エラー文字列
+                Note:
+                    エラー文字列をself.pErrorStrに設定
+        '''
+        error_buf = ctypes.create_string_buffer(256)
+        caio.AioGetErrorString(ecode, error_buf)
+        self.pErrorStr = f"[{ecode.value}] {error_buf.value.decode('sjis')}"
+        if ecode.value != 0:
+            print(self.pErrorStr, file=sys.stderr)
+        return self.pErrorStr
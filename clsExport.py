@@ -0,0 +1,212 @@
+# coding : utf-8
+import json
+
+import numpy as np
+try:
+    import pyarrow as _pa                   # あればArrow/Parquetで出力(任意)
+    import pyarrow.parquet as _pq
+except ImportError:
+    _pa = None
+    _pq = None
+
+AVAILABLE:bool = _pa is not None            # pyarrowの有無
+
+class clsExport:
+    ''' clsExport Arrow/Parquet出力クラス
+            Note:
+                (チャンネル数, サンプリング数)のブロックを1チャンネル1列のレコードバッチで出力する
+                列名はclsChannel.pName、単位・レンジ・変換係数は列のメタデータ
+                列はnp.ndarrayの行から直接作成する(値毎のPython変換はしない)
+                Read後のキャプチャはWriteCapture、ReadChunk/Streamのブロックは順次Writeする
+                小さなブロックはpBatchRowsまで貯めてから1バッチにする
+                pyarrowが必要(無い場合はコンストラクタでImportError)
+    '''
+
+    # 出力形式
+    FORMAT_IPC:int = 0              # Arrow IPCストリーム(.arrows/.arrow)
+    FORMAT_PARQUET:int = 1          # Parquet(.parquet)
+    # 出力データ
+    DATA_RAW:int = 0                # デジタル値(uint16/int32)+変換係数のメタデータ
+    DATA_VALUE:int = 1              # 数値(float64、pMin/pMax/pOffsetで変換)
+
+    def __init__(self, cAD, path:str, channels:list, data:int=DATA_VALUE, fmt:int=None,
+            batchrows:int=65536, config:list=None):
+        ''' clsExport コンストラクタ
+                Args:
+                    cAD(clsAD): チャンネル設定(pCh)を持つclsAD
+                    path(str): 出力ファイル名
+                    channels(list): 出力するブロックの各行のチャンネル番号
+                    data(int): DATA_RAW|DATA_VALUE
+                    fmt(int): FORMAT_IPC|FORMAT_PARQUET(Noneの場合は拡張子で判定)
+                    batchrows(int): 1バッチの最小サンプリング数(0の場合はWrite毎)
+                    config(list): channelsのチャンネル設定(clsAD.ChannelConfig)
+                                Noneの場合はここでcADから取得する
+                Returns:
+                Note:
+                    ファイルは最初のWriteで作成する(サンプリング周期をメタデータに含めるため)
+                    列名・メタデータ・数値変換はconfigによる(出力中にレンジを変えても変わらない)
+        '''
+        if _pa is None:
+            raise ImportError("clsExport requires pyarrow")
+        # public property
+        self.pPath:str = path
+        self.pChannels:list = list(channels)
+        self.pData:int = data
+        self.pFormat:int = fmt if fmt is not None else \
+                (self.FORMAT_PARQUET if path.endswith(".parquet") else self.FORMAT_IPC)
+        self.pBatchRows:int = batchrows
+        self.pRows:int = 0                          # 出力済サンプリング数
+        self.pBatches:int = 0                       # 出力済バッチ数
+        # private property
+        self._ad = cAD
+        self._schema = None
+        self._writer = None
+        self._sink = None
+        self._pending:list = []                     # 出力待ちの(index, time, 列...)
+        self._pendrows:int = 0
+        self._rawtype = None                        # DATA_RAWの列の型
+        self._conf:list = list(config) if config is not None else cAD.ChannelConfig(0, self.pChannels)
+        self._coef = np.array([[c["scale"] for c in self._conf],
+                               [c["intercept"] for c in self._conf]])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+    def Write(self, data:np.ndarray, axis=None) -> int:
+        ''' ブロック出力メソッド
+                Args:
+                    data(np.ndarray): (チャンネル数, サンプリング数)のデジタル値
+                    axis(clsAD.clsTimeAxis): ブロックの時間軸(Noneの場合はcAD.pTimeAxis)
+                Returns:
+                    出力(またはバッチ待ち)にしたサンプリング数
+                Note:
+                    dataの行はchannelsの順
+        '''
+        axis = axis if axis is not None else self._ad.pTimeAxis
+        n = data.shape[1]
+        if n == 0:
+            return 0
+        if self._writer is None:
+            self._open(axis)
+        if self.pData == self.DATA_RAW:
+            cols = np.array(data, dtype=self._rawtype, order="C")     # ユーザーバッファの上書きに備えコピー
+        else:
+            cols = data * self._coef[0, :, None] + self._coef[1, :, None]
+        index = np.arange(axis.pIndex, axis.pIndex + n, dtype=np.int64)
+        self._pending.append([index, axis.toArray()] + list(cols))
+        self._pendrows += n
+        if self._pendrows >= self.pBatchRows:
+            self._flush()
+        return n
+
+    def WriteCapture(self) -> int:
+        ''' キャプチャ出力メソッド
+                Args:
+                Returns:
+                    出力したサンプリング数
+                Note:
+                    直前のRead/TriggerCaptureの各clsChannel.pDataとpTimeAxisを出力する
+        '''
+        ad = self._ad
+        data = np.vstack([ad.pCh[i].pData for i in self.pChannels])
+        return self.Write(data, ad.pTimeAxis)
+
+    def Close(self):
+        ''' 出力終了メソッド
+                Args:
+                Returns:
+                Note:
+                    バッチ待ちを出力してファイルを閉じる
+        '''
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        self._writer = None
+        self._sink = None
+
+    def _open(self, axis):
+        ''' ファイル作成メソッド
+                Args:
+                    axis(clsAD.clsTimeAxis): 最初のブロックの時間軸
+                Returns:
+                Note:
+                    スキーマ: index(int64)、time(float64、time.time())、チャンネル毎の列
+                    スキーマのメタデータ: デバイス名、サンプリング周期、開始時刻、出力データ、チャンネル設定
+        '''
+        conf = self._conf
+        if self.pData == self.DATA_RAW:
+            res = max(c["resolution"] for c in conf)
+            self._rawtype = np.uint16 if 0 < res <= 16 else np.int32
+            ctype = _pa.from_numpy_dtype(self._rawtype)
+        else:
+            ctype = _pa.float64()
+        fields = [_pa.field("index", _pa.int64()), _pa.field("time", _pa.float64())]
+        names = set()
+        for i, c in zip(self.pChannels, conf):
+            name = c["name"] if c["name"] not in names else f"{c['name']}_{i}"
+            names.add(name)
+            meta = {"channel":i, "unit":c["unit"], "range":c["range"], "min":c["min"],
+                    "max":c["max"], "offset":c["offset"], "resolution":c["resolution"]}
+            if self.pData == self.DATA_RAW:
+                # 数値 = デジタル値 × scale + intercept
+                meta["scale"] = c["scale"]
+                meta["intercept"] = c["intercept"]
+            fields.append(_pa.field(name, ctype, nullable=False,
+                    metadata={k:str(v) for k, v in meta.items()}))
+        self._schema = _pa.schema(fields, metadata={
+                "device":self._ad.pName, "period":str(axis.pPeriod), "start":str(axis.pStartTime),
+                "data":"raw" if self.pData == self.DATA_RAW else "value",
+                "channels":json.dumps(conf),
+            })
+        if self.pFormat == self.FORMAT_PARQUET:
+            self._writer = _pq.ParquetWriter(self.pPath, self._schema)
+        else:
+            self._sink = _pa.OSFile(self.pPath, "wb")
+            self._writer = _pa.ipc.new_stream(self._sink, self._schema)
+
+    def _flush(self):
+        ''' バッチ出力メソッド
+                Args:
+                Returns:
+                Note:
+                    貯めたブロックを列毎に連結して1つのレコードバッチにする
+        '''
+        if not self._pending:
+            return
+        if len(self._pending) == 1:
+            cols = self._pending[0]
+        else:
+            cols = [np.concatenate(c) for c in zip(*self._pending)]
+        batch = _pa.RecordBatch.from_arrays([_pa.array(c) for c in cols], schema=self._schema)
+        self._writer.write_batch(batch)
+        self.pRows += self._pendrows
+        self.pBatches += 1
+        self._pending = []
+        self._pendrows = 0
+
+def Export(cAD, path:str, channels:list, data:int=clsExport.DATA_VALUE,
+        values:np.ndarray=None, axis=None, config:list=None) -> int:
+    ''' 一括出力関数
+            Args:
+                cAD(clsAD): チャンネル設定(pCh)を持つclsAD
+                path(str): 出力ファイル名(.parquetはParquet、その他はArrow IPCストリーム)
+                channels(list): 出力するチャンネル番号のlist
+                data(int): clsExport.DATA_RAW|DATA_VALUE
+                values(np.ndarray): (チャンネル数, サンプリング数)のデジタル値
+                                Noneの場合は直前のRead結果(各clsChannel.pData)
+                axis(clsAD.clsTimeAxis): valuesの時間軸(Noneの場合はcAD.pTimeAxis)
+                config(list): channelsのチャンネル設定(clsAD.ChannelConfig、Noneの場合は現在の設定)
+            Returns:
+                出力したサンプリング数
+            Note:
+    '''
+    with clsExport(cAD, path, channels, data, config=config) as exp:
+        if values is None:
+            return exp.WriteCapture()
+        return exp.Write(values, axis)
@@ -0,0 +1,186 @@
+# coding : utf-8
+import math
+
+import numpy as np
+try:
+    from scipy import signal as _signal      # あればsosfiltを使用(任意)
+except ImportError:
+    _signal = None
+
+class clsFilter:
+    ''' clsFilter デジタルフィルタクラス
+            Note:
+                (チャンネル数, サンプリング数)のブロックを全チャンネル一括で処理する
+                FIR → IIR(2次セクションの縦続)の順に適用し、
+                チャンネル毎の内部状態をブロック間で引き継ぐため、
+                分割して処理しても一括処理と同じ結果になる
+    '''
+
+    def __init__(self, chcnt:int, sos=None, fir=None):
+        ''' clsFilter コンストラクタ
+                Args:
+                    chcnt(int): チャンネル数
+                    sos: IIR係数 [[b0, b1, b2, a0, a1, a2], ...] (2次セクション毎)
+                    fir: FIR係数 [h0, h1, ...]
+                Returns:
+                Note:
+                    sos/firはLowpass/Highpass/Notch/FirLowpassで作成できる
+        '''
+        # public property
+        self.pChannelCount:int = chcnt
+        self.pSos:np.ndarray = None                 # (セクション数, 6) a0で正規化済
+        self.pFir:np.ndarray = None                 # (タップ数,)
+        # private property
+        self._zi:np.ndarray = None                  # IIR状態(セクション数, チャンネル数, 2)
+        self._fstate:np.ndarray = None              # FIR状態(チャンネル数, タップ数-1)
+        if sos is not None:
+            sos = np.atleast_2d(np.asarray(sos, dtype=np.float64))
+            self.pSos = sos / sos[:, 3:4]
+        if fir is not None:
+            self.pFir = np.asarray(fir, dtype=np.float64)
+        self.Reset()
+
+    def Reset(self):
+        ''' 状態リセットメソッド
+                Args:
+                Returns:
+                Note:
+                    ストリームの切れ目(再Start等)で呼ぶ
+        '''
+        if self.pSos is not None:
+            self._zi = np.zeros((self.pSos.shape[0], self.pChannelCount, 2))
+        if self.pFir is not None:
+            self._fstate = np.zeros((self.pChannelCount, self.pFir.size - 1))
+
+    def Process(self, data:np.ndarray) -> np.ndarray:
+        ''' フィルタ処理メソッド
+                Args:
+                    data(np.ndarray): (チャンネル数, サンプリング数)のブロック
+                                    デジタル値/数値のどちらでもよい
+                Returns:
+                    フィルタ後の(チャンネル数, サンプリング数)のnp.ndarray(float64)
+                Note:
+                    clsAD.Streamの出力をそのまま渡せる
+        '''
+        y = np.asarray(data, dtype=np.float64)
+        if self.pFir is not None:
+            y = self._fir(y)
+        if self.pSos is not None:
+            y = self._iir(y)
+        return y
+
+    def _fir(self, x:np.ndarray) -> np.ndarray:
+        ''' FIR処理
+                Args:
+                    x(np.ndarray): (チャンネル数, サンプリング数)
+                Returns:
+                    (チャンネル数, サンプリング数)
+                Note:
+                    前ブロックの末尾(タップ数-1)を先頭に繋げて畳み込む
+                    タップ毎に全チャンネル・全サンプリングを一括で積和する
+        '''
+        h = self.pFir
+        m = h.size - 1
+        n = x.shape[1]
+        xx = np.concatenate((self._fstate, x), axis=1)
+        y = h[0] * xx[:, m:m + n]
+        for k in range(1, h.size):
+            y += h[k] * xx[:, m - k:m - k + n]
+        if m:
+            self._fstate = xx[:, -m:].copy()
+        return y
+
+    def _iir(self, x:np.ndarray) -> np.ndarray:
+        ''' IIR(2次セクション縦続)処理
+                Args:
+                    x(np.ndarray): (チャンネル数, サンプリング数)
+                Returns:
+                    (チャンネル数, サンプリング数)
+                Note:
+                    直接II型転置構成、状態はscipy.signal.sosfiltのziと同じ形
+                    scipyがない場合はサンプリング毎に全チャンネルを一括計算する
+        '''
+        if _signal is not None:
+            y, self._zi = _signal.sosfilt(self.pSos, x, axis=-1, zi=self._zi)
+            return y
+        y = x.copy()
+        for s, (b0, b1, b2, _, a1, a2) in enumerate(self.pSos):
+            z = self._zi[s]
+            z1 = z[:, 0].copy()
+            z2 = z[:, 1].copy()
+            for n in range(y.shape[1]):
+                xn = y[:, n].copy()
+                yn = b0 * xn + z1
+                z1 = b1 * xn - a1 * yn + z2
+                z2 = b2 * xn - a2 * yn
+                y[:, n] = yn
+            z[:, 0] = z1
+            z[:, 1] = z2
+        return y
+
+    @staticmethod
+    def Lowpass(fs:float, fc:float, q:float=1 / math.sqrt(2)) -> list:
+        ''' 2次ローパス係数
+                Args:
+                    fs(float): サンプリング周波数(Hz)
+                    fc(float): 遮断周波数(Hz)
+                    q(float): Q値(Default バターワース)
+                Returns:
+                    [[b0, b1, b2, a0, a1, a2]]
+                Note:
+                    RBJ Audio EQ Cookbook
+        '''
+        w = 2 * math.pi * fc / fs
+        alpha = math.sin(w) / (2 * q)
+        c = math.cos(w)
+        return [[(1 - c) / 2, 1 - c, (1 - c) / 2, 1 + alpha, -2 * c, 1 - alpha]]
+
+    @staticmethod
+    def Highpass(fs:float, fc:float, q:float=1 / math.sqrt(2)) -> list:
+        ''' 2次ハイパス係数
+                Args:
+                    fs(float): サンプリング周波数(Hz)
+                    fc(float): 遮断周波数(Hz)
+                    q(float): Q値(Default バターワース)
+                Returns:
+                    [[b0, b1, b2, a0, a1, a2]]
+                Note:
+                    RBJ Audio EQ Cookbook
+        '''
+        w = 2 * math.pi * fc / fs
+        alpha = math.sin(w) / (2 * q)
+        c = math.cos(w)
+        return [[(1 + c) / 2, -(1 + c), (1 + c) / 2, 1 + alpha, -2 * c, 1 - alpha]]
+
+    @staticmethod
+    def Notch(fs:float, f0:float, q:float=30.0) -> list:
+        ''' ノッチ係数
+                Args:
+                    fs(float): サンプリング周波数(Hz)
+                    f0(float): 除去周波数(Hz) exm.50/60Hz
+                    q(float): Q値
+                Returns:
+                    [[b0, b1, b2, a0, a1, a2]]
+                Note:
+                    RBJ Audio EQ Cookbook
+        '''
+        w = 2 * math.pi * f0 / fs
+        alpha = math.sin(w) / (2 * q)
+        c = math.cos(w)
+        return [[1.0, -2 * c, 1.0, 1 + alpha, -2 * c, 1 - alpha]]
+
+    @staticmethod
+    def FirLowpass(fs:float, fc:float, taps:int=63) -> np.ndarray:
+        ''' FIRローパス係数
+                Args:
+                    fs(float): サンプリング周波数(Hz)
+                    fc(float): 遮断周波数(Hz)
+                    taps(int): タップ数
+                Returns:
+                    係数のnp.ndarray(直流ゲイン1)
+                Note:
+                    ハミング窓の窓関数法
+        '''
+        n = np.arange(taps) - (taps - 1) / 2
+        h = np.sinc(2 * fc / fs * n) * np.hamming(taps)
+        return h / h.sum()
@@ -0,0 +1,232 @@
+# coding : utf-8
+import sys
+import time
+import queue
+import threading
+
+import numpy as np
+
+import clsAD
+import clsCodec
+import clsExport
+import clsRecord
+import clsReplay
+
+class clsHistory:
+    ''' clsHistory 入力履歴クラス
+            Note:
+                連続入力(ReadChunk/Stream)のブロックを固定長の(チャンネル数, サンプリング数)の
+                リングバッファに書き込み、直近の一定時間を常に保持する
+                Snapshotで事象(警報・操作・外部通知等)の前後の区間を取り出し、
+                前側は呼出し時にリングからコピー、後側は以降のAppendで集め、
+                揃った区間を別スレッドでファイルに出力する(入力は止まらない)
+    '''
+
+    def __init__(self, cAD, channels:list, seconds:float, smprate:float):
+        ''' clsHistory コンストラクタ
+                Args:
+                    cAD(clsAD): チャンネル設定(pCh)を持つclsAD
+                    channels(list): Appendするブロックの各行のチャンネル番号
+                    seconds(float): 保持する時間(sec)
+                    smprate(float): サンプリングレート(μsec)
+                Returns:
+                Note:
+                    リングは保持時間分を最初に確保する
+        '''
+        res = max(cAD.pCh[i].pResolution for i in channels)
+        # public property
+        self.pChannels:list = list(channels)
+        self.pCapacity:int = max(1, int(round(seconds / (smprate * 1e-6))))   # 保持サンプリング数
+        self.pSaved:list = []                       # 出力済の(番号, ファイル名, サンプリング数)
+        self.pErrorStr:str = ""
+        # private property
+        self._ad = cAD
+        self._ring = np.zeros((len(self.pChannels), self.pCapacity),
+                              dtype=np.uint16 if 0 < res <= 16 else np.int32)
+        self._lock = threading.Lock()
+        self._start:float = 0.0                     # 変換開始時刻
+        self._period:float = smprate * 1e-6         # サンプリング周期(sec)
+        self._end:int = None                        # 最後に書いたサンプリングの次の番号
+        self._count:int = 0                         # 保持しているサンプリング数
+        self._snaps:list = []                       # 後側の揃っていないSnapshot
+        self._serial:int = 0
+        self._queue = queue.Queue()                 # 出力待ち
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    @property
+    def pBegin(self) -> int:
+        ''' 保持している最古のサンプリング番号 '''
+        return 0 if self._end is None else self._end - self._count
+
+    @property
+    def pEnd(self) -> int:
+        ''' 保持している最新のサンプリングの次の番号 '''
+        return 0 if self._end is None else self._end
+
+    def Append(self, data:np.ndarray, axis=None):
+        ''' ブロック追加メソッド
+                Args:
+                    data(np.ndarray): (チャンネル数, サンプリング数)のデジタル値
+                    axis(clsAD.clsTimeAxis): ブロックの時間軸(Noneの場合はcAD.pTimeAxis)
+                Returns:
+                Note:
+                    リングへのコピーは折り返し位置で分けた高々2回
+                    サンプリング番号が連続しない場合(取りこぼし・再Start)は履歴を捨てる
+        '''
+        axis = axis if axis is not None else self._ad.pTimeAxis
+        n = data.shape[1]
+        if n == 0:
+            return
+        cap = self.pCapacity
+        with self._lock:
+            if self._end != axis.pIndex:
+                self._count = 0
+                for snap in self._snaps:        # 欠けを挟まないよう、揃った分で出力する
+                    snap["end"] = snap["next"]
+                    self._queue.put(snap)
+                self._snaps = []
+            self._start, self._period = axis.pStartTime, axis.pPeriod
+            begin = axis.pIndex + max(0, n - cap)
+            src = data[:, -cap:] if n > cap else data
+            p = begin % cap
+            first = min(src.shape[1], cap - p)
+            self._ring[:, p:p + first] = src[:, :first]
+            self._ring[:, :src.shape[1] - first] = src[:, first:]
+            self._end = axis.pIndex + n
+            self._count = min(self._count + n, cap)
+            # 後側を集めているSnapshot
+            done = []
+            for snap in self._snaps:
+                i0, i1 = max(snap["next"], axis.pIndex), min(snap["end"], self._end)
+                if i1 > i0:
+                    snap["parts"].append(np.array(data[:, i0 - axis.pIndex:i1 - axis.pIndex],
+                                                  dtype=self._ring.dtype))
+                    snap["next"] = i1
+                if snap["next"] >= snap["end"]:
+                    done.append(snap)
+            for snap in done:
+                self._snaps.remove(snap)
+                self._queue.put(snap)
+
+    def Latest(self, count:int) -> (np.ndarray,object):
+        ''' 直近データ取得メソッド
+                Args:
+                    count(int): サンプリング数
+                Returns:
+                    (チャンネル数, サンプリング数)のデジタル値(コピー)と時間軸(clsAD.clsTimeAxis)
+                Note:
+                    保持しているサンプリング数までに切り詰める
+        '''
+        with self._lock:
+            begin = max(self.pBegin, self.pEnd - count)
+            return self._copy(begin, self.pEnd), clsAD.clsAD.clsTimeAxis(
+                        self._start, self._period, begin, self.pEnd - begin)
+
+    def Snapshot(self, pre:float, post:float, t:float=None, path:str=None) -> int:
+        ''' 事象前後の区間出力メソッド
+                Args:
+                    pre(float): 事象前の時間(sec)
+                    post(float): 事象後の時間(sec)
+                    t(float): 事象の時刻(time.time()、Noneの場合は最新のサンプリング)
+                    path(str): 出力ファイル名(Noneの場合はsnap_日時_番号.adb)
+                                .adb:clsRecord(圧縮)、.arrow/.arrows/.parquet:clsExport、その他:clsReplay
+                Returns:
+                    Snapshotの番号(1~)
+                    入力前、または区間が保持範囲より前の場合は-1
+                Note:
+                    前側は保持している分だけ(保持時間より前は切り詰める)
+                    区間が揃った時点で出力スレッドに渡すため、呼出し側は待たない
+                    時間軸(開始時刻・周期)とチャンネル設定は呼出し時点のものを出力する
+        '''
+        with self._lock:
+            if self._end is None:
+                return -1
+            center = self._end if t is None else \
+                        int(np.ceil((t - self._start) / self._period - 1e-3))
+            begin = max(center - int(round(pre / self._period)), self.pBegin)
+            end = center + int(round(post / self._period))
+            if end <= begin:
+                return -1
+            self._serial += 1
+            if path is None:
+                path = time.strftime("snap_%Y%m%d_%H%M%S", time.localtime()) + f"_{self._serial}.adb"
+            snap = {"id":self._serial, "path":path, "begin":begin, "end":end,
+                    "parts":[self._copy(begin, min(end, self._end))],
+                    "next":max(begin, min(end, self._end)),     # 後側の次に集めるサンプリング番号
+                    # 出力時ではなく事象時点の時間軸・チャンネル設定(再Start・レンジ変更に備える)
+                    "start":self._start, "period":self._period,
+                    "config":self._ad.ChannelConfig(0, self.pChannels)}
+            if snap["next"] >= end:
+                self._queue.put(snap)
+            else:
+                self._snaps.append(snap)
+            return self._serial
+
+    def Close(self, timeout:float=None):
+        ''' 終了メソッド
+                Args:
+                    timeout(float): 出力待ちの上限(sec)
+                Returns:
+                Note:
+                    後側の揃っていないSnapshotは揃った分だけ出力する
+        '''
+        with self._lock:
+            for snap in self._snaps:
+                snap["end"] = snap["next"]
+                self._queue.put(snap)
+            self._snaps = []
+        self._queue.put(None)
+        self._writer.join(timeout)
+
+    def _copy(self, begin:int, end:int) -> np.ndarray:
+        ''' リング範囲コピーメソッド
+                Args:
+                    begin(int): 先頭のサンプリング番号(保持範囲内)
+                    end(int): 終わりのサンプリング番号(含まない)
+                Returns:
+                    (チャンネル数, サンプリング数)のデジタル値(コピー)
+                Note:
+        '''
+        cap = self.pCapacity
+        n = max(0, end - begin)
+        p = begin % cap
+        first = min(n, cap - p)
+        out = np.empty((self._ring.shape[0], n), dtype=self._ring.dtype)
+        out[:, :first] = self._ring[:, p:p + first]
+        out[:, first:] = self._ring[:, :n - first]
+        return out
+
+    def _write(self):
+        ''' 出力スレッド
+                Args:
+                Returns:
+                Note:
+                    出力の失敗(例外全般)はpErrorStrに残して次のSnapshotへ進む
+        '''
+        ad = self._ad
+        while True:
+            snap = self._queue.get()
+            if snap is None:
+                break
+            data = np.concatenate(snap["parts"], axis=1)
+            if data.shape[1] == 0:
+                continue
+            axis = clsAD.clsAD.clsTimeAxis(snap["start"], snap["period"], snap["begin"], data.shape[1])
+            path = snap["path"]
+            conf = snap["config"]
+            try:
+                if path.endswith(".adb"):
+                    with clsRecord.clsRecord(ad, path, self.pChannels, codec=clsCodec.Best(),
+                                             config=conf) as rec:
+                        rec.Write(data, axis)
+                elif path.endswith((".arrow", ".arrows", ".parquet")):
+                    clsExport.Export(ad, path, self.pChannels, clsExport.clsExport.DATA_VALUE, data, axis,
+                                     conf)
+                else:
+                    clsReplay.Save(path, data, snap["period"] * 1e6, conf[0]["resolution"], axis.pBegin)
+            except Exception as e:          # 出力スレッドを止めない
+                self.pErrorStr = f"snapshot {snap['id']}: {e}"
+                print(self.pErrorStr, file=sys.stderr)
+                continue
+            self.pSaved.append((snap["id"], path, data.shape[1]))
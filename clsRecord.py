@@ -0,0 +1,522 @@
+# coding : utf-8
+import os
+import json
+import queue
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import clsAD
+import clsCodec
+
+# 記録ファイルのヘッダ: magic, version, 続くJSONのbyte数
+BLOCK_HEADER = struct.Struct("<4sHI")
+BLOCK_MAGIC:bytes = b"ADBK"
+INDEX_EXT:str = ".idx"                  # ブロック索引ファイルの拡張子(記録ファイル名に追加)
+
+def IndexType(chcnt:int, dtype) -> np.dtype:
+    ''' ブロック索引の型生成関数
+            Args:
+                chcnt(int): チャンネル数
+                dtype: 記録するデジタル値の型
+            Returns:
+                索引1件のnp.dtype
+            Note:
+                索引ファイルはこの型の配列をそのまま追記したもの
+    '''
+    return np.dtype([
+        ("index", "<i8"),                   # 先頭のサンプリング番号(変換開始からの通し番号)
+        ("count", "<u4"),                   # サンプリング数
+        ("time", "<f8"),                    # 先頭サンプリングの時刻(time.time())
+        ("offset", "<i8"),                  # 記録ファイル上の位置(byte)
+        ("size", "<u4"),                    # 記録ファイル上の大きさ(byte)
+        ("min", dtype, (chcnt,)),           # チャンネル毎の最小値(デジタル値)
+        ("max", dtype, (chcnt,)),           # チャンネル毎の最大値(デジタル値)
+    ])
+
+class clsRecord:
+    ''' clsRecord ブロック索引付き記録クラス
+            Note:
+                連続入力のブロックを一定サンプリング数のブロックに区切って記録し、
+                ブロック毎の索引(サンプリング番号、時刻、ファイル位置、チャンネル毎の最小・最大)を
+                path + ".idx"に追記する
+                ブロック内はチャンネル毎に連続(チャンネル数, サンプリング数)で、
+                一部のチャンネルだけを読む場合も他のチャンネルを読まずに済む
+                圧縮(clsCodec)する場合は別スレッドで圧縮・書込みし、入力を待たせない
+                圧縮はブロック毎に完結するので、読出しは必要なブロックだけを展開する
+                読出しはclsRecordReader
+    '''
+
+    def __init__(self, cAD, path:str, channels:list, blocksize:int=8192,
+            codec:int=clsCodec.CODEC_NONE, level:int=None, config:list=None):
+        ''' clsRecord コンストラクタ
+                Args:
+                    cAD(clsAD): チャンネル設定(pCh)を持つclsAD
+                    path(str): 記録ファイル名
+                    channels(list): 記録するブロックの各行のチャンネル番号
+                    blocksize(int): 1ブロックのサンプリング数
+                    codec(int): clsCodec.CODEC_*
+                    level(int): 圧縮レベル(Noneの場合はclsCodecの既定値)
+                    config(list): channelsのチャンネル設定(clsAD.ChannelConfig)
+                                Noneの場合はここでcADから取得する
+                Returns:
+                Note:
+                    ファイルは最初のWriteで作成する(サンプリング周期をヘッダに含めるため)
+        '''
+        if not clsCodec.Available(codec):
+            raise ValueError(f"codec {clsCodec.CODEC_NAMES.get(codec, codec)} is not available")
+        # public property
+        self.pPath:str = path
+        self.pChannels:list = list(channels)
+        self.pBlockSize:int = blocksize
+        self.pSamples:int = 0                       # 記録済サンプリング数
+        self.pBlocks:int = 0                        # 記録済ブロック数
+        self.pBytes:int = 0                         # 記録済ブロックのbyte数(圧縮後)
+        self.pCodec:int = codec
+        # private property
+        self._ad = cAD
+        self._conf:list = list(config) if config is not None else cAD.ChannelConfig(0, self.pChannels)
+        self._file = None
+        self._index = None                          # 索引ファイル
+        self._itype = None                          # 索引の型
+        self._dtype = None                          # 記録するデジタル値の型
+        self._pending:list = []                     # ブロックに満たないデータ
+        self._pendrows:int = 0
+        self._next:int = 0                          # 次に続くサンプリング番号
+        self._axis = None                           # 時間軸(開始時刻・周期)
+        self._begin:int = 0                         # 貯めているデータの先頭のサンプリング番号
+        self._level:int = level
+        self._queue = None                          # 圧縮待ちブロック(圧縮する場合)
+        self._worker = None                         # 圧縮・書込みスレッド
+        self._error = None                          # 圧縮・書込みスレッドの例外
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+    def Write(self, data:np.ndarray, axis=None) -> int:
+        ''' ブロック記録メソッド
+                Args:
+                    data(np.ndarray): (チャンネル数, サンプリング数)のデジタル値
+                    axis(clsAD.clsTimeAxis): ブロックの時間軸(Noneの場合はcAD.pTimeAxis)
+                Returns:
+                    記録(または待ち)にしたサンプリング数
+                Note:
+                    dataの行はchannelsの順
+                    サンプリング番号が連続しない場合(取りこぼし)はそこでブロックを区切る
+        '''
+        axis = axis if axis is not None else self._ad.pTimeAxis
+        n = data.shape[1]
+        if self._error is not None:
+            raise self._error
+        if n == 0:
+            return 0
+        if self._file is None:
+            self._open(axis)
+        if self._pending and axis.pIndex != self._next:
+            self._flush(self._pendrows)
+        if not self._pending:
+            self._axis, self._begin = axis, axis.pIndex
+        self._pending.append(np.array(data, dtype=self._dtype))      # ユーザーバッファの上書きに備えコピー
+        self._pendrows += n
+        self._next = axis.pIndex + n
+        while self._pendrows >= self.pBlockSize:
+            self._flush(self.pBlockSize)
+        return n
+
+    def Close(self):
+        ''' 記録終了メソッド
+                Args:
+                Returns:
+                Note:
+                    ブロックに満たない残りを最後のブロックとして記録する
+                    圧縮待ちのブロックを全て書いてから閉じる
+                    圧縮・書込みスレッドの例外はファイルを閉じてから送出する
+        '''
+        if self._file is None:
+            return
+        try:
+            self._flush(self._pendrows)
+        finally:
+            if self._worker is not None:
+                self._put(None)
+                self._worker.join()
+                self._worker = None
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+        if self._error is not None:
+            raise self._error
+
+    def _open(self, axis):
+        ''' ファイル作成メソッド
+                Args:
+                    axis(clsAD.clsTimeAxis): 最初のブロックの時間軸
+                Returns:
+                Note:
+                    ヘッダのJSON: チャンネル数、サンプリングクロック(μsec)、開始時刻、型、
+                    チャンネル設定(ChannelConfig、数値変換係数scale/interceptを含む)
+        '''
+        channels = self._conf
+        res = max(c["resolution"] for c in channels)
+        self._dtype = np.dtype("<u2" if 0 < res <= 16 else "<i4")
+        self._itype = IndexType(len(self.pChannels), self._dtype)
+        meta = json.dumps({"chcnt":len(self.pChannels), "clock":axis.pPeriod * 1e6,
+                "start":axis.pStartTime, "resolution":res, "dtype":self._dtype.str,
+                "blocksize":self.pBlockSize, "codec":self.pCodec, "device":self._ad.pName,
+                "channels":channels}).encode()
+        self._file = open(self.pPath, "wb")
+        self._file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, 1, len(meta)) + meta)
+        self._index = open(self.pPath + INDEX_EXT, "wb")
+        if self.pCodec != clsCodec.CODEC_NONE:
+            self._queue = queue.Queue(maxsize=16)   # 圧縮が追いつかない場合は入力側を待たせる
+            self._worker = threading.Thread(target=self._compress, daemon=True)
+            self._worker.start()
+
+    def _flush(self, n:int):
+        ''' ブロック書込メソッド
+                Args:
+                    n(int): ブロックにするサンプリング数(貯めているデータの先頭から)
+                Returns:
+                Note:
+                    圧縮する場合は圧縮・書込みスレッドに渡す
+                    圧縮・書込みスレッドが失敗・停止している場合は例外
+        '''
+        if n == 0:
+            return
+        if self._error is not None:
+            raise self._error
+        data = self._pending[0] if len(self._pending) == 1 else np.concatenate(self._pending, axis=1)
+        block = np.ascontiguousarray(data[:, :n])
+        rest = data[:, n:]
+        item = (block, self._begin, self._axis.pStartTime + self._begin * self._axis.pPeriod)
+        if self._queue is not None:
+            if not self._put(item):
+                raise self._error or RuntimeError(f"{self.pPath}: compress thread is not running")
+        else:
+            self._store(*item)
+        self._begin += n
+        self._pending = [rest] if rest.shape[1] else []
+        self._pendrows = rest.shape[1]
+
+    def _put(self, item) -> bool:
+        ''' 圧縮待ち追加メソッド
+                Args:
+                    item: _storeの引数のtuple(Noneは終了)
+                Returns:
+                    真の場合は追加した、偽の場合は圧縮・書込みスレッドが停止している
+                Note:
+                    待ちが一杯の間はスレッドの生存を確認しながら待つ(停止したスレッドを待ち続けない)
+        '''
+        while self._worker.is_alive():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _compress(self):
+        ''' 圧縮・書込みスレッド
+                Args:
+                Returns:
+                Note:
+                    ブロックの順に圧縮して書く(圧縮中はGILを解放するため入力は止まらない)
+                    失敗した場合は例外を_errorに残し、以降のブロックは捨てて終了の指示まで待ちを空ける
+        '''
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is None:
+                try:
+                    self._store(*item)
+                except Exception as e:
+                    self._error = e
+
+    def _store(self, block:np.ndarray, begin:int, t:float):
+        ''' ブロック書込メソッド
+                Args:
+                    block(np.ndarray): (チャンネル数, サンプリング数)のデジタル値
+                    begin(int): 先頭のサンプリング番号
+                    t(float): 先頭サンプリングの時刻
+                Returns:
+                Note:
+                    データを書いてから索引を書く(索引が未書込のデータを指さない)
+        '''
+        buf = clsCodec.Encode(block, self.pCodec, self._level)
+        rec = np.zeros(1, dtype=self._itype)
+        rec["index"] = begin
+        rec["count"] = block.shape[1]
+        rec["time"] = t
+        rec["offset"] = self._file.tell()
+        rec["size"] = len(buf)
+        rec["min"] = block.min(axis=1)
+        rec["max"] = block.max(axis=1)
+        self._file.write(buf)
+        self._file.flush()
+        self._index.write(rec.tobytes())
+        self._index.flush()
+        self.pSamples += block.shape[1]
+        self.pBlocks += 1
+        self.pBytes += len(buf)
+
+class clsRecordReader:
+    ''' clsRecordReader ブロック索引付き記録読出しクラス
+            Note:
+                索引から必要なブロックだけを読み、指定チャンネルの行だけを取り出す
+                Findはブロックの最小・最大で条件を満たし得ないブロックを読まずに飛ばす
+    '''
+
+    def __init__(self, path:str, workers:int=None):
+        ''' clsRecordReader コンストラクタ
+                Args:
+                    path(str): 記録ファイル名(索引はpath + ".idx")
+                    workers(int): 圧縮ブロックを展開するスレッド数(Noneの場合はCPU数)
+                Returns:
+                Note:
+                    索引のうち記録ファイルに無いブロック(書込中断)は除く
+        '''
+        self._file = open(path, "rb")
+        magic, version, size = BLOCK_HEADER.unpack(self._file.read(BLOCK_HEADER.size))
+        if magic != BLOCK_MAGIC:
+            self._file.close()
+            raise ValueError(f"{path}: not a block record file")
+        meta = json.loads(self._file.read(size))
+        # public property
+        self.pPath:str = path
+        self.pChannelCount:int = meta["chcnt"]
+        self.pPeriod:float = meta["clock"] * 1e-6   # サンプリング周期(sec)
+        self.pStartTime:float = meta["start"]       # サンプリング番号0の時刻
+        self.pResolution:int = meta["resolution"]
+        self.pChannels:list = meta["channels"]      # 記録した各行のチャンネル設定
+        self.pCodec:int = meta.get("codec", clsCodec.CODEC_NONE)
+        self.pIndex:np.ndarray = None               # ブロック索引(IndexType)
+        # private property
+        self._dtype = np.dtype(meta["dtype"])
+        self._workers:int = workers
+        self._pool = None                           # 展開スレッド(最初に複数ブロックを展開する時に作成)
+        self._coef = np.array([[c["scale"] for c in self.pChannels],
+                               [c["intercept"] for c in self.pChannels]])
+        itype = IndexType(self.pChannelCount, self._dtype)
+        index = np.fromfile(path + INDEX_EXT, dtype=itype) if os.path.exists(path + INDEX_EXT) \
+                    else np.empty(0, dtype=itype)
+        self.pIndex = index[index["offset"] + index["size"] <= os.path.getsize(path)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+    def Close(self):
+        ''' ファイルを閉じる '''
+        self._file.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @property
+    def pBegin(self) -> int:
+        ''' 記録の先頭のサンプリング番号 '''
+        return int(self.pIndex["index"][0]) if self.pIndex.size else 0
+
+    @property
+    def pEnd(self) -> int:
+        ''' 記録の最終サンプリングの次のサンプリング番号 '''
+        return int(self.pIndex["index"][-1] + self.pIndex["count"][-1]) if self.pIndex.size else 0
+
+    def Read(self, begin:int=None, end:int=None, channels:list=None) -> (np.ndarray,object):
+        ''' サンプリング範囲読出しメソッド
+                Args:
+                    begin(int): 先頭のサンプリング番号(Noneの場合は記録の先頭)
+                    end(int): 終わりのサンプリング番号(含まない、Noneの場合は記録の最後)
+                    channels(list): 読み出す行番号(記録したチャンネルの順、Noneの場合は全て)
+                Returns:
+                    (チャンネル数, サンプリング数)のデジタル値と時間軸(clsAD.clsTimeAxis)
+                Note:
+                    範囲に掛かるブロックだけを読む
+                    取りこぼしで欠けがある場合は範囲内の最初の連続区間だけを返す
+                    (時間軸と一致させるため、欠けを詰めない。続きはRunsの区間毎にReadする)
+        '''
+        runs = self.Runs(begin, end)
+        begin, end = runs[0] if runs else (self.pBegin, self.pBegin)
+        rows = list(range(self.pChannelCount)) if channels is None else list(channels)
+        first, last = self._blocks(begin, end)
+        parts = []
+        for k, block in zip(range(first, last), self._read(range(first, last), rows)):
+            rec = self.pIndex[k]
+            i0 = max(begin - int(rec["index"]), 0)
+            i1 = min(end - int(rec["index"]), int(rec["count"]))
+            parts.append(block[:, i0:i1])
+        data = np.concatenate(parts, axis=1) if parts else np.empty((len(rows), 0), dtype=self._dtype)
+        axis = clsAD.clsAD.clsTimeAxis(self.pStartTime, self.pPeriod, begin, data.shape[1])
+        return data, axis
+
+    def Runs(self, begin:int=None, end:int=None) -> list:
+        ''' 連続区間取得メソッド
+                Args:
+                    begin(int): 先頭のサンプリング番号(Noneの場合は記録の先頭)
+                    end(int): 終わりのサンプリング番号(含まない、Noneの場合は記録の最後)
+                Returns:
+                    範囲内でサンプリング番号が連続している区間の(先頭, 終わり)のlist
+                Note:
+                    索引だけから求める(ブロックは読まない)
+        '''
+        if not self.pIndex.size:
+            return []
+        begin = self.pBegin if begin is None else begin
+        end = self.pEnd if end is None else end
+        start = self.pIndex["index"]
+        stop = start + self.pIndex["count"]
+        gap = np.flatnonzero(stop[:-1] != start[1:])
+        runs = zip(np.append(start[0], start[gap + 1]), np.append(stop[gap], stop[-1]))
+        return [(int(max(a, begin)), int(min(b, end))) for a, b in runs if max(a, begin) < min(b, end)]
+
+    def ReadTime(self, start:float, stop:float, channels:list=None) -> (np.ndarray,object):
+        ''' 時刻範囲読出しメソッド
+                Args:
+                    start(float): 先頭の時刻(time.time())
+                    stop(float): 終わりの時刻(含まない)
+                    channels(list): 読み出す行番号(Noneの場合は全て)
+                Returns:
+                    (チャンネル数, サンプリング数)のデジタル値と時間軸(clsAD.clsTimeAxis)
+                Note:
+                    時刻はサンプリング番号に換算してReadする(欠けの扱いはRead)
+        '''
+        # time.time()の桁落ち分(サンプリング周期の1/1000)は境界上とみなす
+        begin = int(np.ceil((start - self.pStartTime) / self.pPeriod - 1e-3))
+        end = int(np.ceil((stop - self.pStartTime) / self.pPeriod - 1e-3))
+        return self.Read(begin, end, channels)
+
+    def Find(self, row:int, above:float=None, below:float=None, begin:int=None,
+            end:int=None) -> np.ndarray:
+        ''' しきい値検索メソッド
+                Args:
+                    row(int): 行番号(記録したチャンネルの順)
+                    above(float): この数値を超えるサンプリングを探す(Noneは判定しない)
+                    below(float): この数値を下回るサンプリングを探す(Noneは判定しない)
+                    begin(int): 検索範囲の先頭のサンプリング番号
+                    end(int): 検索範囲の終わりのサンプリング番号(含まない)
+                Returns:
+                    条件を満たすサンプリング番号のnp.ndarray(int64)
+                Note:
+                    ブロックの最小・最大(数値換算)が条件を満たし得ないブロックは読まない
+        '''
+        begin = self.pBegin if begin is None else max(begin, self.pBegin)
+        end = self.pEnd if end is None else min(end, self.pEnd)
+        first, last = self._blocks(begin, end)
+        scale, intercept = self._coef[:, row]
+        vmax = self.pIndex["max"][first:last, row] * scale + intercept
+        vmin = self.pIndex["min"][first:last, row] * scale + intercept
+        hit = np.zeros(last - first, dtype=bool)
+        if above is not None:
+            hit |= vmax > above
+        if below is not None:
+            hit |= vmin < below
+        found = []
+        ks = first + np.flatnonzero(hit)
+        for k, block in zip(ks, self._read(ks, [row])):
+            rec = self.pIndex[k]
+            v = block[0] * scale + intercept
+            mask = np.zeros(v.size, dtype=bool)
+            if above is not None:
+                mask |= v > above
+            if below is not None:
+                mask |= v < below
+            idx = int(rec["index"]) + np.flatnonzero(mask)
+            found.append(idx[(idx >= begin) & (idx < end)])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def ToValue(self, data:np.ndarray, channels:list=None) -> np.ndarray:
+        ''' 数値変換メソッド
+                Args:
+                    data(np.ndarray): (チャンネル数, サンプリング数)のデジタル値
+                    channels(list): dataの各行の行番号(Noneの場合は0から順)
+                Returns:
+                    数値のnp.ndarray(float64)
+                Note:
+                    記録時の変換係数(ヘッダのscale/intercept)を使う
+        '''
+        index = np.arange(data.shape[0]) if channels is None else np.asarray(channels)
+        return data * self._coef[0, index, None] + self._coef[1, index, None]
+
+    def _blocks(self, begin:int, end:int) -> (int,int):
+        ''' ブロック範囲取得メソッド
+                Args:
+                    begin(int): 先頭のサンプリング番号
+                    end(int): 終わりのサンプリング番号(含まない)
+                Returns:
+                    範囲に掛かる最初のブロック番号と最後の次のブロック番号
+                Note:
+        '''
+        if end <= begin:
+            return 0, 0
+        first = max(int(np.searchsorted(self.pIndex["index"], begin, "right")) - 1, 0)
+        last = int(np.searchsorted(self.pIndex["index"], end, "left"))
+        return first, last
+
+    def _read(self, ks, rows:list) -> list:
+        ''' 複数ブロック読込メソッド
+                Args:
+                    ks: ブロック番号の並び
+                    rows(list): 読み出す行番号
+                Returns:
+                    ブロック毎の(行数, サンプリング数)のデジタル値のlist
+                Note:
+                    圧縮ブロックはファイルから順に読み、展開はスレッドで並列に行う
+        '''
+        ks = list(ks)
+        if self.pCodec == clsCodec.CODEC_NONE:
+            return [self._block(k, rows) for k in ks]
+        bufs = []
+        for k in ks:
+            self._file.seek(int(self.pIndex["offset"][k]))
+            bufs.append(self._file.read(int(self.pIndex["size"][k])))
+        if len(ks) < 2:
+            return [self._decode(k, b, rows) for k, b in zip(ks, bufs)]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self._workers)
+        return list(self._pool.map(self._decode, ks, bufs, [rows] * len(ks)))
+
+    def _decode(self, k:int, buf:bytes, rows:list) -> np.ndarray:
+        ''' ブロック展開メソッド
+                Args:
+                    k(int): ブロック番号
+                    buf(bytes): 圧縮ブロック
+                    rows(list): 読み出す行番号
+                Returns:
+                    (行数, サンプリング数)のデジタル値
+                Note:
+        '''
+        block = np.empty((self.pChannelCount, int(self.pIndex["count"][k])), dtype=self._dtype)
+        clsCodec.Decode(buf, self.pCodec, block)
+        return block if rows == list(range(self.pChannelCount)) else block[rows]
+
+    def _block(self, k:int, rows:list) -> np.ndarray:
+        ''' ブロック読込メソッド(無圧縮)
+                Args:
+                    k(int): ブロック番号
+                    rows(list): 読み出す行番号
+                Returns:
+                    (行数, サンプリング数)のデジタル値
+                Note:
+                    行が少ない場合は行毎にseekして読み、多い場合はブロック全体を読む
+        '''
+        rec = self.pIndex[k]
+        n = int(rec["count"])
+        rowsize = n * self._dtype.itemsize
+        if len(rows) * 2 > self.pChannelCount:
+            self._file.seek(int(rec["offset"]))
+            block = np.fromfile(self._file, dtype=self._dtype, count=n * self.pChannelCount)
+            return block.reshape(self.pChannelCount, n)[rows]
+        data = np.empty((len(rows), n), dtype=self._dtype)
+        for j, r in enumerate(rows):
+            self._file.seek(int(rec["offset"]) + r * rowsize)
+            self._file.readinto(data[j])
+        return data
@@ -0,0 +1,466 @@
+# coding : utf-8
+import os
+import json
+import time
+import types
+import struct
+import threading
+import urllib.parse
+
+import ctypes
+import caio
+import numpy as np
+
+PREFIX:str = "replay:"                  # clsAD.Openのデバイス名接頭辞
+DEVICE_ID:int = 0x4000                  # 再生デバイスのID(以降連番)
+# rawファイルのヘッダ: magic, version, ヘッダbyte数, チャンネル数, サンプリングクロック(μsec), 分解能, 開始時刻
+RAW_HEADER = struct.Struct("<4sHHIdId")
+RAW_MAGIC:bytes = b"ADRW"
+# 再生デバイス独自のエラーコード(ドライバのエラーコードと重ならない値)
+ERR_UNSUPPORTED:int = 20000
+ERR_FILE:int = 20001
+_ERRORS:dict = {
+    ERR_UNSUPPORTED:"Replay: unsupported function or setting",
+    ERR_FILE:"Replay: cannot open the recorded file",
+}
+
+def Header(chcnt:int, clock:float, resolution:int=16, start:float=0.0) -> bytes:
+    ''' rawファイルヘッダ生成関数
+            Args:
+                chcnt(int): チャンネル数
+                clock(float): サンプリングクロック(μsec)
+                resolution(int): 分解能(bit)
+                start(float): 先頭サンプリングの時刻(time.time())
+            Returns:
+                ヘッダのbytes(続けて(サンプリング数, チャンネル数)のint32を書く)
+            Note:
+                連続入力を追記しながら記録する場合に使用する
+    '''
+    return RAW_HEADER.pack(RAW_MAGIC, 1, RAW_HEADER.size, chcnt, clock, resolution, start)
+
+def Save(path:str, data:np.ndarray, clock:float, resolution:int=16, start:float=0.0):
+    ''' 記録ファイル出力関数
+            Args:
+                path(str): 出力ファイル名(.npyの場合はnpy+JSON、それ以外はraw)
+                data(np.ndarray): (チャンネル数, サンプリング数)のデジタル値
+                clock(float): サンプリングクロック(μsec)
+                resolution(int): 分解能(bit)
+                start(float): 変換開始時刻(time.time())
+            Returns:
+            Note:
+                ファイル上はclsADの転送形式と同じ(サンプリング数, チャンネル数)のint32
+                npyの場合、設定はpath + ".json"に出力する
+    '''
+    rows = np.ascontiguousarray(np.asarray(data, dtype=np.int32).T)
+    meta = {"clock":clock, "resolution":resolution, "start":start}
+    if path.endswith(".npy"):
+        np.save(path, rows)
+        with open(path + ".json", "w") as file:
+            json.dump(meta, file)
+        return
+    with open(path, "wb") as file:
+        file.write(Header(rows.shape[1], clock, resolution, start))
+        file.write(rows.tobytes())
+
+def Load(path:str) -> (np.ndarray,dict):
+    ''' 記録ファイル読込関数
+            Args:
+                path(str): 記録ファイル名
+            Returns:
+                (サンプリング数, チャンネル数)のint32 memmapと設定dict
+            Note:
+                ファイル全体は読み込まず、memmapで参照する
+    '''
+    if path.endswith(".npy"):
+        rows = np.load(path, mmap_mode="r")
+        meta = {"clock":1000.0, "resolution":16, "start":0.0}
+        if os.path.exists(path + ".json"):
+            with open(path + ".json") as file:
+                meta.update(json.load(file))
+        return rows, meta
+    with open(path, "rb") as file:
+        magic, ver, hsize, chcnt, clock, reso, start = RAW_HEADER.unpack(file.read(RAW_HEADER.size))
+    if magic != RAW_MAGIC:
+        raise ValueError(f"{path} is not a clsAD raw file")
+    rows = np.memmap(path, dtype=np.int32, mode="r", offset=hsize).reshape(-1, chcnt)
+    return rows, {"clock":clock, "resolution":reso, "start":start}
+
+class clsReplay:
+    ''' clsReplay 記録再生デバイスクラス
+            Note:
+                記録ファイルをA/Dボードとして振る舞わせる
+                clsADが使用するcaio関数を同名のメソッドで実装し、
+                デバイスIDで再生デバイスに振り分ける代理オブジェクト経由で呼ばれる
+                変換開始からの経過時間×speedに応じてデータが格納されたように見せる
+                (speed=0の場合は即時に全データ)
+    '''
+
+    def __init__(self, path:str, speed:float=1.0, loop:bool=False):
+        ''' clsReplay コンストラクタ
+                Args:
+                    path(str): 記録ファイル名
+                    speed(float): 再生速度(1.0:記録時と同じ、N:N倍速、0:最速)
+                    loop(bool): 真の場合は終端で先頭に戻る
+                Returns:
+                Note:
+        '''
+        # public property
+        self.pPath:str = path
+        self.pSpeed:float = speed
+        self.pLoop:bool = loop
+        self.pPosition:int = 0                      # 次の変換開始で使うファイル上のサンプリング番号
+        # private property
+        self._rows, self._meta = Load(path)
+        self._chcnt:int = self._rows.shape[1]
+        self._period:float = self._meta["clock"] * 1e-6
+        self._setting:dict = {"Channels":self._chcnt, "StopTimes":0, "RepeatTimes":1,
+                    "EventTimes":0, "StopTrigger":0, "TransferMode":0,
+                    "MemorySize":self._rows.size}
+        self._running:bool = False
+        self._t0:float = 0.0
+        self._origin:int = 0                        # 変換開始時のファイル位置
+        self._stopped:int = -1                      # Stop時の格納数(-1:動作中)
+        self._taken:int = 0                         # 取得済サンプリング数
+        self._callback = None                       # (proc, mask)
+        self._id:int = 0                            # デバイスID(Openで設定)
+
+    # ---- 再生の時間モデル ----
+    def _total(self) -> int:
+        ''' 1回の変換で格納されるサンプリング数(上限なしは-1) '''
+        s = self._setting
+        if s["StopTrigger"] == 0 and s["StopTimes"] > 0:
+            n = s["StopTimes"] * max(1, s["RepeatTimes"])
+        else:
+            n = -1
+        if not self.pLoop:
+            left = self._rows.shape[0] - self._origin
+            n = left if n < 0 else min(n, left)
+        return n
+
+    def _produced(self) -> int:
+        ''' 現在までに格納されたサンプリング数 '''
+        if self._stopped >= 0:
+            return self._stopped
+        if not self._running:
+            return 0
+        total = self._total()
+        if self.pSpeed <= 0:
+            n = total if total >= 0 else self._rows.shape[0]
+        else:
+            n = int((time.perf_counter() - self._t0) * self.pSpeed / self._period)
+        return n if total < 0 else min(n, total)
+
+    def _copy(self, dst:np.ndarray, start:int, n:int):
+        ''' ファイルからの転送(終端で折り返し) '''
+        rows, ch, size = self._rows, self._setting["Channels"], self._rows.shape[0]
+        dst = dst.reshape(-1, ch)
+        k = 0
+        while k < n:
+            i = (start + k) % size
+            m = min(n - k, size - i)
+            dst[k:k + m] = rows[i:i + m, :ch]
+            k += m
+
+    @staticmethod
+    def _set(ref, value):
+        ''' byref/POINTERの出力引数へ設定 '''
+        obj = ref._obj if hasattr(ref, "_obj") else ref.contents
+        obj.value = value
+
+    # ---- caio互換メソッド(Idを除いた引数) ----
+    def AioExit(self):
+        _devices.pop(self._id, None)
+        return 0
+
+    def AioResetDevice(self):
+        self._running = False
+        self._stopped = -1
+        return 0
+
+    def AioResetProcess(self):
+        return 0
+
+    def AioGetAiResolution(self, reso):
+        self._set(reso, int(self._meta["resolution"]))
+        return 0
+
+    def AioGetAiMaxChannels(self, maxch):
+        self._set(maxch, self._chcnt)
+        return 0
+
+    def AioSetAiTransferMode(self, mode):
+        self._setting["TransferMode"] = mode
+        return ERR_UNSUPPORTED if mode else 0       # ユーザーバッファは非対応
+
+    def AioSetAiChannels(self, chcnt):
+        if chcnt > self._chcnt:
+            return ERR_UNSUPPORTED
+        self._setting["Channels"] = chcnt
+        return 0
+
+    def AioSetAiInputMethod(self, method):
+        return 0                                    # 記録済のデータのため無関係
+
+    def AioSetAiRange(self, ch, rng):
+        return 0                                    # レンジはclsADの数値変換のみに使用
+
+    def AioSetAiClockType(self, clktype):
+        return ERR_UNSUPPORTED if clktype else 0    # 内部クロック以外は非対応
+
+    def AioSetAiSamplingClock(self, clk):
+        return 0                                    # 記録時のクロックで再生する
+
+    def AioSetAiScanClock(self, clk):
+        return 0
+
+    def AioSetAiClockEdge(self, edge):
+        return 0
+
+    def AioSetAiMemoryType(self, mtype):
+        return ERR_UNSUPPORTED if mtype else 0      # リングメモリ(プリトリガ)は非対応
+
+    def AioSetAiMemorySize(self, size):
+        self._setting["MemorySize"] = size
+        return 0
+
+    def AioGetAiMemorySize(self, size):
+        self._set(size, self._setting["MemorySize"])
+        return 0
+
+    def AioGetAiSamplingClock(self, clk):
+        self._set(clk, self._meta["clock"])         # 記録時のクロック
+        return 0
+
+    def AioGetAiScanClock(self, clk):
+        self._set(clk, 0.0)
+        return 0
+
+    def AioGetAiSamplingDataSize(self, size):
+        self._set(size, 4)
+        return 0
+
+    def AioSetAiStopTimes(self, n):
+        self._setting["StopTimes"] = n
+        return 0
+
+    def AioSetAiRepeatTimes(self, n):
+        self._setting["RepeatTimes"] = n
+        return 0
+
+    def AioSetAiEventSamplingTimes(self, n):
+        self._setting["EventTimes"] = n
+        return 0
+
+    def AioSetAiStopTrigger(self, trig):
+        self._setting["StopTrigger"] = trig
+        return 0
+
+    def AioSetAiStartTrigger(self, trig):
+        return ERR_UNSUPPORTED if trig else 0       # ソフトウェア以外の開始条件は非対応
+
+    def AioSetAiStartLevel(self, *args):
+        return ERR_UNSUPPORTED                      # 変換データの比較(レベル・範囲)は非対応
+
+    AioSetAiStartInRange = AioSetAiStartOutRange = AioSetAiStartLevel
+    AioSetAiStopLevel = AioSetAiStopInRange = AioSetAiStopOutRange = AioSetAiStartLevel
+
+    def AioResetAiMemory(self):
+        self._taken = 0
+        return 0
+
+    def AioSetAiCallBackProc(self, proc, mask, param):
+        self._callback = (proc, mask)
+        return 0
+
+    def AioStartAi(self):
+        self._origin = self.pPosition
+        self._taken = 0
+        self._stopped = -1
+        self._running = True
+        self._t0 = time.perf_counter()
+        if self._callback is not None:
+            threading.Thread(target=self._notify, daemon=True).start()
+        return 0
+
+    def AioStopAi(self):
+        if self._running and self._stopped < 0:
+            self._stopped = self._produced()
+        self._running = False
+        return 0
+
+    def AioGetAiStatus(self, status):
+        n = self._produced()
+        total = self._total()
+        st = 0
+        if self._running and self._stopped < 0 and (total < 0 or n < total):
+            st |= caio.AIS_BUSY
+        ev = self._setting["EventTimes"]
+        if ev and n - self._taken >= ev:
+            st |= caio.AIS_DATA_NUM
+        self._set(status, st)
+        return 0
+
+    def AioGetAiSamplingCount(self, cnt):
+        self._set(cnt, self._produced() - self._taken)
+        return 0
+
+    def AioGetAiRepeatCount(self, cnt):
+        stop = self._setting["StopTimes"]
+        self._set(cnt, self._produced() // stop if stop else 0)
+        return 0
+
+    def AioGetAiSamplingData(self, cnt, data):
+        obj = cnt._obj if hasattr(cnt, "_obj") else cnt.contents
+        n = min(obj.value, self._produced() - self._taken)
+        ch = self._setting["Channels"]
+        if isinstance(data, ctypes.Array):
+            dst = np.ctypeslib.as_array(data)
+        else:
+            ptr = ctypes.cast(data, ctypes.POINTER(ctypes.c_int32))     # np.int32のバッファ
+            dst = np.ctypeslib.as_array(ptr, shape=(max(1, n) * ch,))
+        self._copy(dst[:n * ch], self._origin + self._taken, n)
+        self._taken += n
+        self.pPosition = self._origin + self._taken
+        if self.pLoop:
+            self.pPosition %= self._rows.shape[0]
+        obj.value = n
+        return 0
+
+    def AioMultiAi(self, chcnt, data):
+        i = (self._origin + self._produced()) % self._rows.shape[0]
+        np.ctypeslib.as_array(data)[:chcnt] = self._rows[i, :chcnt]
+        return 0
+
+    def AioMultiAiEx(self, chcnt, data):
+        return ERR_UNSUPPORTED                      # 電圧変換(レンジ情報なし)は非対応
+
+    def AioStartTmTimer(self, timerid, interval):
+        return ERR_UNSUPPORTED                      # タイマーは非対応(Pace/Wait)
+
+    def AioTmWait(self, timerid, wait):
+        return ERR_UNSUPPORTED
+
+    def _notify(self):
+        ''' A/Dイベント通知スレッド
+                Args:
+                Returns:
+                Note:
+                    リピート終了・変換終了の時刻にコールバックを呼ぶ
+        '''
+        proc, mask = self._callback
+        stop = self._setting["StopTimes"]
+        rpt = 0
+        while self._running and self._stopped < 0:
+            n = self._produced()
+            if stop and n // stop > rpt and mask & caio.AIE_RPTEND:
+                rpt = n // stop
+                proc(self._id, caio.AIOM_AIE_RPTEND, 0, 0, None)
+            total = self._total()
+            if total >= 0 and n >= total:
+                break
+            time.sleep(min(0.01, self._period * max(1, stop) / self.pSpeed) if self.pSpeed else 0.001)
+        if mask & caio.AIE_END:
+            proc(self._id, caio.AIOM_AIE_END, 0, 0, None)
+
+# ---- caioの代理オブジェクト ----
+_devices:dict = {}                      # デバイスID -> clsReplay
+_names:list = []                        # デバイス名(AioQueryDeviceNameの順)
+
+def _dispatch(name:str, func):
+    ''' caio関数の振り分け関数生成
+            Args:
+                name(str): caio関数名
+                func: 元のcaio関数
+            Returns:
+                先頭引数(Id)が再生デバイスの場合は再生デバイスのメソッドを呼ぶ関数
+            Note:
+                再生デバイスに無い関数はERR_UNSUPPORTEDを返す
+                (出力引数が設定されないまま成功扱いにしない)
+    '''
+    def call(id, *args):
+        dev = _devices.get(getattr(id, "value", id))
+        if dev is None:
+            return func(id, *args)
+        method = getattr(dev, name, None)
+        return method(*args) if method is not None else ERR_UNSUPPORTED
+    return call
+
+def _queryDeviceName(index, name, device):
+    ''' AioQueryDeviceName(再生デバイスを先頭に列挙) '''
+    if index < len(_names):
+        name.value = _names[index].encode("sjis")
+        device.value = b"Replay"
+        return 0
+    if not caio.AVAILABLE:
+        return ERR_UNSUPPORTED                  # 実ボードは列挙しない
+    return caio.AioQueryDeviceName(index - len(_names), name, device)
+
+def _getErrorString(ecode, buf):
+    ''' AioGetErrorString(再生デバイス独自のエラーコードに対応) '''
+    code = getattr(ecode, "value", ecode)
+    if code in _ERRORS:
+        buf.value = _ERRORS[code].encode("sjis")
+        return 0
+    if not caio.AVAILABLE:
+        buf.value = b"caio.dll is not loaded" if code else b""
+        return 0
+    return caio.AioGetErrorString(ecode, buf)
+
+def _proxy(base) -> types.SimpleNamespace:
+    ''' caio代理オブジェクト生成関数
+            Args:
+                base: 元のcaio(モジュールまたは代理オブジェクト)
+            Returns:
+                再生デバイスへ振り分ける代理オブジェクト
+            Note:
+    '''
+    proxy = types.SimpleNamespace(_replay=True)
+    for name in dir(base):
+        if name.startswith("__"):
+            continue
+        attr = getattr(base, name)
+        if name.startswith("Aio") and callable(attr) and name not in ("AioInit", "AioQueryDeviceName", "AioGetErrorString"):
+            attr = _dispatch(name, attr)
+        setattr(proxy, name, attr)
+    proxy.AioQueryDeviceName = _queryDeviceName
+    proxy.AioGetErrorString = _getErrorString
+    return proxy
+
+def Open(deviceName:str, pid:ctypes.c_short, module) -> int:
+    ''' 再生デバイスオープン関数
+            Args:
+                deviceName(str): "replay:<ファイル名>[?speed=N&loop=1]"
+                pid(ctypes.c_short): デバイスIDの出力先
+                module: caioを参照するモジュール(clsAD)
+            Returns:
+                エラーコード
+                0以外の場合はエラー
+            Note:
+                初回にmodule.caioを代理オブジェクトに差し替える
+                実ボードのIDはそのまま元のcaioに渡るため、実ボードと併用できる
+    '''
+    url = urllib.parse.urlsplit(deviceName[len(PREFIX):])
+    query = urllib.parse.parse_qs(url.query)
+    try:
+        dev = clsReplay(url.path, float(query.get("speed", ["1"])[0]),
+                query.get("loop", ["0"])[0] not in ("0", "false"))
+    except (OSError, ValueError):
+        return ERR_FILE
+    if not getattr(module.caio, "_replay", False):
+        module.caio = _proxy(module.caio)
+    pid.value = DEVICE_ID + len(_names)
+    dev._id = pid.value
+    _devices[pid.value] = dev
+    _names.append(deviceName)
+    return 0
+
+def Device(pid:ctypes.c_short) -> clsReplay:
+    ''' 再生デバイス取得関数
+            Args:
+                pid(ctypes.c_short): clsAD._pID
+            Returns:
+                clsReplay(再生デバイスでなければNone)
+            Note:
+                再生位置・速度の変更に使用する
+    '''
+    return _devices.get(pid.value)
@@ -0,0 +1,355 @@
+# coding : utf-8
+import os
+import sys
+import json
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 共有メモリのヘッダ(先頭に配置)
+MAGIC:int = 0x44416D6873                # "shmAD"
+MAX_READERS:int = 16                    # 読込プロセス数の上限
+HEADER = np.dtype([
+    ("magic", "<u8"),                   # MAGIC
+    ("chcnt", "<u8"),                   # チャンネル数
+    ("capacity", "<u8"),                # リングのサンプリング数
+    ("widx", "<u8"),                    # 書込済サンプリング数(通し番号)
+    ("wbegin", "<u8"),                  # 書込中ブロックの終端(widx以上、書込前に進める)
+    ("seq", "<u8"),                     # 書込済ブロック数
+    ("running", "<u8"),                 # 配信中フラグ
+    ("start", "<f8"),                   # 変換開始時刻(time.time())
+    ("period", "<f8"),                  # サンプリング周期(sec)
+    ("cfglen", "<u8"),                  # 設定JSONのbyte数
+    ("readers", [("pid", "<u8"), ("pos", "<u8"), ("lagged", "<u8")], (MAX_READERS,)),
+])
+CONFIG_OFFSET:int = 1024                # 設定JSONの位置
+DATA_OFFSET:int = 65536                 # リングデータの位置(ページ境界)
+STILL_ACTIVE:int = 259                  # GetExitCodeProcessの実行中コード(Windows)
+
+def _alive(pid:int) -> bool:
+    ''' プロセス生存確認関数
+            Args:
+                pid(int): プロセスID
+            Returns:
+                実行中なら真
+            Note:
+                Windowsのos.killはプロセスを終了させるためOpenProcessで確認する
+    '''
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)   # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5             # ERROR_ACCESS_DENIED:存在する
+        code = ctypes.c_ulong(0)
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return not ok or code.value == STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _reclaim(readers) -> int:
+    ''' 読込側登録枠回収関数
+            Args:
+                readers(np.ndarray): ヘッダのreaders
+            Returns:
+                回収した枠数
+            Note:
+                Closeせずに終了したプロセスの枠を空きに戻す
+    '''
+    cnt = 0
+    for slot in np.flatnonzero(readers["pid"] != 0):
+        if not _alive(int(readers["pid"][slot])):
+            readers["pid"][slot] = 0
+            cnt += 1
+    return cnt
+
+class clsShmServer:
+    ''' clsShmServer 共有メモリ配信クラス
+            Note:
+                clsADを占有し、連続入力のブロックを共有メモリ上のリングバッファに書き込む
+                読込側(clsShmClient)は別プロセスから自分のペースでゼロコピー参照する
+                書込側は読込側を待たない(遅い読込側は検出してlaggedに記録する)
+    '''
+
+    def __init__(self, cAD, name:str="clsAD_AIO000", capacity:int=1 << 20):
+        ''' clsShmServer コンストラクタ
+                Args:
+                    cAD(clsAD): オープン済・ADset設定済のclsAD
+                    name(str): 共有メモリ名
+                    capacity(int): リングのサンプリング数
+                Returns:
+                Note:
+        '''
+        # public property
+        self.pName:str = name
+        self.pCapacity:int = capacity
+        self.pLagged:int = 0                        # 遅い読込側の検出回数
+        # private property
+        self._ad = cAD
+        self._shm:shared_memory.SharedMemory = None
+        self._hdr = None
+        self._ring:np.ndarray = None                # (capacity, チャンネル数) int32
+        self._stop = threading.Event()
+
+    def Run(self, smprate:int, chcnt:int, latency:float=0.1) -> int:
+        ''' 配信メソッド
+                Args:
+                    smprate(int): サンプリングレート(μsec)
+                    chcnt(int): 入力チャンネル数
+                    latency(float): 目標遅延時間(sec)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー(入力中のドライバエラーはclsAD.pStreamError)
+                Note:
+                    Stopが呼ばれるまで戻らない
+        '''
+        self._create(chcnt)
+        hdr = self._hdr
+        ret = self._ad.StartStream(smprate, chcnt, latency)
+        if ret:
+            return ret
+        hdr["running"] = 1
+        try:
+            for data, axis in self._ad.Stream(withtime=True):
+                if self._stop.is_set():
+                    break
+                if hdr["seq"] == 0:
+                    hdr["start"] = axis.pStartTime
+                    hdr["period"] = axis.pPeriod
+                self._write(data)
+        finally:
+            hdr["running"] = 0
+        return self._ad.pStreamError
+
+    def Stop(self):
+        ''' 配信停止メソッド
+                Args:
+                Returns:
+                Note:
+                    別スレッド/シグナルハンドラから呼ぶ
+        '''
+        self._stop.set()
+
+    def Close(self):
+        ''' 共有メモリ解放メソッド
+                Args:
+                Returns:
+                Note:
+        '''
+        if self._shm is not None:
+            self._hdr = None
+            self._ring = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _create(self, chcnt:int):
+        ''' 共有メモリ作成メソッド
+                Args:
+                    chcnt(int): チャンネル数
+                Returns:
+                Note:
+                    設定JSONにはclsAD.ChannelConfig(ADset由来)を格納する
+        '''
+        cfg = json.dumps({
+                "device":self._ad.pName, "channels":self._ad.ChannelConfig(chcnt)
+            }).encode()
+        if CONFIG_OFFSET + len(cfg) > DATA_OFFSET:
+            raise ValueError("channel config too large")
+        size = DATA_OFFSET + self.pCapacity * chcnt * 4
+        self.Close()
+        self._shm = shared_memory.SharedMemory(name=self.pName, create=True, size=size)
+        self._hdr = np.ndarray((), dtype=HEADER, buffer=self._shm.buf)
+        self._hdr[()] = np.zeros((), dtype=HEADER)
+        self._shm.buf[CONFIG_OFFSET:CONFIG_OFFSET + len(cfg)] = cfg
+        self._hdr["chcnt"] = chcnt
+        self._hdr["capacity"] = self.pCapacity
+        self._hdr["cfglen"] = len(cfg)
+        self._ring = np.ndarray((self.pCapacity, chcnt), dtype=np.int32,
+                        buffer=self._shm.buf, offset=DATA_OFFSET)
+        self._hdr["magic"] = MAGIC
+
+    def _write(self, data:np.ndarray):
+        ''' ブロック書込メソッド
+                Args:
+                    data(np.ndarray): (チャンネル数, サンプリング数)
+                Returns:
+                Note:
+                    書込中の終端(wbegin)を先に進めてからデータを書き、最後に書込位置(widx)を進める
+                    読込側はwbeginで上書き中の範囲を判定する
+                    1周以上遅れた読込側はlaggedを加算する(待たない)
+                    終了済プロセスの枠は回収し、遅れとして数えない
+        '''
+        hdr = self._hdr
+        cap = self.pCapacity
+        n = data.shape[1]
+        widx = int(hdr["widx"])
+        if n > cap:             # リングより大きいブロックは末尾のみ
+            data = data[:, -cap:]
+            widx += n - cap
+            n = cap
+        hdr["wbegin"] = widx + n
+        start = widx % cap
+        first = min(n, cap - start)
+        self._ring[start:start + first] = data[:, :first].T
+        if first < n:
+            self._ring[:n - first] = data[:, first:].T
+        hdr["widx"] = widx + n
+        hdr["seq"] += 1
+        readers = hdr["readers"]
+        active = readers["pid"] != 0
+        lag = active & (widx + n - readers["pos"] > cap)
+        if lag.any() and _reclaim(readers):
+            lag &= readers["pid"] != 0
+        if lag.any():
+            readers["lagged"][lag] += 1
+            self.pLagged += int(lag.sum())
+
+class clsShmClient:
+    ''' clsShmClient 共有メモリ読込クラス
+            Note:
+                clsShmServerのリングを参照する
+                返すビューはコピーではないため、処理後にValidで上書きされていないか確認できる
+    '''
+
+    def __init__(self, name:str="clsAD_AIO000"):
+        ''' clsShmClient コンストラクタ
+                Args:
+                    name(str): 共有メモリ名
+                Returns:
+                Note:
+                    読込位置は接続時点の最新位置から始まる
+                    終了済プロセスの登録枠は回収して再利用する
+                    読込側の登録枠(MAX_READERS)が全て使用中の場合はRuntimeError
+        '''
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._hdr = np.ndarray((), dtype=HEADER, buffer=self._shm.buf)
+        if self._hdr["magic"] != MAGIC:
+            self._shm.close()
+            raise ValueError(f"{name} is not a clsAD shared memory")
+        # public property
+        cfglen = int(self._hdr["cfglen"])
+        self.pConfig:dict = json.loads(bytes(self._shm.buf[CONFIG_OFFSET:CONFIG_OFFSET + cfglen]))
+        self.pChannelCount:int = int(self._hdr["chcnt"])
+        self.pCapacity:int = int(self._hdr["capacity"])
+        self.pLost:int = 0                          # 読み遅れで失ったサンプリング数
+        self.pIndex:int = int(self._hdr["widx"])    # 次に読むサンプリング番号
+        # private property
+        self._ring = np.ndarray((self.pCapacity, self.pChannelCount), dtype=np.int32,
+                        buffer=self._shm.buf, offset=DATA_OFFSET)
+        self._slot:int = -1
+        readers = self._hdr["readers"]
+        free = np.flatnonzero(readers["pid"] == 0)
+        if not free.size and _reclaim(readers):
+            free = np.flatnonzero(readers["pid"] == 0)
+        if not free.size:
+            self._hdr = None
+            self._ring = None
+            self._shm.close()
+            raise RuntimeError(f"{name}: all {MAX_READERS} reader slots are in use")
+        self._slot = int(free[0])
+        readers["pos"][self._slot] = self.pIndex
+        readers["lagged"][self._slot] = 0
+        readers["pid"][self._slot] = os.getpid()
+
+    @property
+    def pRunning(self) -> bool:
+        ''' 配信中 '''
+        return bool(self._hdr["running"])
+
+    @property
+    def pLagged(self) -> int:
+        ''' 書込側に検出された読み遅れ回数 '''
+        return int(self._hdr["readers"]["lagged"][self._slot]) if self._slot >= 0 else 0
+
+    def Read(self, maxcnt:int=0) -> (int,list):
+        ''' 新規データ取得メソッド
+                Args:
+                    maxcnt(int): 最大サンプリング数(0:すべて)
+                Returns:
+                    先頭のサンプリング番号と(チャンネル数, サンプリング数)のビューのlist
+                    リング終端で折り返した場合はビューが2つになる
+                Note:
+                    1周以上遅れた場合は上書き中でない範囲まで読み飛ばし、pLostに加算する
+        '''
+        widx = int(self._hdr["widx"])
+        wbegin = max(int(self._hdr["wbegin"]), widx)
+        cap = self.pCapacity
+        if wbegin - self.pIndex > cap:
+            self.pLost += wbegin - self.pIndex - cap
+            self.pIndex = wbegin - cap
+        n = widx - self.pIndex
+        if maxcnt:
+            n = min(n, maxcnt)
+        index = self.pIndex
+        start = index % cap
+        first = min(n, cap - start)
+        views = [self._ring[start:start + first].T]
+        if first < n:
+            views.append(self._ring[:n - first].T)
+        self.pIndex = index + n
+        if self._slot >= 0:
+            self._hdr["readers"]["pos"][self._slot] = self.pIndex
+        return index, views
+
+    def Valid(self, index:int) -> bool:
+        ''' 上書き確認メソッド
+                Args:
+                    index(int): Readで得た先頭のサンプリング番号
+                Returns:
+                    そのビューがまだ上書きされていなければ真
+                Note:
+                    書込中の範囲(wbegin)も上書き済として判定する
+                    ビューの処理後に呼び、偽ならそのデータを破棄する
+        '''
+        return int(self._hdr["wbegin"]) - index <= self.pCapacity
+
+    def Close(self):
+        ''' 切断メソッド
+                Args:
+                Returns:
+                Note:
+        '''
+        if self._slot >= 0:
+            self._hdr["readers"]["pid"][self._slot] = 0
+            self._slot = -1
+        self._hdr = None
+        self._ring = None
+        self._shm.close()
+
+def main():
+    ''' 配信デーモン
+            Args:
+                sys.argv[1]: サンプリングレート(μsec、Default 1000)
+                sys.argv[2]: チャンネル数(Default 8)
+            Returns:
+            Note:
+                > python clsShmServer.py 1000 8
+                Ctrl+Cで停止
+    '''
+    import clsAD
+    smprate = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    chcnt = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    cAD = clsAD.clsAD()
+    if cAD.Open("AIO000"):
+        return
+    cAD.LoadADset("adtest.db")
+    cAD.SetRange()
+    server = clsShmServer(cAD)
+    try:
+        server.Run(smprate, chcnt)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.Close()
+        cAD.Close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+# coding : utf-8
+import os
+import sys
+import stat
+import json
+import queue
+import socket
+import struct
+import threading
+
+import numpy as np
+
+# フレーム形式
+#   ヘッダ: magic(2s) 種別(B) データ型(B) ペイロード長(I) シーケンス番号(Q)
+#   FRAME_CONFIG   : 設定JSON(device, rate, channels[name, range, min, max, offset, unit, ...])
+#   FRAME_CHUNK    : 先頭サンプリング番号(Q) チャンネル数(H) サンプリング数(I) + データ(チャンネル順)
+#   FRAME_SUBSCRIBE: クライアント→サーバ JSON {"channels":[...], "decimate":n}
+FRAME_HEADER = struct.Struct("<2sBBIQ")
+CHUNK_HEADER = struct.Struct("<QHI")
+MAGIC:bytes = b"AD"
+FRAME_CONFIG:int = 1
+FRAME_CHUNK:int = 2
+FRAME_SUBSCRIBE:int = 3
+DTYPE_INT32:int = 0
+DTYPE_UINT16:int = 1
+_DTYPES:dict = {DTYPE_INT32:np.dtype("<i4"), DTYPE_UINT16:np.dtype("<u2")}
+
+def _recvExact(sock:socket.socket, n:int) -> bytearray:
+    ''' 指定byte数受信関数
+            Args:
+                sock(socket.socket): ソケット
+                n(int): 受信byte数
+            Returns:
+                受信データ(切断時は例外ConnectionError)
+            Note:
+    '''
+    buf = bytearray(n)
+    view = memoryview(buf)
+    pos = 0
+    while pos < n:
+        r = sock.recv_into(view[pos:], n - pos)
+        if r == 0:
+            raise ConnectionError("connection closed")
+        pos += r
+    return buf
+
+def _frame(kind:int, dtype:int, seq:int, *payload) -> list:
+    ''' フレーム生成関数
+            Args:
+                kind(int): FRAME_*
+                dtype(int): DTYPE_*
+                seq(int): シーケンス番号
+                payload: bytes-likeの並び
+            Returns:
+                [ヘッダ, ペイロード...]のlist(送信時に連結)
+            Note:
+    '''
+    size = sum(memoryview(p).nbytes for p in payload)
+    return [FRAME_HEADER.pack(MAGIC, kind, dtype, size, seq), *payload]
+
+class clsSockServer:
+    ''' clsSockServer ソケット配信クラス
+            Note:
+                clsADの連続入力ブロックをバイナリフレームでTCP/Unixソケットへ配信する
+                クライアント毎に送信キューを持ち、溢れた場合はそのクライアント分を捨てる
+                (遅いクライアントがデバイスの読込を止めることはない)
+    '''
+
+    def __init__(self, cAD, address=("0.0.0.0", 50000), queuesize:int=64):
+        ''' clsSockServer コンストラクタ
+                Args:
+                    cAD(clsAD): オープン済・ADset設定済のclsAD
+                    address: (host, port)ならTCP、strならUnixソケットのパス
+                    queuesize(int): クライアント毎の送信キューのフレーム数
+                Returns:
+                Note:
+        '''
+        # public property
+        self.pAddress = address
+        self.pQueueSize:int = queuesize
+        self.pClients:list = []                     # 接続中のclsClient
+        # private property
+        self._ad = cAD
+        self._config:dict = {}
+        self._dtype:int = DTYPE_INT32               # 送信データ型
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sock:socket.socket = None
+
+    class clsClient():
+        ''' clsClient 接続クライアントクラス
+                Note:
+                    送信スレッドがキューからフレームを取り出して送る
+        '''
+        def __init__(self, server, sock:socket.socket, addr):
+            ''' clsClient コンストラクタ
+                    Args:
+                        server(clsSockServer): 配信サーバ
+                        sock(socket.socket): 接続ソケット
+                        addr: 接続元アドレス
+                    Returns:
+                    Note:
+            '''
+            # public property
+            self.pAddress = addr
+            self.pChannels:np.ndarray = None        # 送信チャンネル番号(None:全チャンネル)
+            self.pDecimate:int = 1                  # 間引き数
+            self.pDropped:int = 0                   # キュー溢れで捨てたフレーム数
+            self.pSent:int = 0                      # 送信したフレーム数
+            # private property
+            self._server = server
+            self._sock = sock
+            self._queue = queue.Queue(server.pQueueSize)
+            self._seq:int = 0                       # フレーム毎のシーケンス番号
+            self._phase:int = 0                     # 次に送るサンプリング番号(間引き位置)
+            self._alive:bool = True
+
+        def Enqueue(self, frame:list):
+            ''' 送信フレーム登録(待たない) '''
+            try:
+                self._queue.put_nowait(frame)
+            except queue.Full:
+                self.pDropped += 1
+
+        def NextSeq(self) -> int:
+            ''' シーケンス番号取得(捨てたフレームも番号を消費する) '''
+            self._seq += 1
+            return self._seq
+
+        def Select(self, data:np.ndarray, index:int) -> (int,np.ndarray):
+            ''' チャンネル選択・間引き
+                    Args:
+                        data(np.ndarray): (チャンネル数, サンプリング数)
+                        index(int): 先頭のサンプリング番号
+                    Returns:
+                        送信する先頭のサンプリング番号とデータ
+                    Note:
+                        ブロックを跨いでも間引き位置が連続するようにする
+            '''
+            if self.pChannels is not None:
+                data = data[self.pChannels]
+            if self.pDecimate > 1:
+                skip = max(0, self._phase - index)
+                data = data[:, skip::self.pDecimate]
+                index += skip
+                self._phase = index + data.shape[1] * self.pDecimate
+            return index, data
+
+        def SendLoop(self):
+            ''' 送信スレッド
+                    Note:
+                        Noneを受け取るか送信エラーで終了する
+            '''
+            try:
+                while True:
+                    frame = self._queue.get()
+                    if frame is None:
+                        break
+                    self._sock.sendall(b"".join(frame))
+                    self.pSent += 1
+            except OSError:
+                pass
+            finally:
+                self._alive = False
+                self._server._remove(self)
+                self._sock.close()
+
+        def RecvLoop(self):
+            ''' 受信スレッド(購読設定)
+                    Note:
+                        FRAME_SUBSCRIBEでチャンネル・間引きを変更する
+                        不正な購読要求を受けた場合はそのクライアントを切断する
+            '''
+            try:
+                while self._alive:
+                    magic, kind, _, size, _ = FRAME_HEADER.unpack(_recvExact(self._sock, FRAME_HEADER.size))
+                    if magic != MAGIC:
+                        break
+                    payload = _recvExact(self._sock, size)
+                    if kind == FRAME_SUBSCRIBE and not self.Subscribe(json.loads(payload)):
+                        break
+            except (OSError, ValueError, ConnectionError):
+                pass
+            finally:
+                self.Close()
+
+        def Subscribe(self, req) -> bool:
+            ''' 購読設定
+                    Args:
+                        req: FRAME_SUBSCRIBEのJSON {"channels":[...]|None, "decimate":n}
+                    Returns:
+                        真の場合は設定した、偽の場合は不正な要求(設定は変えない)
+                    Note:
+                        配信側(Select)で例外にならないよう、チャンネル番号は
+                        0以上・配信チャンネル数未満の整数のみ、間引き数は1以上の整数のみ受け付ける
+            '''
+            if not isinstance(req, dict):
+                return False
+            chcnt = len(self._server._config.get("channels", []))
+            ch = req.get("channels")
+            decimate = req.get("decimate", 1)
+            if ch is not None and (not isinstance(ch, list) or not ch or
+                    not all(type(c) is int and 0 <= c < chcnt for c in ch)):
+                return False
+            if type(decimate) is not int or decimate < 1:
+                return False
+            self.pChannels = None if ch is None else np.asarray(ch, dtype=np.intp)
+            self.pDecimate = decimate
+            return True
+
+        def Close(self):
+            ''' 切断(送信スレッドを終了させる) '''
+            if self._alive:
+                self._alive = False
+                try:
+                    self._queue.put_nowait(None)
+                except queue.Full:
+                    self._sock.close()
+
+    def Run(self, smprate:int, chcnt:int, latency:float=0.1) -> int:
+        ''' 配信メソッド
+                Args:
+                    smprate(int): サンプリングレート(μsec)
+                    chcnt(int): 入力チャンネル数
+                    latency(float): 目標遅延時間(sec)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー(入力中のドライバエラーはclsAD.pStreamError)
+                Note:
+                    Stopが呼ばれるまで戻らない
+                    最初のブロックで開始時刻・周期が決まった時点で、接続済のクライアントに
+                    設定フレームを送り直す
+        '''
+        self._config = {
+                "device":self._ad.pName, "rate":smprate, "channels":self._ad.ChannelConfig(chcnt)
+            }
+        # 分解能16bit以下はuint16で送る
+        reso = max(c["resolution"] for c in self._config["channels"])
+        self._dtype = DTYPE_UINT16 if 0 < reso <= 16 else DTYPE_INT32
+        self._listen()
+        ret = self._ad.StartStream(smprate, chcnt, latency)
+        if ret:
+            return ret
+        try:
+            for data, axis in self._ad.Stream(withtime=True):
+                if self._stop.is_set():
+                    break
+                if "start" not in self._config:
+                    self._sendConfig(axis)
+                self._broadcast(data, axis.pIndex)
+        finally:
+            self.Close()
+        return self._ad.pStreamError
+
+    def Stop(self):
+        ''' 配信停止メソッド '''
+        self._stop.set()
+
+    def Close(self):
+        ''' 待受・全クライアント切断メソッド '''
+        self._stop.set()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            self._unlink()
+        with self._lock:
+            clients = list(self.pClients)
+        for c in clients:
+            c.Close()
+
+    def _listen(self):
+        ''' 待受開始メソッド
+                Note:
+                    受付スレッドを起動する
+                    Unixソケットは前回の残り(異常終了等)を削除してからbindする
+        '''
+        if isinstance(self.pAddress, str):
+            self._unlink()
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(self.pAddress)
+        self._sock.listen()
+        threading.Thread(target=self._acceptLoop, daemon=True).start()
+
+    def _unlink(self):
+        ''' Unixソケットのパス削除(ソケットファイルの場合のみ) '''
+        if isinstance(self.pAddress, str) and os.path.exists(self.pAddress) and \
+                stat.S_ISSOCK(os.stat(self.pAddress).st_mode):
+            os.unlink(self.pAddress)
+
+    def _sendConfig(self, axis):
+        ''' 設定フレーム再送メソッド
+                Args:
+                    axis(clsAD.clsTimeAxis): 最初のブロックの時間軸
+                Returns:
+                Note:
+                    以降に接続したクライアントには開始時刻・周期を含む設定を送る
+        '''
+        with self._lock:
+            self._config["start"] = axis.pStartTime
+            self._config["period"] = axis.pPeriod
+            frame = _frame(FRAME_CONFIG, self._dtype, 0, json.dumps(self._config).encode())
+            clients = list(self.pClients)
+        for c in clients:
+            c.Enqueue(frame)
+
+    def _acceptLoop(self):
+        ''' 受付スレッド
+                Note:
+                    接続毎に設定フレームを送ってから送受信スレッドを起動する
+        '''
+        while not self._stop.is_set():
+            try:
+                sock, addr = self._sock.accept()
+            except OSError:
+                break
+            if sock.family != getattr(socket, "AF_UNIX", None):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = self.clsClient(self, sock, addr)
+            with self._lock:        # _sendConfigとの間で設定の送り漏れが無いように
+                client.Enqueue(_frame(FRAME_CONFIG, self._dtype, 0, json.dumps(self._config).encode()))
+                self.pClients.append(client)
+            threading.Thread(target=client.SendLoop, daemon=True).start()
+            threading.Thread(target=client.RecvLoop, daemon=True).start()
+
+    def _broadcast(self, data:np.ndarray, index:int):
+        ''' ブロック配信メソッド
+                Args:
+                    data(np.ndarray): (チャンネル数, サンプリング数)のデジタル値
+                    index(int): 先頭のサンプリング番号
+                Note:
+                    全チャンネルの変換は1回だけ行い、クライアント毎には選択・間引きのみ
+        '''
+        codes = np.ascontiguousarray(data, dtype=_DTYPES[self._dtype])
+        with self._lock:
+            clients = list(self.pClients)
+        for c in clients:
+            try:
+                first, sel = c.Select(codes, index)
+            except (IndexError, ValueError):    # 購読設定はSubscribeで検証済(念のため入力を止めない)
+                c.Close()
+                continue
+            sel = np.ascontiguousarray(sel)
+            c.Enqueue(_frame(FRAME_CHUNK, self._dtype, c.NextSeq(),
+                        CHUNK_HEADER.pack(first, sel.shape[0], sel.shape[1]), sel.data))
+
+    def _remove(self, client):
+        ''' 切断クライアント削除 '''
+        with self._lock:
+            if client in self.pClients:
+                self.pClients.remove(client)
+
+class clsSockClient:
+    ''' clsSockClient ソケット受信クラス
+            Note:
+                clsSockServerに接続し、チャンクフレームをnp.ndarrayへ復号する
+    '''
+
+    def __init__(self, address=("127.0.0.1", 50000)):
+        ''' clsSockClient コンストラクタ
+                Args:
+                    address: (host, port)ならTCP、strならUnixソケットのパス
+                Returns:
+                Note:
+                    接続後、最初の設定フレームを受信してpConfigに格納する
+        '''
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.connect(address)
+        # public property
+        self.pConfig:dict = {}
+        self.pSeq:int = 0                           # 最後に受信したシーケンス番号
+        self.pGaps:int = 0                          # サーバ側で捨てられたフレーム数
+        kind, _, _, payload = self._recv()
+        if kind == FRAME_CONFIG:
+            self.pConfig = json.loads(payload)
+
+    def Subscribe(self, channels:list=None, decimate:int=1):
+        ''' 購読設定メソッド
+                Args:
+                    channels(list): チャンネル番号のlist(None:全チャンネル)
+                    decimate(int): 間引き数
+                Returns:
+                Note:
+        '''
+        payload = json.dumps({"channels":channels, "decimate":decimate}).encode()
+        self._sock.sendall(b"".join(_frame(FRAME_SUBSCRIBE, 0, 0, payload)))
+
+    def Recv(self) -> (int,int,np.ndarray):
+        ''' チャンク受信メソッド
+                Args:
+                Returns:
+                    シーケンス番号、先頭サンプリング番号、(チャンネル数, サンプリング数)のnp.ndarray
+                Note:
+                    設定フレームを受信した場合はpConfigを更新して次を待つ
+        '''
+        while True:
+            kind, dtype, seq, payload = self._recv()
+            if kind == FRAME_CONFIG:
+                self.pConfig = json.loads(payload)
+                continue
+            if kind != FRAME_CHUNK:
+                continue
+            if self.pSeq and seq != self.pSeq + 1:
+                self.pGaps += seq - self.pSeq - 1
+            self.pSeq = seq
+            index, chcnt, cnt = CHUNK_HEADER.unpack_from(payload)
+            data = np.frombuffer(payload, dtype=_DTYPES[dtype], offset=CHUNK_HEADER.size,
+                        count=chcnt * cnt).reshape(chcnt, cnt)
+            return seq, index, data
+
+    def Close(self):
+        ''' 切断メソッド '''
+        self._sock.close()
+
+    def _recv(self) -> (int,int,int,bytearray):
+        ''' フレーム受信
+                Returns:
+                    種別、データ型、シーケンス番号、ペイロード
+        '''
+        magic, kind, dtype, size, seq = FRAME_HEADER.unpack(_recvExact(self._sock, FRAME_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("bad frame")
+        return kind, dtype, seq, _recvExact(self._sock, size)
+
+def main():
+    ''' 配信サーバ
+            Args:
+                sys.argv[1]: サンプリングレート(μsec、Default 1000)
+                sys.argv[2]: チャンネル数(Default 8)
+                sys.argv[3]: ポート番号(Default 50000)
+            Returns:
+            Note:
+                > python clsSockServer.py 1000 8 50000
+                Ctrl+Cで停止
+    '''
+    import clsAD
+    smprate = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    chcnt = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    port = int(sys.argv[3]) if len(sys.argv) > 3 else 50000
+    cAD = clsAD.clsAD()
+    if cAD.Open("AIO000"):
+        return
+    cAD.LoadADset("adtest.db")
+    cAD.SetRange()
+    server = clsSockServer(cAD, ("0.0.0.0", port))
+    try:
+        server.Run(smprate, chcnt)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.Close()
+        cAD.Close()
+
+if __name__ == "__main__":
+    main()
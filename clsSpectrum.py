@@ -0,0 +1,120 @@
+# coding : utf-8
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+class clsSpectrum:
+    ''' clsSpectrum スペクトル解析クラス
+            Note:
+                (チャンネル数, サンプリング数)のブロックを順次受け取り、
+                Welch法(窓掛け・オーバーラップ)で全チャンネルのパワースペクトル密度を平均する
+                保持するのは未処理の端数(nfft未満)と積算値のみで、
+                ストリームの長さによらずメモリ使用量は一定
+    '''
+
+    # 窓関数
+    _WINDOWS:dict = {"hann":np.hanning, "hamming":np.hamming, "blackman":np.blackman}
+
+    def __init__(self, chcnt:int, fs:float, nfft:int=1024, overlap:float=0.5,
+                 window:str="hann", alpha:float=0.0):
+        ''' clsSpectrum コンストラクタ
+                Args:
+                    chcnt(int): チャンネル数
+                    fs(float): サンプリング周波数(Hz)
+                    nfft(int): セグメント長
+                    overlap(float): オーバーラップ率(0.0~1.0未満)
+                    window(str): 窓関数 hann|hamming|blackman|boxcar
+                    alpha(float): 0の場合は全セグメントの単純平均
+                                0<alpha<=1の場合は指数移動平均(新セグメントの重み)
+                Returns:
+                Note:
+        '''
+        # public property
+        self.pChannelCount:int = chcnt
+        self.pFs:float = fs
+        self.pNfft:int = nfft
+        self.pHop:int = max(1, int(nfft * (1.0 - overlap)))
+        self.pAlpha:float = alpha
+        self.pFreq:np.ndarray = np.fft.rfftfreq(nfft, 1.0 / fs)    # 周波数軸(Hz)
+        self.pSegments:int = 0                      # 平均したセグメント数
+        # private property
+        if window == "boxcar":
+            self._win = np.ones(nfft)
+        else:
+            self._win = self._WINDOWS[window](nfft + 1)[:-1]   # periodic窓
+        # 密度換算係数(片側スペクトル、直流/ナイキストは2倍しない)
+        self._scale = np.full(self.pFreq.size, 2.0 / (fs * (self._win ** 2).sum()))
+        self._scale[0] /= 2.0
+        if nfft % 2 == 0:
+            self._scale[-1] /= 2.0
+        self._rest:np.ndarray = np.empty((chcnt, 0))   # 未処理の端数
+        self._acc:np.ndarray = np.zeros((chcnt, self.pFreq.size))
+
+    def Reset(self):
+        ''' 状態リセットメソッド
+                Args:
+                Returns:
+                Note:
+        '''
+        self._rest = np.empty((self.pChannelCount, 0))
+        self._acc[:] = 0.0
+        self.pSegments = 0
+
+    def Process(self, data:np.ndarray) -> int:
+        ''' ブロック入力メソッド
+                Args:
+                    data(np.ndarray): (チャンネル数, サンプリング数)のブロック
+                Returns:
+                    今回平均に加えたセグメント数
+                Note:
+                    全セグメント・全チャンネルをまとめてnp.fft.rfftする
+                    各セグメントは平均値を除去(detrend='constant')
+        '''
+        x = np.concatenate((self._rest, np.asarray(data, dtype=np.float64)), axis=1)
+        if x.shape[1] < self.pNfft:
+            self._rest = x
+            return 0
+        seg = sliding_window_view(x, self.pNfft, axis=1)[:, ::self.pHop]   # (ch, seg, nfft)
+        nseg = seg.shape[1]
+        self._rest = x[:, nseg * self.pHop:].copy()
+        seg = (seg - seg.mean(axis=2, keepdims=True)) * self._win
+        p = np.abs(np.fft.rfft(seg, axis=2)) ** 2 * self._scale     # (ch, seg, nfreq)
+        if self.pAlpha > 0.0:
+            for k in range(nseg):
+                if self.pSegments == 0:
+                    self._acc[:] = p[:, k]
+                else:
+                    self._acc += self.pAlpha * (p[:, k] - self._acc)
+                self.pSegments += 1
+        else:
+            self._acc += p.sum(axis=1)
+            self.pSegments += nseg
+        return nseg
+
+    def PSD(self) -> np.ndarray:
+        ''' パワースペクトル密度取得メソッド
+                Args:
+                Returns:
+                    (チャンネル数, 周波数数)のnp.ndarray(単位^2/Hz)
+                    周波数軸は.pFreq
+                Note:
+                    いつでも呼び出せる(未入力の場合は0)
+        '''
+        if self.pAlpha > 0.0 or self.pSegments == 0:
+            return self._acc.copy()
+        return self._acc / self.pSegments
+
+    def BandRMS(self, bands:list) -> np.ndarray:
+        ''' 帯域実効値取得メソッド
+                Args:
+                    bands(list): [(下限Hz, 上限Hz), ...]
+                Returns:
+                    (チャンネル数, 帯域数)のnp.ndarray
+                Note:
+                    PSDを帯域内で積分した平方根
+                    下限<=f<上限の周波数ビンを対象とする
+        '''
+        psd = self.PSD()
+        df = self.pFs / self.pNfft
+        edges = np.asarray(bands, dtype=np.float64)
+        mask = (self.pFreq >= edges[:, :1]) & (self.pFreq < edges[:, 1:])  # (帯域数, 周波数数)
+        return np.sqrt(psd @ mask.T.astype(np.float64) * df)
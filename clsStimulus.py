@@ -0,0 +1,144 @@
+# coding : utf-8
+import time
+
+import ctypes
+import caio
+import numpy as np
+
+class clsStimulus:
+    ''' clsStimulus 刺激応答計測クラス
+            Note:
+                イベントコントローラ(AioSetEcuSignal)でD/A出力とA/D入力を結線し、
+                波形出力と応答入力をハードウェアで同時に開始する
+                SYNC_CLOCKではA/DをD/Aのサンプリングクロックで変換するため、
+                出力と入力のサンプリングが1対1に揃う
+    '''
+
+    # 同期方式
+    SYNC_START:int = 0              # 開始信号のみ共有(クロックは各々の内部クロック)
+    SYNC_CLOCK:int = 1              # 開始信号とD/Aサンプリングクロックを共有
+
+    def __init__(self, cAD, cDA):
+        ''' clsStimulus コンストラクタ
+                Args:
+                    cAD(clsAD): オープン済のclsAD
+                    cDA(clsDA): cADにAttach済のclsDA(同一ボード)
+                Returns:
+                Note:
+        '''
+        # public property
+        self.pErrorStr:str = ""
+        self.pStimulus:np.ndarray = None            # 出力した波形(チャンネル数, サンプリング数)
+        self.pResponse:np.ndarray = None            # 入力したデジタル値(チャンネル数, サンプリング数)
+        self.pTime:np.ndarray = None                # 経過時間(sec)
+        # private property
+        self._ad = cAD
+        self._da = cDA
+
+    def Run(self, values:np.ndarray, smprate:int, aichcnt:int, mode:int=SYNC_CLOCK,
+            post:int=0, timeout:float=10.0) -> int:
+        ''' 刺激応答計測メソッド
+                Args:
+                    values(np.ndarray): (D/Aチャンネル数, サンプリング数)の出力波形(数値)
+                    smprate(int): サンプリングレート(μsec、A/D・D/A共通)
+                    aichcnt(int): A/D入力チャンネル数
+                    mode(int): SYNC_START|SYNC_CLOCK
+                    post(int): 波形出力後に追加で入力するサンプリング数(SYNC_STARTのみ)
+                    timeout(float): 完了待ちの上限(sec)
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                    タイムアウト時はclsAD.ERR_TIMEOUT(停止までに入力した分を結果とする)
+                Note:
+                    結果は.pStimulus/.pResponse/.pTime
+                    SYNC_CLOCKではD/A出力が終わるとクロックも止まるため、
+                    入力数は出力数と同じになる
+                    終了後、イベントコントローラの結線とクロック種別(pClockType)を元に戻す
+        '''
+        values = np.atleast_2d(values)
+        cnt = values.shape[1]
+        ad, da = self._ad, self._da
+        pid = ad._pID
+        route = [(caio.AIOECU_DEST_AI_START, caio.AIOECU_SRC_START)]
+        if mode == self.SYNC_CLOCK:
+            route.append((caio.AIOECU_DEST_AI_CLK, caio.AIOECU_SRC_AO_CLK))
+            post = 0
+        saved = []
+        clktype = ad.pClockType
+        lret = ctypes.c_long(0)
+        try:
+            # 結線(変更前の接続元を保存)
+            for dest, src in route:
+                old = ctypes.c_short()
+                lret.value = caio.AioGetEcuSignal(pid, dest, ctypes.byref(old))
+                if lret.value == 0:
+                    saved.append((dest, old.value))
+                lret.value = caio.AioSetEcuSignal(pid, dest, src)
+                ad._ErrorHandler(lret)
+                if lret.value:
+                    return lret.value
+            if mode == self.SYNC_CLOCK:     # Startで再設定されるためpClockTypeを変更する
+                lret.value = ad.SetClock(ad.CLOCK_ECU)
+                if lret.value:
+                    return lret.value
+            # 出力波形の転送と出力条件
+            lret.value = da.SetWaveform(values)
+            if lret.value:
+                return lret.value
+            lret.value = da._setup(smprate, values.shape[0], 1)
+            if lret.value:
+                return lret.value
+            # A/Dをイベントコントローラの開始信号待ちで起動
+            trg = ad.pStartTrigger
+            ad.pStartTrigger = ad.START_ECU
+            lret.value = ad.Start(cnt + post, smprate, aichcnt, ad.SAMPLE_ASYNC)
+            ad.pStartTrigger = trg
+            if lret.value:
+                return lret.value
+            # D/A開始 → ソフトウェア開始信号でA/Dも同時に開始
+            lret.value = caio.AioStartAo(pid)
+            da._ErrorHandler(lret)
+            if lret.value:
+                ad.Stop()
+                return lret.value
+            limit = time.perf_counter() + timeout
+            period = max(0.001, cnt * smprate * 1e-6 / 20)
+            expired = False
+            while ad.pIsBusy:
+                if time.perf_counter() > limit:
+                    ad.Stop()
+                    da.Stop()
+                    expired = True
+                    break
+                time.sleep(period)
+            ret = ad.Read()
+            if not isinstance(ret, tuple):  # Readはエラー時にエラーコードのみを返す
+                lret.value = ret
+                return lret.value
+            self.pStimulus = values
+            self.pResponse = np.vstack([ad.pCh[i].pData for i in range(aichcnt)])
+            self.pTime = ad.pTimeAxis.toArray(relative=True)
+            if expired:
+                lret.value = ad.ERR_TIMEOUT
+        finally:
+            if ad.pClockType != clktype:
+                ad.SetClock(clktype)
+            for dest, old in saved:
+                caio.AioSetEcuSignal(pid, dest, old)
+            self.pErrorStr = ad.pErrorStr
+        if lret.value == ad.ERR_TIMEOUT:
+            self.pErrorStr = f"[{ad.ERR_TIMEOUT}] response is not completed in {timeout} sec"
+        return lret.value
+
+    def Values(self) -> np.ndarray:
+        ''' 応答の数値取得メソッド
+                Args:
+                Returns:
+                    (A/Dチャンネル数, サンプリング数)の数値
+                    Runで入力する前は(0, 0)
+                Note:
+                    Read時に各clsChannel.pValueで変換済
+        '''
+        if self.pResponse is None:
+            return np.empty((0, 0))
+        return np.vstack([self._ad.pCh[i].pValue for i in range(self.pResponse.shape[0])])
@@ -0,0 +1,218 @@
+# coding : utf-8
+import ctypes
+import caio
+import numpy as np
+
+class clsSync:
+    ''' clsSync 複数ボード同期入力クラス
+            Note:
+                マスターボードのサンプリングクロックと開始信号を同期バス(AIOECU_DEST_MASTER*)に出し、
+                スレーブボードは同期バス(AIOECU_SRC_SLAVE*)から受けて変換する
+                全ボードが同じクロックで変換するため、サンプリング番号がそのまま揃う
+                (ソフトウェアでの再サンプリング・位置合わせは不要)
+                ボード間は同期バスケーブルで接続しておくこと
+    '''
+
+    # 同期バスの割当て(マスター出力, スレーブ入力)
+    BUS_CLOCK:tuple = (caio.AIOECU_DEST_MASTER1, caio.AIOECU_SRC_SLAVE1)   # サンプリングクロック
+    BUS_START:tuple = (caio.AIOECU_DEST_MASTER2, caio.AIOECU_SRC_SLAVE2)   # 変換開始信号
+
+    def __init__(self, master, slaves:list):
+        ''' clsSync コンストラクタ
+                Args:
+                    master(clsAD): クロックを出すオープン済のclsAD
+                    slaves(list): クロックを受けるオープン済のclsADのlist
+                Returns:
+                Note:
+        '''
+        # public property
+        self.pErrorStr:str = ""
+        self.pMaster = master
+        self.pSlaves:list = list(slaves)
+        self.pChannels:list = []                    # ボード毎の入力チャンネル数(pBoards順)
+        # private property
+        self._saved:list = []                       # 結線前の接続元[(clsAD, dest, src)]
+        self._clocks:list = []                      # 結線前のスレーブのクロック種別[(clsAD, pClockType)]
+        self._pending:list = []                     # ReadChunkで揃えきれなかった残り(ボード毎)
+        self._routed:bool = False
+
+    @property
+    def pBoards(self) -> list:
+        ''' マスター、スレーブの順のclsADのlist '''
+        return [self.pMaster] + self.pSlaves
+
+    def Route(self) -> int:
+        ''' 同期バス結線メソッド
+                Args:
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    マスター: 内部クロック→MASTER1、ソフトウェア開始→MASTER2
+                    スレーブ: SLAVE1→A/Dクロック、SLAVE2→A/D開始
+                    スレーブのクロック種別はイベントコントローラ出力(CLOCK_ECU)、
+                    開始条件はSTART_ECUにする
+                    Releaseで元に戻す
+        '''
+        m = self.pMaster
+        ret = self._route(m, self.BUS_CLOCK[0], caio.AIOECU_SRC_AI_CLK)
+        if ret == 0:
+            ret = self._route(m, self.BUS_START[0], caio.AIOECU_SRC_START)
+        for s in self.pSlaves:
+            if ret:
+                break
+            ret = self._route(s, caio.AIOECU_DEST_AI_CLK, self.BUS_CLOCK[1])
+            if ret == 0:
+                ret = self._route(s, caio.AIOECU_DEST_AI_START, self.BUS_START[1])
+            if ret == 0:
+                # Startで再設定されるためpClockTypeを変更する
+                self._clocks.append((s, s.pClockType))
+                ret = s.SetClock(s.CLOCK_ECU)
+            s.pStartTrigger = s.START_ECU
+        if ret:
+            self.Release()
+            return ret
+        self._routed = True
+        return ret
+
+    def Release(self):
+        ''' 同期バス解除メソッド
+                Args:
+                Returns:
+                Note:
+                    結線を元に戻し、スレーブのクロック種別を結線前に、開始条件をソフトウェアに戻す
+        '''
+        for board, dest, src in reversed(self._saved):
+            caio.AioSetEcuSignal(board._pID, dest, src)
+        self._saved = []
+        for s, clktype in self._clocks:
+            s.SetClock(clktype)
+        self._clocks = []
+        for s in self.pSlaves:
+            s.pStartTrigger = s.START_SOFTWARE
+        self._routed = False
+
+    def Start(self, smpcnt:int, smprate:int, chcnt, eventCnt:int=0) -> int:
+        ''' 同期入力開始メソッド
+                Args:
+                    smpcnt(int): サンプリング数(0の場合はStopまで連続入力)
+                    smprate(int): サンプリングレート(μsec、マスターに設定)
+                    chcnt: 入力チャンネル数(int:全ボード共通|list:ボード毎)
+                    eventCnt(int): サンプルイベント回数
+                Returns:
+                    エラーコード
+                    0以外の場合はエラー
+                Note:
+                    スレーブを開始信号待ちで起動してから、マスターを開始する
+                    スレーブのサンプリングレートはクロックが外部のため参照されない
+        '''
+        if not self._routed:
+            ret = self.Route()
+            if ret:
+                return ret
+        boards = self.pBoards
+        self.pChannels = list(chcnt) if isinstance(chcnt, (list, tuple)) else [chcnt] * len(boards)
+        self._pending = [None] * len(boards)
+        for s, ch in zip(self.pSlaves, self.pChannels[1:]):
+            ret = s.Start(smpcnt, smprate, ch, s.SAMPLE_ASYNC, eventCnt)
+            if ret:
+                self._error(s)
+                self.Stop()
+                return ret
+        ret = self.pMaster.Start(smpcnt, smprate, self.pChannels[0], self.pMaster.SAMPLE_ASYNC, eventCnt)
+        if ret:
+            self._error(self.pMaster)
+            self.Stop()
+        return ret
+
+    def Stop(self) -> int:
+        ''' 同期入力停止メソッド
+                Args:
+                Returns:
+                    エラーコード(最初のエラー)
+                Note:
+                    マスターを先に止め、クロックが止まってからスレーブを止める
+        '''
+        ret = 0
+        for b in self.pBoards:
+            r = b.Stop()
+            if r and not ret:
+                ret = r
+                self._error(b)
+        return ret
+
+    @property
+    def pIsBusy(self) -> bool:
+        ''' いずれかのボードが動作中 '''
+        return any(b.pIsBusy for b in self.pBoards)
+
+    def Read(self) -> (int,np.ndarray):
+        ''' 同期入力データ取得
+                Args:
+                Returns:
+                    エラーコードと(全チャンネル数, サンプリング数)のnp.ndarrayを返す
+                    チャンネルはマスター、スレーブの順に並ぶ
+                Note:
+                    各ボードのclsAD.Readを実行し、最短のサンプリング数に揃えて連結する
+                    時間軸はマスターのpTimeAxis
+        '''
+        data = []
+        for b in self.pBoards:
+            ret = b.Read()
+            if not isinstance(ret, tuple):  # Readはエラー時にエラーコードのみを返す
+                self._error(b)
+                return ret, np.empty((sum(self.pChannels), 0), dtype=np.int32)
+            data.append(np.vstack([b.pCh[i].pData for i in range(b._smplsetting["ChannelCount"])]))
+        cnt = min(d.shape[1] for d in data)
+        return 0, np.vstack([d[:, :cnt] for d in data])
+
+    def ReadChunk(self) -> (int,np.ndarray):
+        ''' 同期連続入力データ取得
+                Args:
+                Returns:
+                    エラーコードと(全チャンネル数, サンプリング数)のnp.ndarrayを返す
+                Note:
+                    各ボードのclsAD.ReadChunkの結果を、全ボードが揃ったサンプリング数まで返す
+                    揃わなかった分は次回に持ち越す
+        '''
+        data = []
+        for k, b in enumerate(self.pBoards):
+            ret, d = b.ReadChunk()
+            if ret:
+                self._error(b)
+                return ret, np.empty((sum(self.pChannels), 0), dtype=np.int32)
+            if self._pending[k] is not None:
+                d = np.concatenate((self._pending[k], d), axis=1)
+            data.append(d)
+        cnt = min(d.shape[1] for d in data)
+        self._pending = [d[:, cnt:] if d.shape[1] > cnt else None for d in data]
+        return 0, np.vstack([d[:, :cnt] for d in data])
+
+    def _route(self, board, dest:int, src:int) -> int:
+        ''' イベントコントローラ結線メソッド
+                Args:
+                    board(clsAD): 対象ボード
+                    dest(int): caio.AIOECU_DEST_*
+                    src(int): caio.AIOECU_SRC_*
+                Returns:
+                    エラーコード
+                Note:
+                    変更前の接続元を保存する
+        '''
+        old = ctypes.c_short()
+        if caio.AioGetEcuSignal(board._pID, dest, ctypes.byref(old)) == 0:
+            self._saved.append((board, dest, old.value))
+        lret = ctypes.c_long(caio.AioSetEcuSignal(board._pID, dest, src))
+        board._ErrorHandler(lret)
+        if lret.value:
+            self._error(board)
+        return lret.value
+
+    def _error(self, board):
+        ''' エラー文字列設定メソッド
+                Args:
+                    board(clsAD): エラーの発生したボード
+                Returns:
+                Note:
+        '''
+        self.pErrorStr = f"{board.pName}: {board.pErrorStr}"
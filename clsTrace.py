@@ -0,0 +1,245 @@
+# coding : utf-8
+import json
+import time
+import threading
+import inspect
+import functools
+import contextlib
+import types
+
+import clsAD
+
+class clsTrace:
+    ''' clsTrace ドライバ呼出し時間計測クラス
+            Note:
+                Enableでcaioの全関数とclsADの主要メソッドを計測用に差し替え、
+                Disableで元に戻す
+                無効時は差し替えを行わないため、計測のコストは掛からない
+    '''
+
+    # 計測対象メソッド(クラス, メソッド名)
+    METHODS:list = [
+        (clsAD.clsAD, "Start"), (clsAD.clsAD, "Read"), (clsAD.clsAD, "ReadChunk"),
+        (clsAD.clsAD, "ReadUserBuffer"), (clsAD.clsAD, "_toChannels"),
+        (clsAD.clsAD, "Snapshot"), (clsAD.clsAD, "Segments"), (clsAD.clsAD, "TriggerCapture"),
+        (clsAD.clsAD, "Pace"),
+        (clsAD.clsAD.clsChannel, "SetData"), (clsAD.clsAD.clsChannel, "_toValue"),
+    ]
+
+    def __init__(self, maxevents:int=100000):
+        ''' clsTrace コンストラクタ
+                Args:
+                    maxevents(int): 保持するトレースイベント数の上限
+                Returns:
+                Note:
+                    Property初期化
+        '''
+        # public property
+        self.pEnabled:bool = False                  # 計測中フラグ
+        # private property
+        self._maxevents:int = maxevents
+        self._stats:dict = {}                       # 名称毎の集計値
+        self._events:list = []                      # Chromeトレースイベント
+        self._saved:list = []                       # 差し替え前の(対象, 名称, 元の値)
+        self._proxy = None                          # 計測用のcaio代理オブジェクト
+        self._t0:int = time.perf_counter_ns()       # トレース基準時刻
+        self._lock = threading.Lock()
+
+    def Enable(self, modules:list=None):
+        ''' 計測開始メソッド
+                Args:
+                    modules(list): caioを参照するモジュールのlist
+                                Noneの場合は[clsAD]
+                Returns:
+                Note:
+                    各モジュールのcaioを計測用の代理オブジェクトに差し替える
+        '''
+        if self.pEnabled:
+            return
+        base = clsAD.caio           # 差し替え済(clsReplay)の場合はその上から計測する
+        proxy = types.SimpleNamespace()
+        for name in dir(base):
+            if name.startswith("__"):
+                continue
+            attr = getattr(base, name)
+            if name.startswith("Aio") and callable(attr):
+                attr = self._wrap(name, attr, proxy)
+            setattr(proxy, name, attr)
+        proxy._inner = base
+        proxy._tracing = True
+        self._proxy = proxy
+        for mod in (modules if modules is not None else [clsAD]):
+            self._saved.append((mod, "caio", mod.caio))
+            mod.caio = proxy
+        for cls, name in self.METHODS:
+            func = cls.__dict__[name]
+            self._saved.append((cls, name, func))
+            setattr(cls, name, self._wrap(f"{cls.__name__}.{name}", func))
+        self.pEnabled = True
+
+    def Disable(self):
+        ''' 計測終了メソッド
+                Args:
+                Returns:
+                Note:
+                    差し替えたcaio/メソッドを元に戻す(集計値は保持)
+                    計測中に更に差し替えられたcaio(clsReplay等)はそのまま残し、
+                    その下の計測用の代理オブジェクトは計測せずに素通しにする
+        '''
+        while self._saved:
+            target, name, value = self._saved.pop()
+            if name == "caio" and target.caio is not self._proxy:
+                continue
+            setattr(target, name, value)
+        if self._proxy is not None:
+            self._proxy._tracing = False
+            self._proxy = None
+        self.pEnabled = False
+
+    def Clear(self):
+        ''' 集計値クリアメソッド
+                Args:
+                Returns:
+                Note:
+        '''
+        with self._lock:
+            self._stats = {}
+            self._events = []
+            self._t0 = time.perf_counter_ns()
+
+    def Span(self, name:str):
+        ''' 任意区間計測
+                Args:
+                    name(str): 区間名(exm."Export")
+                Returns:
+                    with文で使用するコンテキストマネージャ
+                Note:
+                    無効時は何もしないコンテキストマネージャを返す
+        '''
+        if not self.pEnabled:
+            return contextlib.nullcontext()
+        return self._span(name)
+
+    def Stats(self) -> dict:
+        ''' 集計値取得メソッド
+                Args:
+                Returns:
+                    {名称:{Count, TotalNs, MinNs, MaxNs, AveNs, Histogram}}
+                Note:
+                    Histogramは{上限ns(2のべき乗):回数}
+        '''
+        ret = {}
+        with self._lock:
+            for name, st in self._stats.items():
+                ret[name] = {
+                    "Count":st[0], "TotalNs":st[1], "MinNs":st[2], "MaxNs":st[3],
+                    "AveNs":st[1] // st[0],
+                    "Histogram":{1 << i:n for i, n in enumerate(st[4]) if n},
+                }
+        return ret
+
+    def DumpJson(self, path:str):
+        ''' 集計値JSON出力メソッド
+                Args:
+                    path(str): 出力ファイル名
+                Returns:
+                Note:
+        '''
+        with open(path, "w") as file:
+            json.dump(self.Stats(), file, indent=1)
+
+    def DumpChrome(self, path:str):
+        ''' Chromeトレース出力メソッド
+                Args:
+                    path(str): 出力ファイル名
+                Returns:
+                Note:
+                    chrome://tracing / Perfettoで読込めるJSON形式
+        '''
+        with self._lock:
+            events = list(self._events)
+        with open(path, "w") as file:
+            json.dump({"traceEvents":events, "displayTimeUnit":"ns"}, file)
+
+    @contextlib.contextmanager
+    def _span(self, name:str):
+        ''' 区間計測コンテキストマネージャ
+                Args:
+                    name(str): 区間名
+                Returns:
+                Note:
+        '''
+        t = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._record(name, t, time.perf_counter_ns())
+
+    def _wrap(self, name:str, func, proxy=None):
+        ''' 計測用関数生成メソッド
+                Args:
+                    name(str): 計測名
+                    func: 対象関数
+                    proxy: 所属するcaio代理オブジェクト(_tracingが偽なら計測しない)
+                Returns:
+                    計測を行う関数
+                Note:
+                    ジェネレータ(Pace等)は次の値を返すまでの1回毎を計測する
+        '''
+        record = self._record
+        clock = time.perf_counter_ns
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def tracedgen(*args, **kwargs):
+                gen = func(*args, **kwargs)
+                try:
+                    while True:
+                        t = clock()
+                        try:
+                            item = next(gen)
+                        except StopIteration:
+                            return
+                        finally:
+                            record(name, t, clock())
+                        yield item
+                finally:
+                    gen.close()         # 呼出し側のbreakで元のジェネレータの後処理を行う
+            return tracedgen
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            if proxy is not None and not proxy._tracing:
+                return func(*args, **kwargs)
+            t = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, t, clock())
+        return traced
+
+    def _record(self, name:str, t:int, e:int):
+        ''' 計測値記録メソッド
+                Args:
+                    name(str): 計測名
+                    t(int): 開始時刻(perf_counter_ns)
+                    e(int): 終了時刻(perf_counter_ns)
+                Returns:
+                Note:
+                    ヒストグラムはns値のビット長毎に数える
+        '''
+        ns = e - t
+        with self._lock:
+            st = self._stats.get(name)
+            if st is None:
+                st = self._stats[name] = [0, 0, ns, ns, [0] * 64]
+            st[0] += 1
+            st[1] += ns
+            if ns < st[2]:
+                st[2] = ns
+            if ns > st[3]:
+                st[3] = ns
+            st[4][min(ns.bit_length(), 63)] += 1
+            if len(self._events) < self._maxevents:
+                self._events.append({
+                    "name":name, "ph":"X", "pid":0, "tid":threading.get_ident(),
+                    "ts":(t - self._t0) / 1000.0, "dur":ns / 1000.0
+                })
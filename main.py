@@ -1,13 +1,23 @@
 # coding:utf-8
 import time
 import sys
-import sqlite3
+import queue
+import threading
+
+import numpy as np
 
 from termcolor import colored
 
 import clsAD
+import clsTrace
+import clsReplay
+import clsExport
+import clsRecord
+import clsCodec
+import clsHistory
 
 cAD:clsAD
+trace = clsTrace.clsTrace()     # 計測(--trace指定時のみ有効)
 lap:list[float, float] = [0.0, 0.0]
 
 def dbgprint(s: str):
@@ -55,45 +65,207 @@ def LapStop() -> float:
     lap[1] = time.time()
     return lap[1] - lap[0]
 
-def ADset(dbf):
+def ADset(dbf) -> int:
     global cAD
-    con = sqlite3.connect(dbf)
-    with con:
-        sql = "SELECT * FROM ADset ORDER BY ch"
-        recs = con.execute(sql)
-        c = 0
-        for rec in recs:
-            c += 1
-            ch = rec[0]
-            cAD.pCh[ch].pName = rec[1]
-            cAD.pCh[ch].pRange = rec[2]
-            cAD.pCh[ch].pMin = rec[3]
-            cAD.pCh[ch].pMax = rec[4]
-            cAD.pCh[ch].pOffset = rec[5]
-            cAD.pCh[ch].pFormat = rec[6]
-            cAD.pCh[ch].pUnit = rec[7]
-        '''
-        for i in range(c):
-            dbgprint(cAD.pCh[i].pName)
-            dbgprint(cAD.pCh[i].pRange)
-            dbgprint(cAD.pCh[i].pMin)
-            dbgprint(cAD.pCh[i].pMax)
-            dbgprint(cAD.pCh[i].pOffset)
-            dbgprint(cAD.pCh[i].pFormat)
-            dbgprint(cAD.pCh[i].pUnit)
-        '''
+    c = cAD.LoadADset(dbf)
+    '''
+    for i in range(c):
+        dbgprint(cAD.pCh[i].pName)
+        dbgprint(cAD.pCh[i].pRange)
+        dbgprint(cAD.pCh[i].pMin)
+        dbgprint(cAD.pCh[i].pMax)
+        dbgprint(cAD.pCh[i].pOffset)
+        dbgprint(cAD.pCh[i].pFormat)
+        dbgprint(cAD.pCh[i].pUnit)
+    '''
+    return c
         
+def MonitorDisplay(state:dict, lock, acc:dict, chcnt:int):
+    ''' ライブモニター表示スレッド
+            Args:
+                state(dict): 表示設定(Monitorと共有)
+                lock(threading.Lock): accのロック
+                acc(dict): 集計値(Monitorが加算)
+                chcnt(int): 入力チャンネル数
+            Returns:
+            Note:
+                表示周期毎に集計値を新しいものと入れ替えてから表示する
+                (ロックは入れ替えの間だけ、表示中は読込を妨げない)
+    '''
+    while not state["quit"]:
+        time.sleep(1.0 / state["disprate"])
+        with lock:
+            snap = dict(acc)
+            acc.update(MonitorStats(chcnt))
+        lines = ["\x1b[H\x1b[2J" + f"{cAD.pName}  {snap['cnt']} samples/{1.0 / state['disprate']:.2f}s"
+                 + ("  REC " + state["recname"] if state["recname"] else "")]
+        lines.append(f"{'ch':>3} {'name':<12} {'ave':>12} {'min':>12} {'max':>12} unit")
+        if snap["cnt"]:
+            ave = cAD.ToValue(snap["sum"] / snap["cnt"])
+            vmin = cAD.ToValue(snap["min"])
+            vmax = cAD.ToValue(snap["max"])
+            for i in state["channels"]:
+                c = cAD.pCh[i]
+                f = c.pFormat
+                lines.append(f"{i:>3} {c.pName:<12} {f.format(ave[i]):>12} "
+                             f"{f.format(vmin[i]):>12} {f.format(vmax[i]):>12} {c.pUnit}")
+        lines.append("c <ch,..>:channels  r <n>:refresh/sec  w [file]:record on/off  "
+                     "s [pre] [post]:snapshot  q:quit")
+        print("\n".join(lines), flush=True)
+
+def MonitorStats(chcnt:int) -> dict:
+    ''' ライブモニター集計値生成
+            Args:
+                chcnt(int): 入力チャンネル数
+            Returns:
+                0で初期化した集計値(デジタル値の合計・最小・最大・サンプリング数)
+            Note:
+    '''
+    return {"sum":np.zeros(chcnt), "min":np.full(chcnt, np.iinfo(np.int32).max),
+            "max":np.full(chcnt, np.iinfo(np.int32).min), "cnt":0}
+
+def Monitor(smprate:int, chcnt:int, disprate:float=2.0, history:float=30.0):
+    ''' ライブモニター関数
+            Args:
+                smprate(int): サンプリングレート(μsec)
+                chcnt(int): 入力チャンネル数
+                disprate(float): 表示更新回数/sec
+                history(float): 入力履歴の保持時間(sec、sコマンドの事象前に使用)
+            Returns:
+            Note:
+                > python main.py --monitor [サンプリングレート(μsec、既定1000)] [チャンネル数(既定ADsetの行数)]
+                連続入力(ReadChunk)は主スレッド、表示とキー入力は別スレッドで行う
+                コマンドは読込周期の待ち時間に主スレッドで処理するため、入力を止めずに反映される
+                (データが来ない間も処理する)
+                    c 0,2,4-7 : 表示チャンネル
+                    r 5       : 表示更新回数/sec
+                    w [file]  : 記録開始/停止(clsReplayのraw形式、replay:で再生可)
+                                .adbはブロック索引付きの圧縮記録(clsRecord、範囲を指定して読出し可)
+                    s [pre] [post] : 事象前後の区間を出力(sec、既定10/5、clsHistory)
+                    q         : 終了
+    '''
+    state = {"channels":list(range(chcnt)), "disprate":disprate, "recname":"", "quit":False}
+    lock = threading.Lock()
+    acc = MonitorStats(chcnt)
+    cmds = queue.Queue()
+    rec = None
+    hist = clsHistory.clsHistory(cAD, list(range(chcnt)), history, smprate)
+
+    def keyboard():
+        while not state["quit"]:
+            try:
+                cmds.put(input())
+            except EOFError:
+                cmds.put("q")
+                break
+
+    ret = cAD.StartStream(smprate, chcnt, 0.1)
+    dbgprint(f"StartStream -> {cAD.pErrorStr}")
+    if ret:
+        return
+    threading.Thread(target=MonitorDisplay, args=(state, lock, acc, chcnt), daemon=True).start()
+    threading.Thread(target=keyboard, daemon=True).start()
+    try:
+        while not state["quit"]:
+            busy = cAD.pIsBusy
+            ret, data = cAD.ReadChunk()
+            if ret:
+                dbgprint(f"ReadChunk -> {cAD.pErrorStr}")
+                break
+            axis = cAD.pTimeAxis
+            if data.shape[1]:
+                with lock:
+                    acc["sum"] += data.sum(axis=1)
+                    np.minimum(acc["min"], data.min(axis=1), out=acc["min"])
+                    np.maximum(acc["max"], data.max(axis=1), out=acc["max"])
+                    acc["cnt"] += data.shape[1]
+                hist.Append(data, axis)
+                if isinstance(rec, clsRecord.clsRecord):
+                    rec.Write(data, axis)
+                elif rec is not None:
+                    rec.write(np.ascontiguousarray(data.T).tobytes())
+            if not busy:
+                break
+            # 読込周期の間はコマンドを待つ(データが来ない間もコマンドを処理する)
+            lines = []
+            try:
+                lines.append(cmds.get(timeout=cAD.pReadInterval))
+                while True:
+                    lines.append(cmds.get_nowait())
+            except queue.Empty:
+                pass
+            for line in lines:
+                cmd = line.strip().split(maxsplit=1)
+                if not cmd:
+                    continue
+                arg = cmd[1] if len(cmd) > 1 else ""
+                if cmd[0] == "q":
+                    state["quit"] = True
+                elif cmd[0] == "c":
+                    state["channels"] = cAD.ParseChannels(arg, chcnt) or list(range(chcnt))
+                elif cmd[0] == "r":
+                    try:
+                        state["disprate"] = max(0.1, float(arg))
+                    except ValueError:
+                        pass
+                elif cmd[0] == "s":
+                    v = arg.split()
+                    try:
+                        pre = float(v[0]) if v else 10.0
+                        post = float(v[1]) if len(v) > 1 else 5.0
+                    except ValueError:
+                        pre, post = 10.0, 5.0
+                    dbgprint(f"Snapshot -> {hist.Snapshot(pre, post)}")
+                elif cmd[0] == "w" and rec is None:     # 次に読むブロックから記録
+                    state["recname"] = arg or time.strftime("adrec_%Y%m%d_%H%M%S.raw")
+                    if state["recname"].endswith(".adb"):
+                        rec = clsRecord.clsRecord(cAD, state["recname"], list(range(chcnt)),
+                                    codec=clsCodec.Best())
+                    else:
+                        rec = open(state["recname"], "wb")
+                        rec.write(clsReplay.Header(chcnt, axis.pPeriod * 1e6, cAD.pCh[0].pResolution,
+                                    axis.pEnd))
+                elif cmd[0] == "w":
+                    if isinstance(rec, clsRecord.clsRecord):
+                        rec.Close()
+                    else:
+                        rec.close()
+                    rec = None
+                    state["recname"] = ""
+    finally:
+        state["quit"] = True
+        if cAD.pIsBusy:
+            cAD.Stop()
+        if isinstance(rec, clsRecord.clsRecord):
+            rec.Close()
+        elif rec is not None:
+            rec.close()
+        hist.Close(5.0)
+        if hist.pErrorStr:
+            dbgprint(hist.pErrorStr)
+
 def main():
     global cAD
+    if "--trace" in sys.argv:
+        trace.Enable()
     cAD = clsAD.clsAD()
     ret = cAD.Open("AIO000")
     dbgprint(f"Open -> {cAD.pErrorStr}")
     dbgprint(f"{cAD.pName}:{cAD.pMaxChannel}")
     
-    ADset("adtest.db")
+    adcnt = ADset("adtest.db")
     ret = cAD.SetRange()
     dbgprint(f"SetRange -> {cAD.pErrorStr}")
 
+    if "--monitor" in sys.argv:     # ライブモニター [サンプリングレート(μsec)] [チャンネル数]
+        opt = sys.argv[sys.argv.index("--monitor") + 1:]
+        smprate = int(opt[0]) if opt and opt[0].isdecimal() else 1000
+        chcnt = int(opt[1]) if len(opt) > 1 and opt[1].isdecimal() else (adcnt or cAD.pMaxChannel)
+        Monitor(smprate, chcnt)
+        ret = cAD.Close()
+        dbgprint(f"Close -> {ret} : {cAD.pErrorStr}")
+        return
+
     key = ""
     while key.lower() != "q":
         key = input("Count? > ")
@@ -115,7 +287,7 @@ def main():
                     i += 1
                     if (i % 10000) != 0:
                         print(".", end="")
-                    time.sleep(0.5) # sec
+                    cAD.Wait(0.5)   # ボードのタイマーで待機(非対応はtime.sleep)
                 print("")
                 ret,cnt = cAD.Read()
                 dbgprint(f"Read -> {cAD.pErrorStr} / smple -> {cnt}")
@@ -127,16 +299,31 @@ def main():
 
     # file output(for debug)
     buf = ""
-    with open("adinput.csv", "w") as file:
+    t = cAD.pTimeAxis.toArray(relative=True)     # 経過時間(sec)
+    with trace.Span("Export"), open("adinput.csv", "w") as file:
         for j in range(cnt):
-            tstr = ""
+            tstr = f"{t[j]:.6f},"
             for i in range(ch):
                 tstr += f"{cAD.pCh[i].pValue[j]},"
             buf += tstr + "\n"
         file.write(buf)
+    # Arrow/Parquet出力(pyarrowが必要)
+    for opt, path in (("--arrow", "adinput.arrows"), ("--parquet", "adinput.parquet")):
+        if opt not in sys.argv:
+            continue
+        if not clsExport.AVAILABLE:
+            dbgprint(f"Export -> {opt}: pyarrow is not installed")
+            continue
+        with trace.Span("ExportArrow"):
+            n = clsExport.Export(cAD, path, list(range(ch)))
+        dbgprint(f"Export -> {path} / sample -> {n}")
         
     ret = cAD.Close()
     dbgprint(f"Close -> {ret} : {cAD.pErrorStr}")
+    if trace.pEnabled:
+        trace.Disable()
+        trace.DumpJson("adtrace.json")
+        trace.DumpChrome("adtrace_chrome.json")
     
 if __name__ == "__main__":
     main()
@@ -0,0 +1,23 @@
+# coding : utf-8
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# リポジトリ直下のモジュール(clsAD等)をimportする
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clsAD
+import clsReplay
+
+@pytest.fixture
+def replayAD(tmp_path):
+    ''' 記録ファイル(4チャンネル・1msec・ランプ波形)を再生するclsAD '''
+    path = str(tmp_path / "ramp.raw")
+    data = (np.arange(4 * 2000).reshape(4, -1) % 4096).astype(np.int32)
+    clsReplay.Save(path, data, 1000.0, 16, 100.0)
+    ad = clsAD.clsAD()
+    assert ad.Open(f"replay:{path}?speed=0") == 0
+    yield ad
+    ad.Close()
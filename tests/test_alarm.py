@@ -0,0 +1,61 @@
+# coding : utf-8
+import os
+import sqlite3
+
+import numpy as np
+
+import clsAD
+import clsAlarm
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def events(ev):
+    ''' (ch, kind, active, index)のlist '''
+    return [(int(e["ch"]), int(e["kind"]), bool(e["active"]), int(e["index"])) for e in ev]
+
+def test_hysteresis():
+    a = clsAlarm.clsAlarm(1)
+    a.SetLimit(0, high=10.0, low=0.0, hysteresis=1.0)
+    v = np.array([[5, 11, 9.5, 10.5, 8.9, 5, -1, 0.5, 1.5]])
+    H, L = a.ALARM_HIGH, a.ALARM_LOW
+    assert events(a.Process(v)) == [(0, H, True, 1), (0, H, False, 4), (0, L, True, 6), (0, L, False, 8)]
+    assert not a.pActive.any()
+
+def test_blocks_match_whole_stream():
+    rng = np.random.default_rng(3)
+    v = np.cumsum(rng.normal(size=(4, 3000)), axis=1)
+    axis = lambda i, n: clsAD.clsAD.clsTimeAxis(100.0, 0.01, i, n)
+    def make():
+        a = clsAlarm.clsAlarm(4)
+        for ch in range(4):
+            a.SetLimit(ch, high=5.0, low=-5.0, rate=250.0, hysteresis=0.5)
+        return a
+    whole = make().Process(v, axis(0, 3000))
+    a = make()
+    parts = np.concatenate([a.Process(v[:, i:i + 777], axis(i, v[:, i:i + 777].shape[1]))
+                            for i in range(0, 3000, 777)])
+    assert whole.size > 0
+    assert events(parts) == events(whole)
+    assert np.allclose(parts["time"], whole["time"])
+
+def test_rate_needs_time_axis():
+    a = clsAlarm.clsAlarm(1)
+    a.SetLimit(0, rate=50.0)
+    v = np.array([[0.0, 0.1, 1.0, 1.1]])
+    assert a.Process(v).size == 0
+    a.Reset()
+    ev = a.Process(v, clsAD.clsAD.clsTimeAxis(0.0, 0.01, 0, 4))
+    assert events(ev) == [(0, a.ALARM_RATE, True, 2), (0, a.ALARM_RATE, False, 3)]
+    assert np.isclose(ev["value"][0], 90.0)
+
+def test_load_limits(tmp_path):
+    dbf = str(tmp_path / "alarm.db")
+    con = sqlite3.connect(dbf)
+    for sql in ("alarmCre.sql", "alarmIns.sql"):
+        with open(os.path.join(ROOT, sql)) as file:
+            con.executescript(file.read())
+    con.close()
+    a = clsAlarm.clsAlarm(4)
+    assert a.LoadLimits(dbf) == 3                   # ch4はチャンネル数外
+    assert a.pHigh[0] == 90.0 and np.isnan(a.pLow[1]) and a.pRate[2] == 500.0
+    assert clsAlarm.clsAlarm(4).LoadLimits(str(tmp_path / "empty.db")) == 0
@@ -0,0 +1,43 @@
+# coding : utf-8
+import numpy as np
+
+import clsBatch
+import clsReplay
+
+def run(ad, tmp_path, rows):
+    ''' CSVのジョブ表でclsBatchを実行する(ADjoblogなし) '''
+    jobs = tmp_path / "jobs.csv"
+    jobs.write_text("id,count,rate,channels,ranges,output\n" +
+                    "".join(",".join(map(str, r)) + "\n" for r in rows))
+    batch = clsBatch.clsBatch(ad, str(tmp_path / "none.db"), str(jobs))
+    return batch, batch.Run()
+
+def test_jobs_are_written(replayAD, tmp_path):
+    out = tmp_path / "job1.raw"
+    batch, err = run(replayAD, tmp_path, [(1, 500, 1000, "0-1", "", out)])
+    assert err == 0 and batch.pResults[0]["samples"] == 500
+    data, info = clsReplay.Load(str(out))
+    assert data.shape == (500, 2)
+
+def test_malformed_ranges_fail_only_that_job(replayAD, tmp_path):
+    rows = [(1, 100, 1000, "0", "0:x", tmp_path / "a.raw"),
+            (2, 100, 1000, "0", "99:0", tmp_path / "b.raw"),
+            (3, 100, 1000, "0", "", tmp_path / "c.raw")]
+    batch, err = run(replayAD, tmp_path, rows)
+    assert err == 2
+    assert [r["status"] for r in batch.pResults] == [replayAD.ERR_SETTING] * 2 + [0]
+    assert "0:x" in batch.pResults[0]["error"]
+
+def test_writer_error_does_not_stop_batch(replayAD, tmp_path, monkeypatch):
+    def broken(self, path, *args):
+        if path.endswith("bad.raw"):
+            raise ValueError("broken writer")
+        return write(self, path, *args)
+    write = clsBatch.clsBatch._write
+    monkeypatch.setattr(clsBatch.clsBatch, "_write", broken)
+    rows = [(i, 100, 1000, "0", "", tmp_path / ("bad.raw" if i < 4 else "ok.raw"))
+            for i in range(1, 6)]       # キュー容量(2)を超える数の失敗
+    batch, err = run(replayAD, tmp_path, rows)
+    assert err == 3
+    assert [r["status"] for r in batch.pResults] == [-1, -1, -1, 0, 0]
+    assert "broken writer" in batch.pResults[0]["error"]
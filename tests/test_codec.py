@@ -0,0 +1,33 @@
+# coding : utf-8
+import numpy as np
+import pytest
+
+import clsCodec
+
+CODECS = [c for c in clsCodec.CODEC_NAMES if clsCodec.Available(c)]
+
+@pytest.mark.parametrize("codec", CODECS)
+@pytest.mark.parametrize("dtype", [np.int16, np.int32])
+def test_round_trip(codec, dtype):
+    rng = np.random.default_rng(0)
+    info = np.iinfo(dtype)
+    block = rng.integers(info.min, info.max, size=(3, 257), dtype=dtype, endpoint=True)
+    block[0] = np.cumsum(rng.integers(-3, 4, 257)).astype(dtype)    # なめらかな波形
+    block[1, ::2], block[1, 1::2] = info.min, info.max              # 差分の桁あふれ
+    out = np.empty_like(block)
+    assert clsCodec.Decode(clsCodec.Encode(block, codec), codec, out) is out
+    assert np.array_equal(out, block)
+
+def test_delta_compresses_smooth_signal():
+    block = np.tile(np.arange(4096, dtype=np.int32), (4, 1))
+    assert len(clsCodec.Encode(block, clsCodec.CODEC_ZLIB)) < block.nbytes // 20
+
+def test_best_is_available():
+    assert clsCodec.Available(clsCodec.Best())
+
+def test_unavailable_codec_raises():
+    block = np.zeros((1, 4), dtype=np.int32)
+    with pytest.raises(ValueError):
+        clsCodec.Encode(block, 99)
+    with pytest.raises(ValueError):
+        clsCodec.Decode(b"", 99, block)
@@ -0,0 +1,54 @@
+# coding : utf-8
+import numpy as np
+import pytest
+
+import clsFilter
+
+FS = 1000.0
+
+def signal(n=2000, chcnt=3):
+    ''' 10Hz+200Hzの正弦波(チャンネル毎に振幅が違う) '''
+    t = np.arange(n) / FS
+    return np.arange(1, chcnt + 1)[:, None] * (np.sin(2 * np.pi * 10 * t) + np.sin(2 * np.pi * 200 * t))
+
+@pytest.fixture(params=["scipy", "numpy"])
+def backend(request, monkeypatch):
+    ''' scipy.signal.sosfilt/numpyの両方で確認する '''
+    if request.param == "scipy":
+        if clsFilter._signal is None:
+            pytest.skip("scipy is not installed")
+    else:
+        monkeypatch.setattr(clsFilter, "_signal", None)
+    return request.param
+
+def make(chcnt=3):
+    cls = clsFilter.clsFilter
+    return cls(chcnt, sos=cls.Lowpass(FS, 50.0) + cls.Notch(FS, 200.0),
+               fir=cls.FirLowpass(FS, 100.0, 31))
+
+def test_blocks_match_whole_signal(backend):
+    x = signal()
+    whole = make().Process(x)
+    f = make()
+    parts = [f.Process(x[:, i:i + n]) for i, n in ((0, 1), (1, 250), (251, 999), (1250, 750))]
+    assert np.allclose(np.concatenate(parts, axis=1), whole)
+
+def test_lowpass_removes_high_frequency(backend):
+    y = make().Process(signal())[:, 1000:]          # 過渡応答の後
+    amp = 2 * np.abs(np.fft.rfft(y, axis=1)) / y.shape[1]      # 1Hz毎の振幅
+    assert np.allclose(amp[:, 10], [1, 2, 3], rtol=0.05)
+    assert (amp[:, 200] < 0.01).all()
+
+def test_fir_matches_convolution():
+    h = clsFilter.clsFilter.FirLowpass(FS, 100.0, 15)
+    assert h.sum() == pytest.approx(1.0)
+    x = signal(300, 1)
+    y = clsFilter.clsFilter(1, fir=h).Process(x)
+    assert np.allclose(y[0], np.convolve(x[0], h)[:300])
+
+def test_reset_clears_state(backend):
+    f = make(1)
+    x = signal(500, 1)
+    first = f.Process(x)
+    f.Reset()
+    assert np.allclose(f.Process(x), first)
@@ -0,0 +1,49 @@
+# coding : utf-8
+import numpy as np
+
+import clsAD
+import clsHistory
+import clsRecord
+
+START, PERIOD = 500.0, 0.001
+
+def feed(hist, index, n, size=100):
+    ''' サンプリング番号を値とする2チャンネルのブロックをsize毎に追加する '''
+    for i in range(index, index + n, size):
+        m = min(size, index + n - i)
+        data = np.vstack([np.arange(i, i + m), np.arange(i, i + m) * 2]) % 65536
+        hist.Append(data, clsAD.clsAD.clsTimeAxis(START, PERIOD, i, m))
+
+def test_latest_wraps_ring(replayAD):
+    hist = clsHistory.clsHistory(replayAD, [0, 1], 0.25, 1000)
+    assert hist.pCapacity == 250
+    feed(hist, 0, 730, 70)
+    assert (hist.pBegin, hist.pEnd) == (480, 730)
+    data, axis = hist.Latest(1000)
+    assert data[0].tolist() == list(range(480, 730)) and axis.pIndex == 480
+    hist.Close()
+
+def test_snapshot_collects_pre_and_post(replayAD, tmp_path):
+    hist = clsHistory.clsHistory(replayAD, [0, 1], 0.5, 1000)
+    assert hist.Snapshot(0.1, 0.1) == -1                # 入力前
+    feed(hist, 0, 600)
+    path = str(tmp_path / "s.adb")
+    sid = hist.Snapshot(0.05, 0.15, t=START + 0.55, path=path)
+    feed(hist, 600, 300)
+    hist.Close(5.0)
+    assert hist.pSaved == [(sid, path, 200)]
+    with clsRecord.clsRecordReader(path) as r:
+        data, axis = r.Read()
+        assert axis.pIndex == 500 and axis.pStartTime == START
+        assert data[1].tolist() == [i * 2 for i in range(500, 700)]
+
+def test_gap_flushes_partial_snapshot(replayAD, tmp_path):
+    hist = clsHistory.clsHistory(replayAD, [0, 1], 0.5, 1000)
+    feed(hist, 0, 300)
+    path = str(tmp_path / "g.raw")
+    hist.Snapshot(0.1, 0.1, path=path)
+    feed(hist, 350, 100)                                # 取りこぼし
+    assert (hist.pBegin, hist.pEnd) == (350, 450)
+    hist.Close(5.0)
+    assert hist.pSaved[0][1:] == (path, 100)
+    assert hist.pErrorStr == ""
@@ -0,0 +1,75 @@
+# coding : utf-8
+import types
+
+import numpy as np
+import pytest
+
+import clsAD
+import clsCodec
+import clsRecord
+
+PERIOD = 0.001
+START = 1000.0
+
+def config(chcnt):
+    ''' 数値=デジタル値×0.5-1のチャンネル設定 '''
+    return [{"name":f"ch{i}", "resolution":16, "scale":0.5, "intercept":-1.0} for i in range(chcnt)]
+
+def record(path, blocks, codec=clsCodec.CODEC_NONE, blocksize=100):
+    ''' (先頭のサンプリング番号, データ)の順に記録する '''
+    ad = types.SimpleNamespace(pName="test", pTimeAxis=None)
+    chcnt = blocks[0][1].shape[0]
+    with clsRecord.clsRecord(ad, path, list(range(chcnt)), blocksize, codec,
+            config=config(chcnt)) as rec:
+        for index, data in blocks:
+            rec.Write(data, clsAD.clsAD.clsTimeAxis(START, PERIOD, index, data.shape[1]))
+
+def ramp(index, n, chcnt=3):
+    ''' サンプリング番号×(行+1)の値 '''
+    return (np.arange(index, index + n) * np.arange(1, chcnt + 1)[:, None] % 65536).astype(np.uint16)
+
+@pytest.mark.parametrize("codec", [clsCodec.CODEC_NONE, clsCodec.Best()])
+def test_read_range_across_blocks(tmp_path, codec):
+    path = str(tmp_path / "r.adb")
+    record(path, [(0, ramp(0, 130)), (130, ramp(130, 220))], codec)
+    with clsRecord.clsRecordReader(path, workers=2) as r:
+        assert (r.pBegin, r.pEnd) == (0, 350) and r.pIndex.size == 4
+        data, axis = r.Read(95, 305, [2, 0])
+        assert np.array_equal(data, ramp(95, 210)[[2, 0]])
+        assert axis.pIndex == 95 and axis.pStartTime == START
+
+def test_gap_splits_runs(tmp_path):
+    path = str(tmp_path / "g.adb")
+    record(path, [(0, ramp(0, 150)), (200, ramp(200, 50))])
+    with clsRecord.clsRecordReader(path) as r:
+        assert r.Runs() == [(0, 150), (200, 250)]
+        data, axis = r.Read(120)
+        assert data.shape[1] == 30                  # 最初の連続区間のみ
+        data, axis = r.Read(*r.Runs()[1])
+        assert np.array_equal(data, ramp(200, 50))
+
+def test_read_time(tmp_path):
+    path = str(tmp_path / "t.adb")
+    record(path, [(0, ramp(0, 300))])
+    with clsRecord.clsRecordReader(path) as r:
+        data, axis = r.ReadTime(START + 0.1, START + 0.2)
+        assert axis.pIndex == 100 and data.shape[1] == 100
+
+def test_find_uses_values(tmp_path):
+    path = str(tmp_path / "f.adb")
+    data = np.zeros((1, 500), dtype=np.uint16)
+    data[0, [42, 377]] = 1000                       # 数値499
+    record(path, [(0, data)])
+    with clsRecord.clsRecordReader(path) as r:
+        assert r.Find(0, above=400.0).tolist() == [42, 377]
+        assert r.Find(0, above=400.0, begin=100).tolist() == [377]
+        assert r.Find(0, below=-2.0).size == 0
+        assert r.ToValue(r.Read(42, 43)[0]).tolist() == [[499.0]]
+
+def test_truncated_record_drops_missing_blocks(tmp_path):
+    path = str(tmp_path / "c.adb")
+    record(path, [(0, ramp(0, 300))])
+    with open(path, "r+b") as file:
+        file.truncate(file.seek(0, 2) - 10)         # 最終ブロックの書込中断
+    with clsRecord.clsRecordReader(path) as r:
+        assert r.pEnd == 200
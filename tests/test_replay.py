@@ -0,0 +1,50 @@
+# coding : utf-8
+import ctypes
+
+import numpy as np
+
+import clsAD
+import clsReplay
+
+def test_snapshot_rejects_out_of_range_channels(replayAD):
+    ad = replayAD
+    for channels in (ad.pMaxChannel + 1, 0, [0, ad.pMaxChannel], [-1], []):
+        ret, out = ad.Snapshot(channels, ad.SNAP_RAW)
+        assert ret == ad.ERR_SETTING and out.size == 0
+
+def test_snapshot_selects_channels(replayAD):
+    ad = replayAD
+    ret, out = ad.Snapshot([1, 3], ad.SNAP_RAW)
+    assert ret == 0 and out.shape == (2,)
+
+def test_unimplemented_function_is_unsupported(replayAD):
+    ad = replayAD
+    caio = clsAD.caio
+    assert caio.AioSetAiDigitalFilter(ad._pID, 1) == clsReplay.ERR_UNSUPPORTED
+    assert caio.AioSetAiClockType(ad._pID, ad.CLOCK_ECU) == clsReplay.ERR_UNSUPPORTED
+
+def test_memory_size_is_reported(replayAD):
+    ad = replayAD
+    size = ctypes.c_long(-1)
+    assert clsAD.caio.AioSetAiMemorySize(ad._pID, 1234) == 0
+    assert clsAD.caio.AioGetAiMemorySize(ad._pID, ctypes.byref(size)) == 0
+    assert size.value == 1234
+
+def test_read_returns_recorded_data(replayAD):
+    ad = replayAD
+    assert ad.Start(100, 1000, 4, ad.SAMPLE_ASYNC) == 0
+    while ad.pIsBusy:
+        ad.Wait(0.01)
+    assert ad.Read() == (0, 100)
+    expect = np.arange(4 * 2000).reshape(4, -1) % 4096
+    assert [list(ad.pCh[i].pData) for i in range(4)] == expect[:, :100].tolist()
+
+def test_stream_blocks_are_continuous(replayAD):
+    ad = replayAD
+    assert ad.StartStream(1000, 2, 0.05) == 0
+    got = []
+    for data in ad.Stream():
+        got.extend(data[0].tolist())
+        if len(got) >= 500:
+            break
+    assert got[:500] == list(range(0, 500))
@@ -0,0 +1,85 @@
+# coding : utf-8
+import os
+import subprocess
+import sys
+import types
+
+import numpy as np
+import pytest
+
+import clsShmServer
+
+@pytest.fixture
+def server():
+    ''' 2チャンネル・容量10サンプリングの配信側(clsADなし) '''
+    ad = types.SimpleNamespace(pName="test", ChannelConfig=lambda chcnt:[{}] * chcnt)
+    srv = clsShmServer.clsShmServer(ad, f"clsAD_test_{os.getpid()}", capacity=10)
+    srv._create(2)
+    yield srv
+    srv.Close()
+
+def block(first, n):
+    ''' 通し番号を値とする(2, n)のブロック '''
+    idx = np.arange(first, first + n, dtype=np.int32)
+    return np.vstack([idx, -idx])
+
+def test_read_wraps_around(server):
+    client = clsShmServer.clsShmClient(server.pName)
+    server._write(block(0, 7))
+    client.Read()
+    server._write(block(7, 6))
+    index, views = client.Read()
+    assert index == 7 and len(views) == 2
+    assert np.concatenate(views, axis=1).tolist() == block(7, 6).tolist()
+    assert client.Valid(index)
+    client.Close()
+
+def test_lagging_reader_skips_to_oldest(server):
+    client = clsShmServer.clsShmClient(server.pName)
+    server._write(block(0, 8))
+    server._write(block(8, 8))
+    index, views = client.Read()
+    assert index == 6 and client.pLost == 6 and client.pLagged == 1
+    assert np.concatenate(views, axis=1)[0].tolist() == list(range(6, 16))
+    client.Close()
+
+def test_oversized_block_keeps_tail(server):
+    client = clsShmServer.clsShmClient(server.pName)
+    server._write(block(0, 25))
+    index, views = client.Read()
+    assert index == 15
+    assert np.concatenate(views, axis=1)[0].tolist() == list(range(15, 25))
+    client.Close()
+
+def test_view_invalid_while_being_overwritten(server):
+    client = clsShmServer.clsShmClient(server.pName)
+    server._write(block(0, 6))
+    index, views = client.Read()
+    assert client.Valid(index)
+    # 書込途中(wbeginのみ進んだ状態)で先頭の枠が上書きされる
+    server._hdr["wbegin"] = int(server._hdr["widx"]) + 5
+    assert not client.Valid(index)
+    client.Close()
+
+def test_read_excludes_range_being_overwritten(server):
+    client = clsShmServer.clsShmClient(server.pName)
+    server._write(block(0, 6))
+    server._hdr["wbegin"] = int(server._hdr["widx"]) + 5
+    index, views = client.Read()
+    assert index == 1 and client.pLost == 1
+    assert np.concatenate(views, axis=1)[0].tolist() == list(range(1, 6))
+    client.Close()
+
+def test_dead_reader_slot_is_reclaimed(server):
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                capture_output=True, text=True).stdout
+    server._hdr["readers"]["pid"][:] = int(dead)
+    client = clsShmServer.clsShmClient(server.pName)
+    assert client._slot == 0
+    assert (server._hdr["readers"]["pid"][1:] == 0).all()
+    client.Close()
+
+def test_all_slots_in_use(server):
+    server._hdr["readers"]["pid"][:] = os.getpid()
+    with pytest.raises(RuntimeError):
+        clsShmServer.clsShmClient(server.pName)
@@ -0,0 +1,42 @@
+# coding : utf-8
+import numpy as np
+import pytest
+
+import clsSpectrum
+
+FS = 1024.0
+
+def test_sine_power_and_band_rms():
+    t = np.arange(16384) / FS
+    x = np.vstack([np.sqrt(2) * np.sin(2 * np.pi * 64 * t),        # 実効値1
+                   3 * np.sqrt(2) * np.sin(2 * np.pi * 200 * t)])   # 実効値3
+    s = clsSpectrum.clsSpectrum(2, FS, nfft=256)
+    assert s.Process(x) > 0
+    rms = s.BandRMS([(50, 80), (180, 220)])
+    assert np.allclose(rms, [[1, 0], [0, 3]], atol=0.02)
+
+def test_white_noise_density():
+    rng = np.random.default_rng(1)
+    s = clsSpectrum.clsSpectrum(1, FS, nfft=512)
+    s.Process(rng.normal(0, 2, size=(1, 200000)))
+    # 分散4を0～ナイキストに一様に分ける
+    assert np.median(s.PSD()[0, 1:-1]) == pytest.approx(4 / (FS / 2), rel=0.05)
+
+def test_blocks_match_whole_stream():
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=(3, 5000))
+    whole = clsSpectrum.clsSpectrum(3, FS, nfft=256, overlap=0.75)
+    whole.Process(x)
+    parts = clsSpectrum.clsSpectrum(3, FS, nfft=256, overlap=0.75)
+    for i in range(0, 5000, 333):
+        parts.Process(x[:, i:i + 333])
+    assert parts.pSegments == whole.pSegments
+    assert np.allclose(parts.PSD(), whole.PSD())
+
+def test_reset_and_empty():
+    s = clsSpectrum.clsSpectrum(2, FS, nfft=64)
+    assert not s.PSD().any()
+    assert s.Process(np.ones((2, 63))) == 0
+    s.Process(np.ones((2, 200)))
+    s.Reset()
+    assert s.pSegments == 0 and not s.PSD().any()
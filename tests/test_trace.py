@@ -0,0 +1,36 @@
+# coding : utf-8
+import caio
+import numpy as np
+
+import clsAD
+import clsReplay
+import clsTrace
+
+def test_disable_keeps_replay_installed_while_tracing(tmp_path, monkeypatch):
+    monkeypatch.setattr(clsAD, "caio", caio)        # 再生デバイス未使用の状態から
+    path = str(tmp_path / "t.raw")
+    clsReplay.Save(path, np.zeros((2, 100), dtype=np.int32), 1000.0)
+    trace = clsTrace.clsTrace()
+    trace.Enable()
+    ad = clsAD.clsAD()
+    try:
+        assert ad.Open(f"replay:{path}?speed=0") == 0
+        trace.Disable()
+        assert getattr(clsAD.caio, "_replay", False)
+        assert ad.Start(10, 1000, 2, ad.SAMPLE_ASYNC) == 0
+        while ad.pIsBusy:
+            ad.Wait(0.01)
+        assert ad.Read() == (0, 10)
+        stats = trace.Stats()
+        assert "AioStartAi" not in stats        # 無効化後は計測しない
+    finally:
+        ad.Close()
+
+def test_disable_restores_methods_and_caio(monkeypatch):
+    monkeypatch.setattr(clsAD, "caio", caio)
+    start = clsAD.clsAD.Start
+    trace = clsTrace.clsTrace()
+    trace.Enable()
+    assert clsAD.clsAD.Start is not start and clsAD.caio is not caio
+    trace.Disable()
+    assert clsAD.clsAD.Start is start and clsAD.caio is caio